@@ -1,106 +1,295 @@
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
+import argparse
+import json
 import os
 import ast
+from collections import Counter
 
-sns.set(style="whitegrid")
-plt.rcParams["figure.figsize"] = (10, 6)
+from figures import render_figures
+from sketches import DEFAULT_CAPACITY, HeavyHitters
+from storage import iter_table, stage_path
 
+SAMPLE_COLUMNS = ["sentence", "clean_sentence", "feature", "clean_feature", "sentiment", "strength"]
+REQUIRED_COLUMNS = ["clean_sentence", "clean_feature", "sentiment", "strength"]
+EDA_STATS_PATH = "output/eda_stats.json"
+TOP_N = 15
 
-def run_eda(df):
-    print("\U0001F4CA Dataset shape:", df.shape)
-    print("\n🔍 Sample rows:")
-    print(df[["sentence", "clean_sentence", "feature", "clean_feature", "sentiment", "strength"]].head())
 
-    print("\n🎯 Sentiment distribution:")
-    print(df["sentiment"].value_counts())
+def _distinct_weighted(column):
+    # (value, occurrences) per distinct value, so each distinct POS string or noun
+    # phrase list is split once per chunk instead of once per row
+    keys = column.dropna().map(lambda v: v if isinstance(v, str) else tuple(v))
+    return keys.value_counts(sort=False).items()
 
-    print("\n💥 Sentiment strength distribution:")
-    print(df["strength"].value_counts())
 
-    print("\n🏷️ Number of unique features:", df["clean_feature"].nunique())
-    print("🏷️ Number of unique aspects:", df["aspect"].nunique())
-    print("🏷️ Number of unique domains:", df["domain"].nunique() if "domain" in df.columns else "N/A")
+class EDAStats:
+    # Partial EDA statistics of any number of chunks, built in one streaming pass.
+    # POS tags, sentence lengths and aspect/domain pairs are exact counters over
+    # small vocabularies; noun phrases go into a HeavyHitters sketch, so memory
+    # stays bounded however many distinct phrases there are. Stats of separate
+    # chunks, workers or runs merge, and save()/load() persist them as JSON
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.reset(capacity)
+
+    def reset(self, capacity=None):
+        capacity = capacity or self.noun_phrases.capacity
+        self.rows = 0
+        self.columns = []
+        self.sample = None
+        self.sentiment = Counter()
+        self.strength = Counter()
+        self.strength_by_sentiment = Counter()
+        self.sentence_length = Counter()
+        self.pos_tags = Counter()
+        self.noun_phrases = HeavyHitters(capacity)
+        self.aspect_domain = Counter()
+        self.features = set()
+        self.aspects = set()
+        self.domains = set()
+
+    def update(self, df):
+        df = df.dropna(subset=REQUIRED_COLUMNS)
+        # CSV reads empty strings back as missing; treat them the same in every format
+        df = df[(df["clean_sentence"] != "") & (df["clean_feature"] != "")]
+        if self.sample is None or len(self.sample) < 5:
+            head = df[SAMPLE_COLUMNS].head(5)
+            self.sample = head if self.sample is None else pd.concat([self.sample, head]).head(5)
+        self.rows += len(df)
+        self.columns = self.columns or list(df.columns)
+
+        sentiment = df["sentiment"].astype(object)
+        self.sentiment.update(sentiment.value_counts(sort=False).to_dict())
+        self.strength.update(df["strength"].value_counts(sort=False).to_dict())
+        self.strength_by_sentiment.update(
+            df.groupby([df["strength"].astype(int), sentiment]).size().to_dict())
+        self.sentence_length.update(df["clean_sentence"].str.split().str.len().value_counts(sort=False).to_dict())
+        self.features.update(df["clean_feature"].dropna().unique())
+        self.aspects.update(df["aspect"].dropna().unique())
+
+        if "pos_tags" in df.columns:
+            pos = Counter()
+            for row, n in _distinct_weighted(df["pos_tags"]):
+                for token in (row.split() if isinstance(row, str) else row):
+                    pos[token.split("_")[-1]] += n
+            self.pos_tags.update(pos)
+        if "noun_phrases" in df.columns:
+            # Lists from storage.read_table; a raw CSV column holds the same list as a Python literal
+            phrases = Counter()
+            for row, n in _distinct_weighted(df["noun_phrases"]):
+                for np in (ast.literal_eval(row) if isinstance(row, str) else row):
+                    if np.strip():
+                        phrases[np] += n
+            self.noun_phrases.update(phrases)
+        if "domain" in df.columns:
+            self.domains.update(df["domain"].dropna().unique())
+            self.aspect_domain.update(df.groupby([df["aspect"].astype(object), df["domain"].astype(object)])
+                                      .size().to_dict())
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.columns = self.columns or other.columns
+        if self.sample is None:
+            self.sample = other.sample
+        for name in ["sentiment", "strength", "strength_by_sentiment", "sentence_length", "pos_tags",
+                     "aspect_domain"]:
+            getattr(self, name).update(getattr(other, name))
+        self.noun_phrases.merge(other.noun_phrases)
+        self.features |= other.features
+        self.aspects |= other.aspects
+        self.domains |= other.domains
+        return self
+
+    def save(self, path=EDA_STATS_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        data = {
+            "rows": self.rows,
+            "columns": self.columns,
+            "sample": None if self.sample is None else json.loads(self.sample.astype(object).to_json(orient="split")),
+            "sentiment": list(self.sentiment.items()),
+            "strength": [[int(k), n] for k, n in self.strength.items()],
+            "strength_by_sentiment": [[int(k), p, n] for (k, p), n in self.strength_by_sentiment.items()],
+            "sentence_length": [[int(k), n] for k, n in self.sentence_length.items()],
+            "pos_tags": list(self.pos_tags.items()),
+            "noun_phrases": self.noun_phrases.to_dict(),
+            "aspect_domain": [[a, d, n] for (a, d), n in self.aspect_domain.items()],
+            "features": sorted(self.features),
+            "aspects": sorted(self.aspects),
+            "domains": sorted(self.domains),
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, path=EDA_STATS_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        stats = cls()
+        stats.rows, stats.columns = data["rows"], data["columns"]
+        if data["sample"] is not None:
+            sample = data["sample"]
+            stats.sample = pd.DataFrame(sample["data"], index=sample["index"], columns=sample["columns"])
+        stats.sentiment = Counter(dict(data["sentiment"]))
+        stats.strength = Counter(dict(data["strength"]))
+        stats.strength_by_sentiment = Counter({(k, p): n for k, p, n in data["strength_by_sentiment"]})
+        stats.sentence_length = Counter(dict(data["sentence_length"]))
+        stats.pos_tags = Counter(dict(data["pos_tags"]))
+        stats.noun_phrases = HeavyHitters.from_dict(data["noun_phrases"])
+        stats.aspect_domain = Counter({(a, d): n for a, d, n in data["aspect_domain"]})
+        stats.features, stats.aspects, stats.domains = (set(data[k]) for k in ["features", "aspects", "domains"])
+        return stats
 
-    os.makedirs("figures", exist_ok=True)
 
-    # Sentiment distribution
-    sns.countplot(data=df, x="sentiment", palette="Set2")
+def stats_from_table(path, chunk_rows=100_000, capacity=DEFAULT_CAPACITY):
+    # Chunks are folded into the statistics one at a time; the table is never loaded whole
+    stats = EDAStats(capacity)
+    for chunk in iter_table(path, chunk_rows=chunk_rows):
+        stats.update(chunk)
+    return stats
+
+
+def _counts(counter, top=None):
+    return pd.Series(dict(counter.most_common(top)), dtype="int64", name="count")
+
+
+def _style():
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    sns.set(style="whitegrid")
+    plt.rcParams["figure.figsize"] = (10, 6)
+    return plt, sns
+
+
+def draw_sentiment(sentiment, path):
+    plt, sns = _style()
+    sns.barplot(x=sentiment.index, y=sentiment.values, hue=sentiment.index, palette="Set2", legend=False)
     plt.title("Sentiment Distribution")
     plt.xlabel("Sentiment")
     plt.ylabel("Count")
     plt.tight_layout()
-    plt.savefig("figures/sentiment_distribution.png")
-    plt.clf()
+    plt.savefig(path)
+
 
-    # Sentiment strength distribution
-    sns.countplot(data=df, x="strength", hue="sentiment", palette="Set1")
+def draw_strength(strength, path):
+    plt, sns = _style()
+    sns.barplot(data=strength, x="strength", y="count", hue="sentiment", palette="Set1")
     plt.title("Sentiment Strength by Polarity")
     plt.xlabel("Strength (1–3)")
     plt.ylabel("Count")
     plt.tight_layout()
-    plt.savefig("figures/sentiment_strength.png")
-    plt.clf()
+    plt.savefig(path)
+
 
-    # Distribution of sentence length
-    df["sentence_length"] = df["clean_sentence"].apply(lambda x: len(x.split()))
-    sns.histplot(df["sentence_length"], bins=30, kde=True)
+def draw_sentence_length(lengths, path):
+    plt, sns = _style()
+    sns.histplot(x=lengths.index, weights=lengths.values, bins=30, kde=True)
     plt.title("Sentence Length Distribution")
     plt.xlabel("Number of Words")
     plt.ylabel("Frequency")
     plt.tight_layout()
-    plt.savefig("figures/sentence_length_distribution.png")
-    plt.clf()
+    plt.savefig(path)
+
+
+def draw_top_counts(data, path):
+    # Horizontal bars for the POS tag and noun phrase top-N
+    plt, sns = _style()
+    counts = data["counts"]
+    sns.barplot(x=counts.values, y=counts.index, hue=counts.index, palette=data["palette"], legend=False)
+    plt.title(data["title"])
+    plt.xlabel("Frequency")
+    plt.ylabel(data["ylabel"])
+    plt.tight_layout()
+    plt.savefig(path)
+
+
+def draw_aspect_domain(aspect_domain, path):
+    plt, sns = _style()
+    aspect_domain.T.plot(kind="barh", stacked=True, colormap="tab20")
+    plt.title("Aspect Distribution per Domain")
+    plt.xlabel("Count")
+    plt.ylabel("Domain")
+    plt.tight_layout()
+    plt.savefig(path)
+
+
+def plot_eda(stats, workers=None, force=False):
+    print("\U0001F4CA Dataset shape:", (stats.rows, len(stats.columns)))
+    print("\n🔍 Sample rows:")
+    print(stats.sample)
+
+    print("\n🎯 Sentiment distribution:")
+    print(_counts(stats.sentiment).rename_axis("sentiment"))
+
+    print("\n💥 Sentiment strength distribution:")
+    print(_counts(stats.strength).rename_axis("strength"))
+
+    print("\n🏷️ Number of unique features:", len(stats.features))
+    print("🏷️ Number of unique aspects:", len(stats.aspects))
+    print("🏷️ Number of unique domains:", len(stats.domains) if "domain" in stats.columns else "N/A")
+
+    # Figures are collected as (path, draw, data) jobs and rendered together at the end
+    strength = pd.DataFrame([(s, p, n) for (s, p), n in sorted(stats.strength_by_sentiment.items())],
+                            columns=["strength", "sentiment", "count"])
+    jobs = [
+        ("figures/sentiment_distribution.png", draw_sentiment, _counts(stats.sentiment)),
+        ("figures/sentiment_strength.png", draw_strength, strength),
+        ("figures/sentence_length_distribution.png", draw_sentence_length,
+         pd.Series(stats.sentence_length, dtype="int64").sort_index()),
+    ]
 
     # POS tag frequency
-    if "pos_tags" in df.columns:
+    if stats.pos_tags:
         print("\n\U0001F9E0 POS tag frequency (top 15):")
-        pos_flat = [token.split("_")[-1] for row in df["pos_tags"].dropna() for token in row.split()]
-        pos_series = pd.Series(pos_flat).value_counts().head(15)
+        pos_series = _counts(stats.pos_tags, TOP_N)
         print(pos_series)
-
-        sns.barplot(x=pos_series.values, y=pos_series.index, palette="magma")
-        plt.title("Top 15 POS Tags")
-        plt.xlabel("Frequency")
-        plt.ylabel("POS Tag")
-        plt.tight_layout()
-        plt.savefig("figures/pos_tag_distribution.png")
-        plt.clf()
+        jobs.append(("figures/pos_tag_distribution.png", draw_top_counts,
+                     {"counts": pos_series, "palette": "magma", "title": "Top 15 POS Tags", "ylabel": "POS Tag"}))
 
     # Noun Phrase Distribution (if available)
-    if "noun_phrases" in df.columns:
+    if stats.noun_phrases:
         print("\n🧠 Top Noun Phrases:")
-        all_nps = [np for row in df["noun_phrases"].dropna() for np in row.split(";") if np.strip()]
-        np_series = pd.Series(all_nps).value_counts().head(15)
+        np_series = pd.Series(dict(stats.noun_phrases.top(TOP_N)), dtype="int64", name="count")
         print(np_series)
-
-        sns.barplot(x=np_series.values, y=np_series.index, palette="viridis")
-        plt.title("Top 15 Noun Phrases")
-        plt.xlabel("Frequency")
-        plt.ylabel("Noun Phrase")
-        plt.tight_layout()
-        plt.savefig("figures/noun_phrase_distribution.png")
-        plt.clf()
+        jobs.append(("figures/noun_phrase_distribution.png", draw_top_counts,
+                     {"counts": np_series, "palette": "viridis", "title": "Top 15 Noun Phrases",
+                      "ylabel": "Noun Phrase"}))
 
     # Aspect distribution across domain
-    if "domain" in df.columns:
-        aspect_domain = df.groupby(["aspect", "domain"]).size().unstack(fill_value=0)
+    if stats.aspect_domain:
+        aspect_domain = pd.Series(stats.aspect_domain).sort_index().unstack(fill_value=0)
+        aspect_domain.index.name, aspect_domain.columns.name = "aspect", "domain"
         print("\n📊 Aspect Mention Count by Domain:")
         print(aspect_domain.head(10))
+        jobs.append(("figures/aspect_per_domain_distribution.png", draw_aspect_domain, aspect_domain))
 
-        aspect_domain.T.plot(kind="barh", stacked=True, colormap="tab20")
-        plt.title("Aspect Distribution per Domain")
-        plt.xlabel("Count")
-        plt.ylabel("Domain")
-        plt.tight_layout()
-        plt.savefig("figures/aspect_per_domain_distribution.png")
-        plt.clf()
-
+    render_figures(jobs, workers, force)
     print("\n✅ All EDA visualizations saved to /figures")
 
 
+def run_eda(df):
+    plot_eda(EDAStats().update(df))
+
+
 if __name__ == "__main__":
-    df = pd.read_csv("output/cleaned_reviews.csv")
-    df.dropna(subset=["clean_sentence", "clean_feature", "sentiment", "strength"], inplace=True)
-    run_eda(df)
+    parser = argparse.ArgumentParser(description="Exploratory statistics and plots of the cleaned reviews")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="Rows read per chunk")
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY,
+                        help="Noun phrases tracked by the heavy-hitter sketch")
+    parser.add_argument("--from-stats", nargs="+", default=None,
+                        help="Plot from saved statistics (merged if several) instead of scanning the table")
+    parser.add_argument("--save-stats", default=EDA_STATS_PATH, help="Where to save the statistics")
+    parser.add_argument("--plot-workers", type=int, default=None,
+                        help="Processes rendering figures (1 = in-process; default: one per CPU)")
+    parser.add_argument("--force-plots", action="store_true", help="Redraw figures even if their data is unchanged")
+    args = parser.parse_args()
+
+    if args.from_stats:
+        stats = EDAStats.load(args.from_stats[0])
+        for path in args.from_stats[1:]:
+            stats.merge(EDAStats.load(path))
+        print(f"📥 EDA statistics loaded from: {', '.join(args.from_stats)}")
+    else:
+        stats = stats_from_table(stage_path("cleaned_reviews"), args.chunk_rows, args.capacity)
+    stats.save(args.save_stats)
+    print(f"💾 EDA statistics saved to: {args.save_stats}")
+    plot_eda(stats, args.plot_workers, args.force_plots)
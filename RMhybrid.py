@@ -0,0 +1,158 @@
+# RMhybrid.py
+# ---------------------
+# Cost-aware cascade of the two relation mappers.
+#
+# The rule path runs first. When it finds an opinion word that is in the
+# opinion lexicon (a positive or negative verdict), that verdict is kept.
+# Only pairs the rule path cannot resolve, or resolves as "neutral" (an
+# adjective outside the lexicon), are sent to the zero-shot model. Every
+# output row records which path decided it in `decided_by`.
+#
+#   python RMhybrid.py --compare     # also report agreement with the all-BERT output
+
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from RMmodel_base import load_model_input
+from RMrule_base import map_pairs
+from comparison import LABELS, compare_mappings, confusion_counts
+from dedup import CLUSTERS_PATH, SentenceClusters
+from inference_backends import BACKENDS
+from parse_store import PARSE_STORE_DIR, load_parse_store
+from prediction_cache import PredictionCache, DEFAULT_CACHE_PATH, DEFAULT_MAX_ENTRIES
+from resources import get_engine, get_nlp
+from storage import read_table, stage_path, write_table
+from zero_shot import DEFAULT_MODEL
+
+OUTPUT_COLUMNS = ["row_id", "domain", "aspect", "clean_sentence", "opinion_word", "predicted_sentiment",
+                  "confidence", "decided_by", "method"]
+
+
+def rule_accepts(match):
+    # A lexicon-backed verdict: an opinion word was found and it is in the lexicon
+    return match is not None and match[1] != "neutral"
+
+
+def hybrid_relation_mapping(df, engine, cache=None, parsed_docs=None, clusters=None):
+    # Returns (result DataFrame, stats dict). With clusters (dedup.SentenceClusters) a cluster
+    # representative's lexicon verdict is reused for members containing its opinion word;
+    # every other member pair goes through both paths on its own sentence
+    rows = list(zip(df["clean_sentence"], df["aspect"]))
+    start = time.perf_counter()
+    if clusters is None:
+        pairs, rule_matches = rows, map_pairs(rows, cache, parsed_docs)
+    else:
+        pairs, rule_matches = clusters.resolve(rows, lambda ps: map_pairs(ps, cache, parsed_docs), rule_accepts)
+    distinct = list(dict.fromkeys(pairs))
+
+    routed = [pair for pair in distinct if not rule_accepts(rule_matches[pair])]
+    model_predictions = dict(zip(routed, engine.predict(routed)))
+    if clusters is not None:
+        clusters.tally("hybrid", rows, pairs, time.perf_counter() - start)
+
+    opinion_words, sentiments, confidences, decided_by = [], [], [], []
+    for pair in pairs:
+        match = rule_matches[pair]
+        opinion_words.append(match[0] if match else None)
+        if pair in model_predictions:
+            label, score = model_predictions[pair]
+            sentiments.append(label)
+            confidences.append(round(score, 3))
+            decided_by.append("bert")
+        else:
+            sentiments.append(match[1])
+            confidences.append(None)
+            decided_by.append("rule")
+
+    ids = {"row_id": df["row_id"].values} if "row_id" in df.columns else {}
+    result = pd.DataFrame({
+        **ids,
+        "domain": df["domain"].values,
+        "aspect": df["aspect"].values,
+        "clean_sentence": df["clean_sentence"].values,
+        "opinion_word": opinion_words,
+        "predicted_sentiment": sentiments,
+        "confidence": confidences,
+        "decided_by": decided_by,
+        "method": "hybrid"
+    }, columns=OUTPUT_COLUMNS if ids else OUTPUT_COLUMNS[1:])
+
+    stats = {
+        "rows": len(pairs),
+        "distinct_pairs": len(distinct),
+        "model_pairs": len(routed),
+        "model_calls_avoided": 1 - len(routed) / len(distinct) if distinct else 0.0,
+    }
+    return result, stats
+
+
+def agreement_with_bert(hybrid_df, bert_df):
+    # comparison.py metrics with the hybrid output in the rule-based slot
+    merged = compare_mappings(hybrid_df.rename(columns={"predicted_sentiment": "sentiment"}), bert_df)
+    total = len(merged)
+    cm = confusion_counts(merged["rule_sentiment"], merged["bert_sentiment"])
+    by_path = merged.groupby(merged["decided_by"].astype(object))["agreement"].mean()
+    return {
+        "compared": total,
+        "agreement": int(merged["agreement"].sum()),
+        "agreement_rate": merged["agreement"].sum() / total if total > 0 else 0,
+        "agreement_by_path": by_path.to_dict(),
+        "confusion_matrix": pd.DataFrame(cm, index=LABELS, columns=LABELS),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hybrid relation mapping: rule-based first, BERT for the rest")
+    parser.add_argument("--input", default=stage_path("cleaned_reviews"))
+    parser.add_argument("--output", default=stage_path("relation_mapping_hybrid"))
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--backend", default="torch", choices=list(BACKENDS))
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="Prediction cache path")
+    parser.add_argument("--cache-max-entries", type=int, default=DEFAULT_MAX_ENTRIES)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="Report agreement with the all-BERT output")
+    parser.add_argument("--bert-output", default=stage_path("relation_mapping_bert_based"))
+    parser.add_argument("--clusters", nargs="?", const=CLUSTERS_PATH, default=None,
+                        help="Sentence clusters from dedup.py: map one representative per cluster")
+    args = parser.parse_args()
+    clusters = None if args.clusters is None else SentenceClusters.load(args.clusters)
+
+    df = load_model_input(args.input)
+    cache = None if args.no_cache else PredictionCache(args.cache, args.cache_max_entries)
+    engine = get_engine(args.model, backend=args.backend, batch_size=args.batch_size, cache=cache)
+    parsed_docs = load_parse_store(get_nlp(), path=PARSE_STORE_DIR)
+
+    print("🔀 Hybrid relation mapping (rule-based first, BERT for unresolved/neutral pairs)...")
+    start = time.perf_counter()
+    result_df, stats = hybrid_relation_mapping(df, engine, cache=cache, parsed_docs=parsed_docs, clusters=clusters)
+    elapsed = time.perf_counter() - start
+
+    decided = result_df["decided_by"].value_counts()
+    print(f"✅ Mapped {stats['rows']} rows in {elapsed:.1f}s "
+          f"(rule: {decided.get('rule', 0)}, bert: {decided.get('bert', 0)})")
+    print(f"💸 Model calls avoided: {stats['model_calls_avoided']:.2%} "
+          f"({stats['distinct_pairs'] - stats['model_pairs']} of {stats['distinct_pairs']} distinct pairs)")
+    if cache is not None:
+        print(f"💾 Prediction cache: {cache.hits} hits, {cache.misses} misses")
+    if clusters is not None:
+        clusters.report()
+
+    write_table(result_df, args.output)
+    print(f"📄 Output saved to: {args.output}")
+
+    if args.compare:
+        if not os.path.exists(args.bert_output):
+            print(f"⚠️ No all-BERT output at {args.bert_output}; run RMmodel_base.py first")
+        else:
+            report = agreement_with_bert(result_df, read_table(args.bert_output))
+            print(f"\n✅ Compared {report['compared']} overlapping sentence-aspect pairs")
+            print(f"🤝 Agreement count: {report['agreement']}")
+            print(f"📊 Agreement rate: {report['agreement_rate']:.2%}")
+            for path, rate in report["agreement_by_path"].items():
+                print(f"   - decided by {path}: {rate:.2%}")
+            print("\nConfusion matrix (rows: hybrid, columns: BERT):")
+            print(report["confusion_matrix"])
@@ -1,62 +1,116 @@
 # RMmodel_base.py
 import pandas as pd
-from transformers import pipeline
 import os
-from tqdm import tqdm
-
-# Load cleaned dataset
-df = pd.read_csv("output/cleaned_reviews.csv")
-
-# Filter out rows with usable data
-df = df.dropna(subset=["clean_sentence", "aspect", "domain"])
-df = df[df["clean_sentence"].str.len() > 5]
-
-# Load BERT-style classifier (BART)
-classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
-
-# Sentiment classes to predict
-sentiment_labels = ["positive", "neutral", "negative"]
-
-results = []
-print("🔍 Predicting sentiment using BERT (BART MNLI)...")
-
-# Iterate with progress bar
-for idx, row in tqdm(df.iterrows(), total=len(df), desc="Classifying"):
-    sentence = row["clean_sentence"]
-    aspect = row["aspect"]
-    domain = row["domain"]
-
-    hypothesis_template = f"The sentiment toward the {aspect} is {{}}"
-
-    try:
-        prediction = classifier(
-            sequences=sentence,
-            candidate_labels=sentiment_labels,
-            hypothesis_template=hypothesis_template
-        )
-        predicted_label = prediction["labels"][0]
-        confidence = prediction["scores"][0]
-
-        results.append({
-            "domain": domain,
-            "aspect": aspect,
-            "clean_sentence": sentence,
-            "predicted_sentiment": predicted_label,
-            "confidence": round(confidence, 3),
-            "method": "bert-based"
-        })
-
-        if idx % 100 == 0:
-            print(f"✅ Processed {idx} rows")
-
-    except Exception as e:
-        print(f"⚠️ Error on row {idx}: {e}")
-        continue
-
-# Save results
-os.makedirs("output", exist_ok=True)
-out_path = "output/relation_mapping_bert_based.csv"
-pd.DataFrame(results).to_csv(out_path, index=False)
-
-print(f"\n✅ BERT-based relation mapping complete.")
-print(f"📄 Output saved to: {out_path}")
+import argparse
+import time
+
+from zero_shot import ZeroShotEngine, DEFAULT_MODEL, SENTIMENT_LABELS
+from inference_backends import BACKENDS
+from storage import present_columns, read_table, stage_path, write_table
+from prediction_cache import PredictionCache, DEFAULT_CACHE_PATH, DEFAULT_MAX_ENTRIES
+from checkpoint import DEFAULT_CHUNK_ROWS, run_chunked
+from dedup import CLUSTERS_PATH, SentenceClusters
+from RMrule_base import map_pairs
+from instrumentation import step, write_report
+
+
+INPUT_COLUMNS = ["row_id", "domain", "clean_sentence", "aspect"]
+
+
+def filter_model_input(df):
+    # Filter out rows with usable data
+    df = df.dropna(subset=["clean_sentence", "aspect", "domain"])
+    df = df[df["clean_sentence"].str.len() > 5]
+    return df
+
+
+def load_model_input(input_path=None):
+    # Load cleaned dataset
+    input_path = input_path or stage_path("cleaned_reviews")
+    df = read_table(input_path, columns=present_columns(input_path, INPUT_COLUMNS))
+    return filter_model_input(df)
+
+
+def bert_based_relation_mapping(df, engine, clusters=None):
+    # clusters (dedup.SentenceClusters): a cluster representative's label is reused for a member
+    # only when the opinion word the rule path finds for the representative occurs in the member
+    pairs = list(zip(df["clean_sentence"], df["aspect"]))
+    start = time.perf_counter()
+    keys = pairs
+    if clusters is not None:
+        keys, _ = clusters.resolve(pairs, lambda ps: map_pairs(ps, engine.cache), shared_only=True)
+    predictions = engine.predict(keys)
+    if clusters is not None:
+        clusters.tally("bert", pairs, keys, time.perf_counter() - start)
+
+    ids = {"row_id": df["row_id"].values} if "row_id" in df.columns else {}
+    return pd.DataFrame({
+        **ids,
+        "domain": df["domain"].values,
+        "aspect": df["aspect"].values,
+        "clean_sentence": df["clean_sentence"].values,
+        "predicted_sentiment": [label for label, _ in predictions],
+        "confidence": [round(score, 3) for _, score in predictions],
+        "method": "bert-based"
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BERT-based (zero-shot NLI) relation mapping")
+    parser.add_argument("--input", default=stage_path("cleaned_reviews"))
+    parser.add_argument("--output", default=stage_path("relation_mapping_bert_based"))
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Hub id or local NLI checkpoint directory")
+    parser.add_argument("--backend", default="torch", choices=list(BACKENDS))
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Inference processes sharing one copy of the model (torch/int8 backends)")
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="torch intra-op threads per worker (default: cpu_count // workers)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="Prediction cache path")
+    parser.add_argument("--cache-max-entries", type=int, default=DEFAULT_MAX_ENTRIES)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="Input rows per checkpointed chunk; 0 maps everything in one pass")
+    parser.add_argument("--restart", action="store_true", help="Discard checkpointed chunks instead of resuming")
+    parser.add_argument("--keep-chunks", action="store_true", help="Keep chunk files after compaction")
+    parser.add_argument("--clusters", nargs="?", const=CLUSTERS_PATH, default=None,
+                        help="Sentence clusters from dedup.py: classify one representative per cluster")
+    args = parser.parse_args()
+    clusters = None if args.clusters is None else SentenceClusters.load(args.clusters)
+
+    cache = None if args.no_cache else PredictionCache(args.cache, args.cache_max_entries)
+
+    # Load BERT-style classifier (BART)
+    with step("model_load"):
+        engine = ZeroShotEngine(args.model, labels=SENTIMENT_LABELS, batch_size=args.batch_size,
+                                cache=cache, backend=args.backend, workers=args.workers,
+                                threads_per_worker=args.threads_per_worker)
+
+    print("🔍 Predicting sentiment using BERT (BART MNLI)...")
+    start = time.perf_counter()
+    with step("bert_mapping") as s:
+        if args.chunk_rows > 0:
+            # Each chunk is committed to disk as soon as it is classified; a rerun resumes
+            rows = run_chunked(
+                os.path.splitext(os.path.basename(args.output))[0], args.input, args.output,
+                lambda chunk: bert_based_relation_mapping(filter_model_input(chunk), engine, clusters),
+                settings=[engine.model_id, engine.labels, engine.template] + ([clusters.digest] if clusters else []),
+                columns=present_columns(args.input, INPUT_COLUMNS),
+                chunk_rows=args.chunk_rows, restart=args.restart, keep_chunks=args.keep_chunks
+            )
+        else:
+            result_df = bert_based_relation_mapping(load_model_input(args.input), engine, clusters)
+            rows = len(result_df)
+            # Save results
+            write_table(result_df, args.output)
+        s.rows = rows
+    elapsed = time.perf_counter() - start
+    print(f"✅ Classified {rows} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.1f} rows/sec)")
+    if cache is not None:
+        print(f"💾 Prediction cache: {cache.hits} hits, {cache.misses} misses")
+    if clusters is not None:
+        clusters.report()
+
+    print(f"\n✅ BERT-based relation mapping complete.")
+    print(f"📄 Output saved to: {args.output}")
+    write_report("RMmodel_base")
@@ -1,18 +1,46 @@
 # RMrule_base.py
 import pandas as pd
-import spacy
-from nltk.corpus import opinion_lexicon
-from nltk.tokenize import word_tokenize
-import nltk
 import os
+import argparse
+import hashlib
+import json
+import time
+
+from aspects import ASPECT_SYNONYMS
+from checkpoint import DEFAULT_CHUNK_ROWS, run_chunked
+from dedup import CLUSTERS_PATH, SentenceClusters
+from instrumentation import step, write_report
+from prediction_cache import PredictionCache, prediction_key
+from resources import get_nlp, get_opinion_lexicon
+from storage import present_columns, read_table, stage_path, write_table
+from parse_store import PARSE_STORE_DIR, StoredParses, sentence_key, spacy_model_id
+
+# Cache identity of the rule path: changing the parser or the rule changes the key
+_SYNONYMS_HASH = hashlib.sha1(json.dumps(ASPECT_SYNONYMS, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+RULE_TEMPLATE = f"adj-dependency:phrase-matcher:{_SYNONYMS_HASH}"
+RULE_LABELS = ["positive", "neutral", "negative"]
+
+INPUT_COLUMNS = ["row_id", "domain", "clean_sentence", "aspect"]
+OUTPUT_COLUMNS = ["row_id", "domain", "aspect", "clean_sentence", "opinion_word", "sentiment", "method"]
+
+
+# spaCy and the opinion lexicon load on first use (see resources.py);
+# RMrule_base.nlp / POSITIVE / NEGATIVE / RULE_MODEL_ID still work for existing callers
+def __getattr__(name):
+    if name == "nlp":
+        return get_nlp()
+    if name == "POSITIVE":
+        return get_opinion_lexicon()[0]
+    if name == "NEGATIVE":
+        return get_opinion_lexicon()[1]
+    if name == "RULE_MODEL_ID":
+        return rule_model_id()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def rule_model_id():
+    return f"rule:{spacy_model_id(get_nlp())}"
 
-nltk.download("opinion_lexicon")
-nltk.download("punkt")
-
-nlp = spacy.load("en_core_web_sm")
-
-POSITIVE = set(opinion_lexicon.positive())
-NEGATIVE = set(opinion_lexicon.negative())
 
 def find_opinion_word(token):
     # Search for adjectives directly related to the feature token
@@ -23,52 +51,176 @@ def find_opinion_word(token):
         return token.head.text
     return None
 
-def rule_based_relation_mapping(df):
-    results = []
-
-    for _, row in df.iterrows():
-        sentence = row["clean_sentence"]
-        aspect = row["aspect"]
-        domain = row["domain"]
-
-        if not isinstance(aspect, str) or not isinstance(sentence, str):
+def opinion_sentiment(opinion):
+    positive, negative = get_opinion_lexicon()
+    return (
+        "positive" if opinion.lower() in positive else
+        "negative" if opinion.lower() in negative else
+        "neutral"
+    )
+
+
+def build_aspect_matcher(aspects):
+    # One PhraseMatcher pattern set per aspect: the aspect itself plus its synonyms,
+    # so multi-word forms like "battery life" match and lookup cost does not grow
+    # with the vocabulary size
+    from spacy.matcher import PhraseMatcher
+
+    nlp = get_nlp()
+    matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+    for aspect in aspects:
+        phrases = [p for p in dict.fromkeys([aspect] + ASPECT_SYNONYMS.get(aspect, [])) if p.strip()]
+        matcher.add(aspect, list(nlp.tokenizer.pipe(phrases)))
+    return matcher
+
+
+def map_sentence(doc, aspects, matcher):
+    # Returns {aspect: (opinion_word, sentiment)} for the first match of each wanted
+    # aspect that has an attached opinion word
+    found = {}
+    for match_id, start, end in matcher(doc):
+        aspect = doc.vocab.strings[match_id]
+        if aspect not in aspects or aspect in found:
             continue
-
-        doc = nlp(sentence)
-
-        for token in doc:
-            if token.text.lower() == aspect:
-                opinion = find_opinion_word(token)
-                if opinion:
-                    sentiment = (
-                        "positive" if opinion.lower() in POSITIVE else
-                        "negative" if opinion.lower() in NEGATIVE else
-                        "neutral"
-                    )
-
-                    results.append({
-                        "domain": domain,
-                        "aspect": aspect,
-                        "clean_sentence": sentence,
-                        "opinion_word": opinion,
-                        "sentiment": sentiment,
-                        "method": "rule-based"
-                    })
-                    break  # Avoid duplicate matches in the same sentence
-
-    return pd.DataFrame(results)
+        opinion = find_opinion_word(doc[start:end].root)
+        if opinion:
+            found[aspect] = (opinion, opinion_sentiment(opinion))  # Avoid duplicate matches in the same sentence
+    return found
+
+
+def rule_cache_key(sentence, aspect, model_id=None):
+    return prediction_key(sentence, aspect, RULE_TEMPLATE, RULE_LABELS, model_id or rule_model_id())
+
+
+def sentence_docs(sentences, parsed_docs, batch_size=256):
+    # Stored parses first, then one nlp.pipe pass over the rest. parsed_docs is a
+    # {sentence_key: Doc} dict or a StoredParses, which reads only these sentences' Docs
+    keys = {sentence: sentence_key(sentence) for sentence in sentences}
+    if isinstance(parsed_docs, StoredParses):
+        parsed_docs = parsed_docs.get_many(keys.values())
+    to_parse = []
+    for sentence, key in keys.items():
+        if key in parsed_docs:
+            yield sentence, parsed_docs[key]
+        else:
+            to_parse.append(sentence)
+    yield from zip(to_parse, get_nlp().pipe(to_parse, batch_size=batch_size))
+
+
+def map_pairs(pairs, cache=None, parsed_docs=None, batch_size=256):
+    # {(sentence, aspect): (opinion_word, sentiment) or None} for every distinct pair
+    parsed_docs = parsed_docs or {}
+    pairs = list(dict.fromkeys(pairs))
+
+    # Look up every distinct pair in the cache first; only parse the misses
+    mapped = {}
+    keys = {}
+    if cache is not None:
+        with step("cache_lookup", rows=len(pairs)):
+            model_id = rule_model_id()
+            keys = {pair: rule_cache_key(*pair, model_id) for pair in pairs}
+            cached = cache.get_many(keys.values())
+            mapped = {pair: cached[key] for pair, key in keys.items() if key in cached}
+
+    # Group the remaining pairs by sentence: one parse and one matcher pass per sentence
+    pending = {}
+    for sentence, aspect in pairs:
+        if (sentence, aspect) not in mapped:
+            pending.setdefault(sentence, set()).add(aspect)
+
+    with step("parse_and_match", rows=len(pending)):
+        matcher = build_aspect_matcher({aspect for aspects in pending.values() for aspect in aspects})
+        fresh = {}
+        for sentence, doc in sentence_docs(list(pending), parsed_docs, batch_size):
+            found = map_sentence(doc, pending[sentence], matcher)
+            for aspect in pending[sentence]:
+                fresh[(sentence, aspect)] = found.get(aspect)
+    mapped.update(fresh)
+
+    if cache is not None:
+        with step("cache_write", rows=len(fresh)):
+            cache.put_many({keys[pair]: match for pair, match in fresh.items()})
+    return mapped
+
+
+def rule_based_relation_mapping(df, cache=None, parsed_docs=None, batch_size=256, clusters=None):
+    # parsed_docs: {sentence_key: Doc} from the preprocessing parse store.
+    # clusters (dedup.SentenceClusters): map cluster representatives' pairs, fanning a verdict out
+    # only to members that contain its opinion word.
+    # row_id is carried through when the input has it (tables written before it existed do not)
+    results = []
+    has_ids = "row_id" in df.columns
+    row_id_values = df["row_id"] if has_ids else [None] * len(df)
+    rows = [
+        (row_id, domain, sentence, aspect)
+        for row_id, domain, sentence, aspect in zip(row_id_values, df["domain"], df["clean_sentence"], df["aspect"])
+        if isinstance(aspect, str) and isinstance(sentence, str)
+    ]
+    pairs = [(s, a) for _, _, s, a in rows]
+    start = time.perf_counter()
+    if clusters is None:
+        keys, mapped = pairs, map_pairs(pairs, cache, parsed_docs, batch_size)
+    else:
+        keys, mapped = clusters.resolve(pairs, lambda ps: map_pairs(ps, cache, parsed_docs, batch_size))
+        clusters.tally("rule", pairs, keys, time.perf_counter() - start)
+
+    for (row_id, domain, sentence, aspect), key in zip(rows, keys):
+        match = mapped[key]
+        if match:
+            opinion, sentiment = match
+            results.append({
+                "row_id": row_id,
+                "domain": domain,
+                "aspect": aspect,
+                "clean_sentence": sentence,
+                "opinion_word": opinion,
+                "sentiment": sentiment,
+                "method": "rule-based"
+            })
+
+    columns = OUTPUT_COLUMNS if has_ids else OUTPUT_COLUMNS[1:]
+    return pd.DataFrame(results, columns=columns)
 
 
 if __name__ == "__main__":
-    input_path = "output/cleaned_reviews.csv"
-    output_path = "output/relation_mapping_rule_based.csv"
-
-    df = pd.read_csv(input_path)
-    df.dropna(subset=["clean_sentence", "aspect", "domain"], inplace=True)
+    parser = argparse.ArgumentParser(description="Rule-based (dependency + opinion lexicon) relation mapping")
+    parser.add_argument("--input", default=stage_path("cleaned_reviews"))
+    parser.add_argument("--output", default=stage_path("relation_mapping_rule_based"))
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="Input rows per checkpointed chunk; 0 maps everything in one pass")
+    parser.add_argument("--restart", action="store_true", help="Discard checkpointed chunks instead of resuming")
+    parser.add_argument("--keep-chunks", action="store_true", help="Keep chunk files after compaction")
+    parser.add_argument("--clusters", nargs="?", const=CLUSTERS_PATH, default=None,
+                        help="Sentence clusters from dedup.py: map one representative per cluster")
+    args = parser.parse_args()
+    clusters = None if args.clusters is None else SentenceClusters.load(args.clusters)
+
+    input_path = args.input
+    output_path = args.output
+    columns = present_columns(input_path, INPUT_COLUMNS)
 
     print("🔍 Performing rule-based relation mapping...")
-    result_df = rule_based_relation_mapping(df)
-
-    os.makedirs("output", exist_ok=True)
-    result_df.to_csv(output_path, index=False)
+    cache = PredictionCache()
+    with step("parse_store_index") as s:
+        # Docs are read per chunk; only the store's index is loaded up front
+        parsed_docs = StoredParses(get_nlp(), path=PARSE_STORE_DIR)
+        s.rows = len(parsed_docs)
+    print(f"🧩 {len(parsed_docs)} stored parses indexed in {PARSE_STORE_DIR}")
+
+    def map_chunk(df):
+        df = df.dropna(subset=["clean_sentence", "aspect", "domain"])
+        return rule_based_relation_mapping(df, cache=cache, parsed_docs=parsed_docs, clusters=clusters)
+
+    with step("rule_mapping"):
+        if args.chunk_rows > 0:
+            run_chunked(os.path.splitext(os.path.basename(output_path))[0], input_path, output_path, map_chunk,
+                        settings=[rule_model_id(), RULE_TEMPLATE] + ([clusters.digest] if clusters else []),
+                        columns=columns,
+                        chunk_rows=args.chunk_rows, restart=args.restart, keep_chunks=args.keep_chunks)
+        else:
+            write_table(map_chunk(read_table(input_path, columns=columns)), output_path)
+    print(f"💾 Prediction cache: {cache.hits} hits, {cache.misses} misses")
+    if clusters is not None:
+        clusters.report()
     print(f"✅ Rule-based relation mapping complete. Saved to {output_path}")
+    write_report("RMrule_base")
@@ -0,0 +1,96 @@
+# aggregates.py
+# ---------------------
+# Mergeable aspect/domain sentiment counters behind opinion.py.
+#
+# Counts are kept per (domain, aspect, sentiment), which is enough to answer
+# every per-aspect and per-domain question opinion.py asks. A store can be
+# updated with the relation-mapping rows of a new batch, merged with stores
+# built by other workers, saved/loaded as JSON, and turned back into the
+# summary table (counts, total_mentions, ratios) and top-k rankings.
+# `sources` holds content digests of the delta files already counted, so a
+# batch applied twice is only counted once.
+
+import json
+import os
+from collections import Counter
+
+import pandas as pd
+
+SENTIMENT_LABELS = ["positive", "neutral", "negative"]
+
+
+class SentimentAggregates:
+    def __init__(self, counts=None, sources=None):
+        self.counts = Counter(counts or {})
+        self.sources = set(sources or [])
+
+    def update(self, df, sentiment_col="sentiment"):
+        # Add the counts of a batch of relation-mapping rows
+        df = df.dropna(subset=["aspect", sentiment_col])
+        domains = df["domain"].astype(object).fillna("") if "domain" in df.columns else pd.Series("", index=df.index)
+        keys = pd.DataFrame({
+            "domain": domains.astype(str).values,
+            "aspect": df["aspect"].astype(str).values,
+            "sentiment": df[sentiment_col].astype(str).values,
+        })
+        for key, n in keys.groupby(["domain", "aspect", "sentiment"], sort=False).size().items():
+            self.counts[key] += int(n)
+        return self
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        self.sources.update(other.sources)
+        return self
+
+    @classmethod
+    def merged(cls, stores):
+        result = cls()
+        for store in stores:
+            result.merge(store)
+        return result
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        rows = [[d, a, s, n] for (d, a, s), n in sorted(self.counts.items())]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"columns": ["domain", "aspect", "sentiment", "count"], "rows": rows,
+                       "sources": sorted(self.sources)}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls({(d, a, s): n for d, a, s, n in data["rows"]}, data.get("sources"))
+
+    def _frame(self):
+        return pd.DataFrame(
+            [(d, a, s, n) for (d, a, s), n in self.counts.items()],
+            columns=["domain", "aspect", "sentiment", "count"]
+        )
+
+    def summary(self, by="aspect"):
+        # Same layout opinion.py has always written: one count column per observed
+        # sentiment, total_mentions, any missing label as 0, then the ratios
+        frame = self._frame()
+        summary = frame.pivot_table(index=by, columns="sentiment", values="count",
+                                    aggfunc="sum", fill_value=0)
+        summary.columns.name = None
+        summary = summary.astype("int64")
+        summary["total_mentions"] = summary.sum(axis=1)
+
+        for label in SENTIMENT_LABELS:
+            if label not in summary.columns:
+                summary[label] = 0
+
+        for label in SENTIMENT_LABELS:
+            summary[f"{label}_ratio"] = summary[label] / summary["total_mentions"]
+        return summary
+
+    def top_k(self, column, k=10, by="aspect"):
+        return self.summary(by).sort_values(column, ascending=False).head(k)
+
+    def overall_counts(self):
+        totals = Counter()
+        for (_, _, sentiment), n in self.counts.items():
+            totals[sentiment] += n
+        return pd.Series(dict(totals.most_common()), name="count")
@@ -0,0 +1,197 @@
+# aspect_index.py
+# ---------------------
+# Aspect extraction for text without feature[+n] annotations.
+#
+# Every aspect phrase (ASPECT_SYNONYMS, plus noun phrases and annotated
+# aspects mined from an already processed table) is compiled into one
+# word-level Aho-Corasick automaton. A sentence is then scanned in a single
+# left-to-right pass over its words: the cost is linear in sentence length
+# and independent of how many phrases the index holds.
+#
+# Overlapping hits resolve leftmost-longest, so "battery life is great"
+# yields battery ("battery life"), not battery twice, and an aspect named
+# twice in one sentence is one candidate. Output rows have the
+# cleaned_reviews columns the relation mappers read (domain, clean_sentence,
+# aspect) plus the matched phrase and its character span in clean_sentence.
+# Each candidate's row_id hashes its source row (the input's row_id, or its
+# position when the feed has none) with the aspect, so mapper outputs for
+# candidates join in comparison.py like annotated rows do.
+#
+#   python aspect_index.py --input output/new_feed.csv --mine-from output/cleaned_reviews.csv
+#   python RMrule_base.py --input output/aspect_candidates.csv
+
+import argparse
+import re
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from aspects import ASPECT_SYNONYMS
+from instrumentation import step, write_report
+from preprocess import clean_text, clean_text_series, normalize_feature
+from storage import read_table, stage_path, write_table
+
+WORD_RE = re.compile(r"\w+")
+CANDIDATE_COLUMNS = ["row_id", "domain", "clean_sentence", "aspect", "feature", "span_start", "span_end"]
+
+
+class AspectIndex:
+    def __init__(self, phrases=None):
+        # State 0 is the root; goto[s] maps a word to the next state, fail[s] is the
+        # longest proper suffix state, out[s] lists (aspect, n_words) ending at s
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        self.phrases = {}
+        self._compiled = False
+        for phrase, aspect in (phrases or {}).items():
+            self.add(phrase, aspect)
+
+    @classmethod
+    def from_synonyms(cls, synonyms=ASPECT_SYNONYMS):
+        index = cls()
+        for aspect, words in synonyms.items():
+            for phrase in [aspect] + words:
+                index.add(phrase, aspect)
+        return index
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def add(self, phrase, aspect):
+        # The first aspect registered for a phrase wins, so synonyms beat mined phrases
+        words = tuple(WORD_RE.findall(phrase.lower()))
+        if not words or words in self.phrases:
+            return
+        self.phrases[words] = aspect
+        state = 0
+        for word in words:
+            nxt = self.goto[state].get(word)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][word] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            state = nxt
+        self.out[state].append((aspect, len(words)))
+        self._compiled = False
+
+    def compile(self):
+        # Breadth-first failure links; each state inherits the outputs of its fail state
+        queue = list(self.goto[0].values())
+        for state in queue:
+            self.fail[state] = 0
+        for state in queue:  # grows while iterating
+            for word, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and word not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(word, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+        self._compiled = True
+        return self
+
+    def find(self, text):
+        # [(aspect, phrase, start, end)] with non-overlapping, leftmost-longest spans
+        if not self._compiled:
+            self.compile()
+        goto, fail, out = self.goto, self.fail, self.out
+        matches = list(WORD_RE.finditer(text.lower()))
+        hits = []
+        state = 0
+        for i, word in enumerate(m.group() for m in matches):
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            for aspect, n in out[state]:
+                hits.append((i - n + 1, -n, aspect))
+
+        found = []
+        next_free = 0
+        for first, neg_n, aspect in sorted(hits):
+            if first < next_free:
+                continue
+            last = first - neg_n - 1
+            start, end = matches[first].start(), matches[last].end()
+            found.append((aspect, text[start:end], start, end))
+            next_free = last + 1
+        return found
+
+
+def mine_phrases(df, min_count=20, max_words=3, top_k=500):
+    # {phrase: aspect} for frequent noun phrases and annotated aspects in a processed table
+    counts = Counter()
+    if "noun_phrases" in df.columns:
+        for phrases in df["noun_phrases"]:
+            for phrase in phrases:
+                phrase = clean_text(phrase, remove_stopwords=False)
+                if phrase and len(phrase.split()) <= max_words:
+                    counts[phrase] += 1
+    if "aspect" in df.columns:
+        counts.update(a for a in df["aspect"].dropna().astype(str) if len(a.split()) <= max_words)
+    return {phrase: normalize_feature(phrase)
+            for phrase, n in counts.most_common(top_k) if n >= min_count}
+
+
+def build_index(mine_from=None, min_count=20, max_words=3, top_k=500):
+    index = AspectIndex.from_synonyms()
+    if mine_from is not None:
+        mined = mine_phrases(read_table(mine_from, columns=["aspect", "noun_phrases"]),
+                             min_count, max_words, top_k)
+        for phrase, aspect in mined.items():
+            index.add(phrase, aspect)
+    return index.compile()
+
+
+def extract_aspects(df, index, remove_stopwords=True):
+    # One candidate row per distinct aspect in a sentence (span of its first mention);
+    # each distinct sentence is scanned once
+    if "clean_sentence" not in df.columns:
+        df = df.assign(clean_sentence=clean_text_series(df["sentence"], remove_stopwords))
+    domains = df["domain"] if "domain" in df.columns else pd.Series("unknown", index=df.index)
+    sources = df["row_id"] if "row_id" in df.columns else range(len(df))
+
+    found = {}
+    rows = []
+    for source, domain, sentence in zip(sources, domains, df["clean_sentence"]):
+        if not isinstance(sentence, str) or not sentence:
+            continue
+        if sentence not in found:
+            firsts = {}
+            for hit in index.find(sentence):
+                firsts.setdefault(hit[0], hit)
+            found[sentence] = list(firsts.values())
+        for aspect, phrase, start, end in found[sentence]:
+            rows.append((source, domain, sentence, aspect, phrase, start, end))
+    candidates = pd.DataFrame(rows, columns=CANDIDATE_COLUMNS)
+    keys = pd.util.hash_pandas_object(candidates[["row_id", "aspect"]], index=False).to_numpy()
+    candidates["row_id"] = (keys >> np.uint64(1)).astype(np.int64)
+    return candidates
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detect aspect mentions in unannotated sentences")
+    parser.add_argument("--input", required=True,
+                        help="Table with a sentence (or clean_sentence) column and optionally domain")
+    parser.add_argument("--output", default=stage_path("aspect_candidates"))
+    parser.add_argument("--mine-from", default=None,
+                        help="Processed table (e.g. cleaned_reviews) to mine extra aspect phrases from")
+    parser.add_argument("--min-count", type=int, default=20, help="Minimum frequency of a mined phrase")
+    parser.add_argument("--max-words", type=int, default=3)
+    parser.add_argument("--top-k", type=int, default=500, help="Most frequent mined phrases to keep")
+    args = parser.parse_args()
+
+    with step("build_index") as s:
+        index = build_index(args.mine_from, args.min_count, args.max_words, args.top_k)
+        s.rows = len(index)
+    print(f"🧭 Aspect index: {len(index)} phrases, {len(set(index.phrases.values()))} aspects")
+
+    df = read_table(args.input)
+    with step("extract_aspects", rows=len(df)):
+        candidates = extract_aspects(df, index)
+    write_table(candidates, args.output)
+    print(f"✅ {len(candidates)} aspect candidates from {len(df)} sentences saved to {args.output}")
+    write_report("aspect_index")
@@ -0,0 +1,192 @@
+# aspect_matcher.py
+# ---------------------
+# Nearest-canonical-aspect normalisation for features REVERSE_MAP misses.
+#
+# normalize_feature only maps exact synonyms, so "batery", "battery charge"
+# or "screens" each become an aspect of their own. AspectMatcher compares
+# every distinct clean_feature against the ASPECT_SYNONYMS phrases as
+# character 3-gram TF-IDF vectors (words padded with spaces, IDF over the
+# reference phrases) and maps it to the aspect of its most similar phrase
+# when the cosine similarity reaches the threshold and every word of the
+# feature is a word of that aspect's phrases (up to a plural / -d / -ed
+# ending, or a one-letter typo in words of five letters or more); otherwise
+# the feature is kept, exactly as normalize_feature would. 3-grams the
+# references never use still count towards a feature's norm, so unrelated
+# words score low. The word check keeps look-alikes such as "book",
+# "stylus", "speed dial" or "speakerphone" from being pulled onto an aspect.
+#
+# All distinct features not seen before are scored in one sparse matrix
+# product. Mappings are cached in output/cache/aspect_map.json, keyed by the
+# threshold and reference vocabulary, so later runs and chunks only score
+# features they have not met.
+#
+#   python aspect_matcher.py --input output/cleaned_reviews.csv --threshold 0.6
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from aspects import ASPECT_SYNONYMS, REVERSE_MAP
+from instrumentation import step, write_report
+from storage import fingerprint, read_table, stage_path
+
+NGRAM = 3
+DEFAULT_THRESHOLD = 0.6
+INFLECTIONS = ("s", "es", "d", "ed")
+ASPECT_MAP_PATH = "output/cache/aspect_map.json"
+
+
+def char_ngrams(text, n=NGRAM):
+    padded = f" {text} "
+    return [padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))]
+
+
+def same_word(word, reference):
+    # Equal, an inflected form (screens, priced, batteries), or a one-letter typo of a long word
+    if word == reference:
+        return True
+    short, long = sorted([word, reference], key=len)
+    if long[len(short):] in INFLECTIONS and long.startswith(short):
+        return True
+    if short.endswith("y") and long == short[:-1] + "ies":
+        return True
+    if len(short) < 5 or len(long) - len(short) > 1:
+        return False
+    # At most one substitution, insertion or deletion
+    i = 0
+    while i < len(short) and short[i] == long[i]:
+        i += 1
+    offset = len(long) - len(short)
+    return short[i + 1 - offset:] == long[i + 1:]
+
+
+class AspectMatcher:
+    def __init__(self, threshold=DEFAULT_THRESHOLD, synonyms=ASPECT_SYNONYMS, cache_path=ASPECT_MAP_PATH):
+        self.threshold = threshold
+        self.cache_path = cache_path
+        refs = {phrase: aspect for aspect, words in synonyms.items() for phrase in [aspect] + words}
+        self.phrases = list(refs)
+        self.phrase_aspects = np.array(list(refs.values()), dtype=object)
+        self.aspect_words = {}
+        for phrase, aspect in refs.items():
+            self.aspect_words.setdefault(aspect, set()).update(phrase.split())
+
+        # IDF over the reference phrases (smoothed); unseen 3-grams get the df=0 weight
+        doc_freq = Counter(gram for phrase in self.phrases for gram in set(char_ngrams(phrase)))
+        self.vocab = {gram: i for i, gram in enumerate(sorted(doc_freq))}
+        n = len(self.phrases)
+        self.idf = np.log((1 + n) / (1 + np.array([doc_freq[g] for g in self.vocab], dtype=float))) + 1
+        self.unseen_idf = np.log(1 + n) + 1
+        self.reference = self.vectorize(self.phrases)
+
+        self.settings = fingerprint(NGRAM, threshold, sorted(refs.items()), INFLECTIONS)
+        self.mapping = {}
+        self.scores = {}
+        self._dirty = False
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("settings") == self.settings:
+                self.mapping = cached["mapping"]
+
+    def vectorize(self, texts):
+        # L2-normalised TF-IDF rows as a CSR matrix over the reference vocabulary
+        try:
+            from scipy.sparse import csr_matrix
+        except ImportError as e:
+            raise ImportError("AspectMatcher needs scipy: pip install scipy") from e
+
+        rows, cols, counts = [], [], []
+        unseen = np.zeros(len(texts))
+        vocab = self.vocab
+        for i, text in enumerate(texts):
+            for gram, tf in Counter(char_ngrams(text)).items():
+                j = vocab.get(gram)
+                if j is None:
+                    unseen[i] += (tf * self.unseen_idf) ** 2
+                else:
+                    rows.append(i)
+                    cols.append(j)
+                    counts.append(tf)
+        rows = np.array(rows, dtype=np.int64)
+        weights = np.array(counts, dtype=float) * self.idf[np.array(cols, dtype=np.int64)]
+        norms = np.sqrt(np.bincount(rows, weights ** 2, minlength=len(texts)) + unseen)
+        weights /= norms[rows]
+        return csr_matrix((weights, (rows, cols)), shape=(len(texts), len(vocab)))
+
+    def nearest(self, features):
+        # (aspect of the most similar reference phrase, cosine similarity) per feature
+        if not features:
+            return np.array([], dtype=object), np.array([])
+        similarity = (self.vectorize(features) @ self.reference.T).toarray()
+        best = similarity.argmax(axis=1)
+        return self.phrase_aspects[best], similarity[np.arange(len(features)), best]
+
+    def words_match(self, feature, aspect):
+        words = self.aspect_words[aspect]
+        return all(any(same_word(w, ref) for ref in words) for w in feature.split())
+
+    def match(self, features):
+        # {feature: aspect} for distinct strings; only features not cached are scored
+        missing = [f for f in dict.fromkeys(features) if f not in self.mapping]
+        if missing:
+            aspects, scores = self.nearest(missing)
+            for feature, aspect, score in zip(missing, aspects, scores):
+                exact = REVERSE_MAP.get(feature)
+                similar = score >= self.threshold and self.words_match(feature, aspect)
+                self.mapping[feature] = exact or (aspect if similar else feature)
+                self.scores[feature] = float(score)
+            self._dirty = True
+        return {f: self.mapping[f] for f in features}
+
+    def normalize_series(self, features):
+        # Drop-in for preprocess.normalize_feature_series: one lookup per distinct value
+        features = pd.Series(features)
+        codes, uniques = pd.factorize(features)
+        lowered = [u.lower() if isinstance(u, str) else u for u in uniques]
+        mapping = self.match([u for u in lowered if isinstance(u, str)])
+        mapped = np.array([mapping.get(u, u) if isinstance(u, str) else u for u in lowered] + [np.nan],
+                          dtype=object)
+        return pd.Series(mapped[codes], index=features.index, dtype=object)
+
+    def save(self):
+        if not self._dirty or not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            json.dump({"settings": self.settings, "mapping": self.mapping}, f)
+        self._dirty = False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Map clean features onto the nearest canonical aspect")
+    parser.add_argument("--input", default=stage_path("cleaned_reviews"))
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Minimum cosine similarity")
+    parser.add_argument("--show", type=int, default=20, help="Print this many of the most frequent remapped features")
+    args = parser.parse_args()
+
+    features = read_table(args.input, columns=["clean_feature"])["clean_feature"].dropna()
+    counts = features.str.lower().value_counts()
+    matcher = AspectMatcher(args.threshold)
+    start = time.perf_counter()
+    with step("match", rows=len(counts)):
+        mapping = matcher.match(list(counts.index))
+    elapsed = time.perf_counter() - start
+    matcher.save()
+
+    exact = counts.index.map(lambda f: REVERSE_MAP.get(f, f))
+    fuzzy = counts.index.map(mapping)
+    changed = counts[exact != fuzzy]
+    print(f"🧭 {len(counts)} distinct features matched in {elapsed:.2f}s")
+    print(f"🏷️ Aspects: {exact.nunique()} exact-only -> {fuzzy.nunique()} with threshold {args.threshold}")
+    print(f"🔀 {len(changed)} features ({changed.sum()} rows) remapped onto a canonical aspect")
+    for feature, n in changed.head(args.show).items():
+        score = matcher.scores.get(feature)
+        print(f"   {feature!r} -> {mapping[feature]} ({n} rows" + (f", {score:.2f})" if score is not None else ")"))
+    print(f"💾 Mapping cached in {matcher.cache_path}")
+    write_report("aspect_matcher")
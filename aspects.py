@@ -0,0 +1,21 @@
+# aspects.py
+# ---------------------
+# Canonical aspect vocabulary shared by preprocessing and relation mapping.
+
+# ----------------------------
+# Aspect Synonym Dictionary
+# ----------------------------
+ASPECT_SYNONYMS = {
+    "battery": ["battery", "battery life", "battery backup", "batteries"],
+    "screen": ["screen", "display", "lcd", "monitor"],
+    "sound": ["sound", "audio", "speaker", "volume"],
+    "camera": ["camera", "photo", "image", "pictures"],
+    "price": ["price", "cost", "value", "worth"],
+    "performance": ["performance", "speed", "slow", "fast"],
+    "memory": ["memory", "storage", "ram", "space"],
+    "connectivity": ["wifi", "bluetooth", "connection", "connectivity"],
+    "size": ["size", "weight", "dimension"],
+    "design": ["design", "look", "build", "style"]
+}
+
+REVERSE_MAP = {word: aspect for aspect, words in ASPECT_SYNONYMS.items() for word in words}
@@ -0,0 +1,66 @@
+# benchmarks/bench_aspect_index.py
+# ---------------------
+# Aspect-extraction throughput as the phrase vocabulary grows.
+#
+# Scans N synthetic sentences with the ASPECT_SYNONYMS index and with the
+# same index padded by thousands of extra (never matching) phrases. The
+# automaton's cost should stay flat; a per-phrase regex alternation is timed
+# alongside for reference on a smaller sample.
+#
+#   python -m benchmarks.bench_aspect_index --rows 1000000 --extra 0 1000 10000
+
+import argparse
+import random
+import re
+import time
+
+import pandas as pd
+
+from aspect_index import AspectIndex, extract_aspects
+from benchmarks.synthetic_corpus import make_sentence
+from preprocess import clean_text_series
+
+
+def padded_index(extra, seed=0):
+    rng = random.Random(seed)
+    index = AspectIndex.from_synonyms()
+    letters = "bcdfghjklmnpqrstvwxz"
+    for i in range(extra):
+        words = ["".join(rng.choice(letters) for _ in range(6)) for _ in range(rng.randint(1, 3))]
+        index.add(" ".join(words), f"extra_{i}")
+    return index.compile()
+
+
+def regex_scan(sentences, index):
+    # One alternation over every phrase, longest first: the usual non-automaton approach
+    phrases = sorted((" ".join(words) for words in index.phrases), key=len, reverse=True)
+    pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, phrases)) + r")\b")
+    return sum(len(pattern.findall(s)) for s in sentences)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--extra", type=int, nargs="+", default=[0, 1000, 10000])
+    parser.add_argument("--regex-rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    sentences = [f"{make_sentence(rng)[0]} model {rng.randrange(10 ** 6)}" for _ in range(args.rows)]
+    df = pd.DataFrame({"domain": "bench", "sentence": sentences})
+    df["clean_sentence"] = clean_text_series(df["sentence"])
+    print(f"📏 {len(df)} sentences, {df['clean_sentence'].nunique()} distinct")
+
+    print(f"{'phrases':>9}{'seconds':>10}{'sent/s':>12}{'candidates':>12}{'regex s*':>10}")
+    for extra in args.extra:
+        index = padded_index(extra)
+        start = time.perf_counter()
+        candidates = extract_aspects(df, index)
+        elapsed = time.perf_counter() - start
+
+        sample = df["clean_sentence"].head(args.regex_rows).tolist()
+        start = time.perf_counter()
+        regex_scan(sample, index)
+        regex_elapsed = (time.perf_counter() - start) * len(df) / max(len(sample), 1)
+        print(f"{len(index):>9}{elapsed:>10.2f}{len(df) / elapsed:>12.0f}{len(candidates):>12}{regex_elapsed:>10.2f}")
+    print(f"* regex time extrapolated from {args.regex_rows} sentences")
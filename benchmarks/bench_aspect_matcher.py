@@ -0,0 +1,66 @@
+# benchmarks/bench_aspect_matcher.py
+# ---------------------
+# Bulk vs one-at-a-time nearest-aspect matching of distinct features.
+#
+# Builds N distinct synthetic features (misspelt and extended synonyms mixed
+# with random words) and times AspectMatcher.match over all of them, the
+# same call again from the cache, and nearest() called per feature on a
+# sample (extrapolated). Both paths must pick the same aspect.
+#
+#   python -m benchmarks.bench_aspect_matcher --features 50000
+
+import argparse
+import random
+import time
+
+from aspect_matcher import AspectMatcher
+from aspects import REVERSE_MAP
+
+
+def make_features(n, seed=0):
+    rng = random.Random(seed)
+    synonyms = list(REVERSE_MAP)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    features = {}
+    while len(features) < n:
+        if rng.random() < 0.3:
+            word = rng.choice(synonyms)
+            i = rng.randrange(len(word))
+            word = word[:i] + word[i + 1:] if rng.random() < 0.5 else f"{word} {rng.choice(['quality', 'life', 'issue'])}"
+        else:
+            word = " ".join("".join(rng.choice(letters) for _ in range(rng.randint(3, 9)))
+                            for _ in range(rng.randint(1, 3)))
+        features[word] = None
+    return list(features)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--features", type=int, default=50_000)
+    parser.add_argument("--sample", type=int, default=2_000)
+    args = parser.parse_args()
+
+    features = make_features(args.features)
+    matcher = AspectMatcher(cache_path=None)
+
+    start = time.perf_counter()
+    mapping = matcher.match(features)
+    bulk = time.perf_counter() - start
+    start = time.perf_counter()
+    matcher.match(features)
+    cached = time.perf_counter() - start
+
+    sample = features[:args.sample]
+    start = time.perf_counter()
+    single = [matcher.nearest([f]) for f in sample]
+    one_by_one = (time.perf_counter() - start) * len(features) / max(len(sample), 1)
+
+    bulk_aspects, _ = matcher.nearest(sample)
+    identical = all(a[0] == b for (a, _), b in zip(single, bulk_aspects))
+    remapped = sum(mapping[f] != REVERSE_MAP.get(f, f) for f in features)
+    print(f"📏 {len(features)} distinct features, {remapped} mapped onto a canonical aspect")
+    print(f"{'bulk s':>10}{'cached s':>10}{'single s*':>11}{'features/s':>12}{'identical':>11}")
+    print(f"{bulk:>10.2f}{cached:>10.3f}{one_by_one:>11.2f}{len(features) / bulk:>12.0f}{str(identical):>11}")
+    print(f"* extrapolated from {len(sample)} features")
+    if not identical:
+        raise SystemExit("❌ Bulk and per-feature matching disagree")
@@ -0,0 +1,79 @@
+# benchmarks/bench_backends.py
+# ---------------------
+# Accuracy-vs-throughput report for the relation-mapper backends.
+#
+# Every candidate (backend, checkpoint) classifies the same sample of
+# output/cleaned_reviews.csv; its labels are compared with the reference
+# (torch backend on facebook/bart-large-mnli) the same way comparison.py
+# compares the rule and BERT mappers: agreement rate plus confusion matrix.
+#
+#   python -m benchmarks.bench_backends --rows 1000 \
+#       --candidate int8 --candidate onnx --candidate torch:models/distil-nli
+
+import argparse
+import os
+import time
+
+import pandas as pd
+from sklearn.metrics import confusion_matrix
+
+from RMmodel_base import load_model_input, bert_based_relation_mapping
+from zero_shot import ZeroShotEngine, DEFAULT_MODEL, SENTIMENT_LABELS
+
+
+def run_candidate(df, backend, model, batch_size):
+    engine = ZeroShotEngine(model, batch_size=batch_size, backend=backend)
+    start = time.perf_counter()
+    result = bert_based_relation_mapping(df, engine)
+    return result, time.perf_counter() - start
+
+
+def parse_candidate(spec, default_model):
+    # "int8" -> (int8, default model); "torch:path/to/ckpt" -> (torch, path/to/ckpt)
+    backend, _, model = spec.partition(":")
+    return backend, model or default_model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default="output/cleaned_reviews.csv")
+    parser.add_argument("--reference-model", default=DEFAULT_MODEL)
+    parser.add_argument("--candidate", action="append", default=None,
+                        help="backend[:model], repeatable (default: int8 and onnx)")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--output", default="output/backend_report.csv")
+    args = parser.parse_args()
+
+    df = load_model_input(args.input).head(args.rows)
+    candidates = [parse_candidate(c, args.reference_model) for c in (args.candidate or ["int8", "onnx"])]
+
+    print(f"🔍 Reference: torch / {args.reference_model} on {len(df)} rows")
+    reference, ref_time = run_candidate(df, "torch", args.reference_model, args.batch_size)
+    report = [{
+        "backend": "torch", "model": args.reference_model,
+        "rows_per_sec": round(len(df) / ref_time, 2), "speedup": 1.0, "agreement_rate": 1.0
+    }]
+
+    for backend, model in candidates:
+        print(f"\n⚙️ Candidate: {backend} / {model}")
+        result, elapsed = run_candidate(df, backend, model, args.batch_size)
+
+        agreement = (result["predicted_sentiment"].values == reference["predicted_sentiment"].values)
+        cm = confusion_matrix(reference["predicted_sentiment"], result["predicted_sentiment"],
+                              labels=SENTIMENT_LABELS)
+
+        print(f"🚀 {len(df) / elapsed:.1f} rows/sec ({ref_time / elapsed:.2f}x reference)")
+        print(f"📊 Agreement rate: {agreement.mean():.2%}")
+        print(pd.DataFrame(cm, index=[f"ref_{l}" for l in SENTIMENT_LABELS], columns=SENTIMENT_LABELS))
+
+        report.append({
+            "backend": backend, "model": model,
+            "rows_per_sec": round(len(df) / elapsed, 2),
+            "speedup": round(ref_time / elapsed, 2),
+            "agreement_rate": round(float(agreement.mean()), 4)
+        })
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    pd.DataFrame(report).to_csv(args.output, index=False)
+    print(f"\n✅ Backend report saved to {args.output}")
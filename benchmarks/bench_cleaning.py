@@ -0,0 +1,106 @@
+# benchmarks/bench_cleaning.py
+# ---------------------
+# Row-wise vs whole-column text cleaning and aspect normalisation.
+#
+# Builds N synthetic review rows (mostly distinct sentences, a realistic
+# repeat rate, mixed case and punctuation, plus a fixed set of edge cases:
+# non-ASCII letters and spaces, control characters, NaN, empty and
+# punctuation-only strings) and times
+#   .apply(clean_text) / .apply(normalize_feature)          (before)
+#   clean_text_series() / normalize_feature_series()        (after)
+# Every output column must be identical to the row-wise one, value for value.
+#
+#   python -m benchmarks.bench_cleaning --rows 1000000
+
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_corpus import make_sentence
+from preprocess import clean_text, clean_text_series, normalize_feature, normalize_feature_series
+from resources import get_stopwords
+
+EDGE_CASES = [
+    "", "   ", "!!!", "...?!", "The Screen, is GREAT!!", "battery-life\tis\n\nok",
+    "tab\x0bvert\x0cform\rfeed", "file\x1cgroup\x1dunit\x1e\x1fsep", "under_score and 123 numbers",
+    "Café crème — très bon", "naïve RÉSUMÉ", "non breaking spaces", "İstanbul ǅ ß",
+    "emoji 👍 works", "中文 评论 很好", "mixed​zero width", "  leading and trailing  ",
+    "the a an of and", "THE", "x" * 500,
+]
+
+
+def make_rows(n, duplicate_rate=0.2, seed=0):
+    rng = random.Random(seed)
+    sentences, features = [], []
+    for i in range(n):
+        if sentences and rng.random() < duplicate_rate:
+            j = rng.randrange(len(sentences))
+            sentences.append(sentences[j])
+            features.append(features[j])
+            continue
+        sentence, annotation = make_sentence(rng)
+        if rng.random() < 0.3:
+            sentence = sentence.capitalize()
+        sentence = f"{sentence} ( model {rng.randrange(10 ** 6)} )"  # keeps most sentences distinct
+        sentences.append(sentence)
+        features.append(annotation.split("[")[0].title() if rng.random() < 0.2 else annotation.split("[")[0])
+
+    edge = EDGE_CASES + [np.nan, None, 3.5]
+    for k, value in enumerate(edge):
+        position = (k * 7919) % max(n, 1)
+        sentences[position] = value
+        features[position] = value if isinstance(value, str) else features[position]
+    return pd.DataFrame({"sentence": sentences, "feature": features})
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    df = make_rows(args.rows, args.duplicate_rate, args.seed)
+    get_stopwords()  # load outside the timings
+    print(f"📏 {len(df)} rows, {df['sentence'].nunique()} distinct sentences, "
+          f"{df['feature'].nunique()} distinct features")
+
+    checks = [
+        ("clean_sentence",
+         lambda: df["sentence"].apply(lambda x: clean_text(x, True)),
+         lambda: clean_text_series(df["sentence"], True)),
+        ("clean_feature",
+         lambda: df["feature"].apply(lambda x: clean_text(x, remove_stopwords=False)),
+         lambda: clean_text_series(df["feature"], remove_stopwords=False)),
+    ]
+    clean_feature = None
+    failed = False
+    print(f"{'column':<16}{'apply s':>10}{'vector s':>10}{'speedup':>9}{'identical':>11}")
+    for name, before, after in checks + [("aspect", None, None)]:
+        if name == "aspect":
+            before = lambda: clean_feature.apply(normalize_feature)  # noqa: E731
+            after = lambda: normalize_feature_series(clean_feature)  # noqa: E731
+        expected, t_before = timed(before)
+        actual, t_after = timed(after)
+        if name == "clean_feature":
+            clean_feature = expected
+
+        identical = expected.index.equals(actual.index) and expected.tolist() == actual.tolist()
+        failed |= not identical
+        print(f"{name:<16}{t_before:>10.2f}{t_after:>10.2f}{t_before / t_after:>9.1f}{str(identical):>11}")
+        if not identical:
+            for i in np.flatnonzero(np.asarray(expected.tolist(), dtype=object) != np.asarray(actual.tolist(), dtype=object))[:5]:
+                print(f"   ❌ row {i}: {df.iloc[i].tolist()!r}: {expected.iloc[i]!r} != {actual.iloc[i]!r}")
+
+    if failed:
+        raise SystemExit("❌ Vectorized output differs from the row-wise functions")
+    print("✅ Vectorized cleaning matches clean_text / normalize_feature on every row")
@@ -0,0 +1,58 @@
+# benchmarks/bench_inference.py
+# ---------------------
+# Rows/sec of the original per-row zero-shot pipeline loop versus the batched,
+# deduplicated ZeroShotEngine on a sample of output/cleaned_reviews.csv.
+#
+#   python -m benchmarks.bench_inference --rows 500 --batch-size 32
+
+import argparse
+import time
+
+from transformers import pipeline
+
+from RMmodel_base import load_model_input, bert_based_relation_mapping
+from zero_shot import ZeroShotEngine, DEFAULT_MODEL, SENTIMENT_LABELS
+
+
+def legacy_loop(df, classifier):
+    # The loop RMmodel_base.py used to run: one pipeline call per row
+    results = []
+    for _, row in df.iterrows():
+        prediction = classifier(
+            sequences=row["clean_sentence"],
+            candidate_labels=SENTIMENT_LABELS,
+            hypothesis_template=f"The sentiment toward the {row['aspect']} is {{}}"
+        )
+        results.append((prediction["labels"][0], prediction["scores"][0]))
+    return results
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default="output/cleaned_reviews.csv")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    df = load_model_input(args.input).head(args.rows)
+    n_unique = len(set(zip(df["clean_sentence"], df["aspect"])))
+    print(f"📏 {len(df)} rows, {n_unique} unique (sentence, aspect) pairs")
+
+    classifier = pipeline("zero-shot-classification", model=args.model)
+    legacy, legacy_time = timed(legacy_loop, df, classifier)
+
+    engine = ZeroShotEngine(args.model, batch_size=args.batch_size)
+    batched, batched_time = timed(bert_based_relation_mapping, df, engine)
+
+    agree = sum(a == b for (a, _), b in zip(legacy, batched["predicted_sentiment"]))
+    print(f"🐢 per-row pipeline : {len(df) / legacy_time:8.1f} rows/sec ({legacy_time:.1f}s)")
+    print(f"🚀 batched engine   : {len(df) / batched_time:8.1f} rows/sec ({batched_time:.1f}s)")
+    print(f"⚡ speed-up         : {legacy_time / batched_time:.1f}x")
+    print(f"🤝 label agreement  : {agree / max(len(df), 1):.2%}")
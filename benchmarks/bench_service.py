@@ -0,0 +1,85 @@
+# benchmarks/bench_service.py
+# ---------------------
+# Load-test client for scoring_service.py.
+#
+# Opens --concurrency keep-alive connections and fires --requests single-review
+# requests drawn from output/cleaned_reviews.csv, then prints client-side
+# latency percentiles, throughput and the service's own /metrics.
+#
+#   python scoring_service.py --methods rule &
+#   python -m benchmarks.bench_service --method rule --concurrency 32 --requests 2000
+
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from storage import read_table
+
+
+async def http_call(reader, writer, method, path, payload=None):
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(host, port, jobs, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    while jobs:
+        payload = jobs.pop()
+        start = time.perf_counter()
+        status, _ = await http_call(reader, writer, "POST", "/score", payload)
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            errors.append(status)
+    writer.close()
+
+
+async def main(args):
+    df = read_table(args.input, columns=["sentence", "feature"]).dropna()
+    sample = df.sample(n=args.requests, replace=True, random_state=0)
+    jobs = [{"method": args.method, "reviews": [{"sentence": s, "aspects": [f]}]}
+            for s, f in zip(sample["sentence"], sample["feature"])]
+
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*[client(args.host, args.port, jobs, latencies, errors)
+                           for _ in range(args.concurrency)])
+    elapsed = time.perf_counter() - start
+
+    lat = np.array(latencies) * 1000
+    print(f"📨 {len(latencies)} requests, {len(errors)} errors, concurrency {args.concurrency}")
+    print(f"⏱️ p50 {np.percentile(lat, 50):.1f} ms | p99 {np.percentile(lat, 99):.1f} ms")
+    print(f"🚀 {len(latencies) / elapsed:.1f} requests/sec")
+
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    _, metrics = await http_call(reader, writer, "GET", "/metrics")
+    writer.close()
+    print("📊 Service metrics:", json.dumps(metrics.get(args.method, metrics), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--method", default="rule", choices=["rule", "bert"])
+    parser.add_argument("--input", default="output/cleaned_reviews.csv")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
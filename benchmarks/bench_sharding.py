@@ -0,0 +1,47 @@
+# benchmarks/bench_sharding.py
+# ---------------------
+# CPU scaling of sharded zero-shot inference at 1/2/4/8 worker processes.
+#
+# The model is loaded once; every worker count classifies the same distinct
+# (sentence, aspect) pairs with no prediction cache, and its labels must
+# match the single-process run exactly.
+#
+#   python -m benchmarks.bench_sharding --rows 2000 --workers 1 2 4 8
+
+import argparse
+import os
+import time
+
+from RMmodel_base import load_model_input
+from sharded_inference import default_threads
+from zero_shot import ZeroShotEngine, DEFAULT_MODEL
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default="output/cleaned_reviews.csv")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--backend", default="torch", choices=["torch", "int8"])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    df = load_model_input(args.input).head(args.rows)
+    pairs = list(dict.fromkeys(zip(df["clean_sentence"], df["aspect"])))
+    engine = ZeroShotEngine(args.model, batch_size=args.batch_size, backend=args.backend)
+    print(f"📏 {len(pairs)} distinct pairs, {os.cpu_count()} CPUs, model {args.model} ({args.backend})")
+
+    print(f"{'workers':>8}{'threads':>9}{'seconds':>10}{'pairs/s':>10}{'speedup':>9}{'identical':>11}")
+    baseline = None
+    for workers in args.workers:
+        engine.workers = workers
+        start = time.perf_counter()
+        labels = [label for label, _ in engine.predict(pairs)]
+        elapsed = time.perf_counter() - start
+
+        if baseline is None:
+            baseline = (labels, elapsed)
+        identical = labels == baseline[0]
+        threads = default_threads(workers) if workers > 1 else "default"
+        print(f"{workers:>8}{threads:>9}{elapsed:>10.2f}{len(pairs) / elapsed:>10.1f}"
+              f"{baseline[1] / elapsed:>9.2f}{str(identical):>11}")
@@ -0,0 +1,227 @@
+# benchmarks/bench_stages.py
+# ---------------------
+# Per-stage throughput, per-row latency and peak memory on a synthetic corpus.
+#
+# Stages run one after another, each in a freshly spawned interpreter so its
+# peak RSS is its own; inputs are read from the previous stage's files before
+# the clock starts. The classifier stage uses the tiny stand-in model from
+# benchmarks/tiny_model.py, so it measures the engine, not BART.
+#
+# Results go to a JSON file (one per run, tagged with the git commit);
+# --compare prints the ratio against an earlier run:
+#
+#   python -m benchmarks.bench_stages --sentences 200000
+#   python -m benchmarks.bench_stages --sentences 200000 --compare output/bench/stages-<old>.json
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+STAGES = ["ingest", "clean_text", "preprocess", "rule", "classifier", "aggregation", "comparison"]
+
+
+def peak_rss_mb():
+    # VmHWM is this process image's own high-water mark; ru_maxrss also counts the
+    # parent's memory at fork time. ru_maxrss is KiB on Linux, bytes on macOS
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# ---------- STAGES ---------- #
+# Each returns (rows processed, callable doing the timed work)
+
+def stage_ingest(work, args):
+    from ingest import ingest_reviews
+
+    def run():
+        return ingest_reviews(os.path.join(work, "corpus"), os.path.join(work, "combined.csv"),
+                              os.path.join(work, "ingest"), args.workers)
+    return None, run
+
+
+def stage_clean_text(work, args):
+    from preprocess import clean_text
+    from resources import get_stopwords
+
+    sentences = pd.read_csv(os.path.join(work, "combined.csv"), usecols=["sentence"])["sentence"].tolist()
+    get_stopwords()  # loading the corpus is startup, not per-row cost
+    return len(sentences), lambda: [clean_text(s) for s in sentences]
+
+
+def stage_preprocess(work, args):
+    from preprocess import preprocess_dataframe
+    from resources import get_nlp, get_stopwords
+
+    df = pd.read_csv(os.path.join(work, "combined.csv")).head(args.nlp_rows)
+    get_nlp(), get_stopwords()
+
+    def run():
+        out = preprocess_dataframe(df, batch_size=256)
+        out.to_pickle(os.path.join(work, "cleaned.pkl"))
+    return len(df), run
+
+
+def stage_rule(work, args):
+    from RMrule_base import rule_based_relation_mapping
+    from resources import get_nlp, get_opinion_lexicon
+
+    df = pd.read_pickle(os.path.join(work, "cleaned.pkl"))
+    get_nlp(), get_opinion_lexicon()
+    return len(df), lambda: rule_based_relation_mapping(df)
+
+
+def stage_classifier(work, args):
+    from RMmodel_base import bert_based_relation_mapping, filter_model_input
+    from zero_shot import ZeroShotEngine
+
+    df = filter_model_input(pd.read_pickle(os.path.join(work, "cleaned.pkl"))).head(args.model_rows)
+    engine = ZeroShotEngine(args.model, batch_size=args.batch_size)
+    return len(df), lambda: bert_based_relation_mapping(df, engine)
+
+
+def stage_aggregation(work, args):
+    from aggregates import SentimentAggregates
+
+    df = pd.read_csv(os.path.join(work, "combined.csv"), usecols=["domain", "feature", "sentiment"])
+    df = df.rename(columns={"feature": "aspect"})
+    return len(df), lambda: SentimentAggregates().update(df).summary()
+
+
+def stage_comparison(work, args):
+    from comparison import compare_mappings
+
+    df = pd.read_csv(os.path.join(work, "combined.csv"), usecols=["row_id", "sentence", "feature", "sentiment"])
+    df = df.rename(columns={"sentence": "clean_sentence", "feature": "aspect"})
+    # The "BERT" side disagrees on a fixed share of rows
+    flipped = df["sentiment"].where(df.index % 7 != 0, "neutral")
+    bert = df.assign(predicted_sentiment=flipped).drop(columns="sentiment")
+    return len(df), lambda: compare_mappings(df, bert)
+
+
+def run_stage(stage, work, args, queue):
+    setup = globals()[f"stage_{stage}"]
+    rows, fn = setup(work, args)
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    if rows is None:
+        rows = result["rows"]  # ingest reports how many rows it wrote
+    queue.put({
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(rows / seconds, 1) if seconds > 0 else None,
+        "us_per_row": round(seconds / rows * 1e6, 2) if rows else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "peak_rss_growth_mb": round(peak_rss_mb() - rss_before, 1),
+    })
+
+
+def run_isolated(stage, work, args):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=run_stage, args=(stage, work, args, queue))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"stage '{stage}' failed (exit code {process.exitcode})")
+    return queue.get()
+
+
+def compare_reports(old, new):
+    print(f"\n{'stage':<13}{'old rows/s':>13}{'new rows/s':>13}{'speedup':>9}{'old MB':>9}{'new MB':>9}")
+    for stage, now in new["stages"].items():
+        before = old["stages"].get(stage)
+        if not before or not before.get("rows_per_sec") or not now.get("rows_per_sec"):
+            continue
+        print(f"{stage:<13}{before['rows_per_sec']:>13.1f}{now['rows_per_sec']:>13.1f}"
+              f"{now['rows_per_sec'] / before['rows_per_sec']:>9.2f}"
+              f"{before['peak_rss_mb']:>9.1f}{now['peak_rss_mb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    from benchmarks.synthetic_corpus import generate_corpus
+    from benchmarks.tiny_model import TINY_MODEL_DIR, build_tiny_model
+
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage on a synthetic corpus")
+    parser.add_argument("--sentences", type=int, default=100_000)
+    parser.add_argument("--nlp-rows", type=int, default=20_000, help="Rows sent through spaCy (preprocess, rule)")
+    parser.add_argument("--model-rows", type=int, default=5_000, help="Rows sent to the classifier")
+    parser.add_argument("--model", default=None, help=f"Classifier checkpoint (default: tiny model in {TINY_MODEL_DIR})")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=None, help="Ingest processes")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--workdir", default="output/bench/work")
+    parser.add_argument("--output", default=None, help="JSON report path (default: output/bench/stages-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier JSON report to compare against")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    commit = git_commit()
+    work = os.path.abspath(args.workdir)
+    corpus = os.path.join(work, "corpus")
+    marker = os.path.join(work, "corpus.json")
+    corpus_settings = {"sentences": args.sentences, "seed": args.seed}
+    existing = None
+    if os.path.exists(marker):
+        with open(marker, encoding="utf-8") as f:
+            existing = json.load(f)
+    if existing != corpus_settings:
+        print(f"📝 Generating {args.sentences} sentences into {corpus}")
+        shutil.rmtree(corpus, ignore_errors=True)
+        generate_corpus(corpus, args.sentences, seed=args.seed)
+        with open(marker, "w", encoding="utf-8") as f:
+            json.dump(corpus_settings, f)
+    if "classifier" in args.stages and args.model is None:
+        args.model = build_tiny_model()
+
+    report = {
+        "meta": {
+            "commit": commit, "python": platform.python_version(), "platform": platform.platform(),
+            "cpu_count": os.cpu_count(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "sentences": args.sentences, "nlp_rows": args.nlp_rows, "model_rows": args.model_rows,
+            "model": args.model, "seed": args.seed,
+        },
+        "stages": {},
+    }
+
+    print(f"{'stage':<13}{'rows':>10}{'seconds':>10}{'rows/s':>12}{'µs/row':>10}{'peak MB':>10}")
+    for stage in args.stages:
+        stats = run_isolated(stage, work, args)
+        report["stages"][stage] = stats
+        print(f"{stage:<13}{stats['rows']:>10}{stats['seconds']:>10.3f}{stats['rows_per_sec'] or 0:>12.1f}"
+              f"{stats['us_per_row'] or 0:>10.2f}{stats['peak_rss_mb']:>10.1f}")
+
+    output = args.output or f"output/bench/stages-{commit}.json"
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Report saved to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare_reports(json.load(f), report)
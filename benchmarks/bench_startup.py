@@ -0,0 +1,76 @@
+# benchmarks/bench_startup.py
+# ---------------------
+# Cold-start cost of the pipeline modules.
+#
+# Each module is imported in a fresh interpreter (so nothing is already in
+# sys.modules) and timed; "first use" then loads the resource that module
+# actually needs through the registry. With --baseline <git ref> the same
+# imports are timed against that revision, extracted to a temp directory.
+#
+#   python -m benchmarks.bench_startup --repeat 3 --first-use
+#   python -m benchmarks.bench_startup --baseline HEAD~1
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+MODULES = ["preprocess", "RMrule_base", "zero_shot", "RMmodel_base", "pipeline",
+           "scoring_service", "comparison", "EDA", "opinion"]
+
+# module -> statement that performs its first real unit of work
+FIRST_USE = {
+    "preprocess": "resources.get_nlp(); resources.get_stopwords()",
+    "RMrule_base": "resources.get_nlp(); resources.get_opinion_lexicon()",
+}
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_in_subprocess(code, cwd):
+    # Prints the elapsed seconds of `code`, measured inside a fresh interpreter
+    script = f"import time; t = time.perf_counter()\n{code}\nprint(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-c", script], cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def best_of(code, cwd, repeat):
+    times = [time_in_subprocess(code, cwd) for _ in range(repeat)]
+    return None if None in times else min(times)
+
+
+def checkout(ref, dest):
+    archive = subprocess.run(["git", "archive", ref], cwd=ROOT, capture_output=True, check=True)
+    subprocess.run(["tar", "-x", "-C", dest], input=archive.stdout, check=True)
+
+
+def fmt(seconds):
+    return "failed" if seconds is None else f"{seconds:.3f}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--first-use", action="store_true", help="Also time the first model/lexicon load")
+    parser.add_argument("--baseline", default=None, help="Git ref to compare import times against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.baseline:
+            checkout(args.baseline, tmp)
+
+        print(f"{'module':<18}{'import (s)':>12}" + (f"{args.baseline + ' (s)':>16}" if args.baseline else ""))
+        for module in MODULES:
+            current = best_of(f"import {module}", ROOT, args.repeat)
+            line = f"{module:<18}{fmt(current):>12}"
+            if args.baseline:
+                line += f"{fmt(best_of(f'import {module}', tmp, args.repeat)):>16}"
+            print(line)
+
+    if args.first_use:
+        print(f"\n{'first use':<18}{'load (s)':>12}")
+        for module, code in FIRST_USE.items():
+            print(f"{module:<18}{fmt(best_of(f'import {module}, resources; {code}', ROOT, args.repeat)):>12}")
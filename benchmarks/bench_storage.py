@@ -0,0 +1,43 @@
+# benchmarks/bench_storage.py
+# ---------------------
+# File size and load time of the CSV hand-off versus the typed Parquet format.
+#
+#   python -m benchmarks.bench_storage --input output/cleaned_reviews.csv --repeat 5
+
+import argparse
+import os
+import tempfile
+import time
+
+from storage import read_table, write_table
+
+PROJECTION = ["domain", "clean_sentence", "aspect"]  # what the relation mappers read
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default="output/cleaned_reviews.csv")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    df = read_table(args.input)
+    print(f"📏 {len(df)} rows x {len(df.columns)} columns from {args.input}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'format':<10}{'size (KB)':>12}{'full load (s)':>16}{'projected (s)':>16}")
+        for fmt in ["csv", "parquet"]:
+            path = os.path.join(tmp, f"cleaned_reviews.{fmt}")
+            write_table(df, path)
+            size_kb = os.path.getsize(path) / 1024
+            full = best_of(lambda: read_table(path), args.repeat)
+            projected = best_of(lambda: read_table(path, columns=PROJECTION), args.repeat)
+            print(f"{fmt:<10}{size_kb:>12.1f}{full:>16.4f}{projected:>16.4f}")
@@ -0,0 +1,108 @@
+# benchmarks/synthetic_corpus.py
+# ---------------------
+# Generates review corpora of any size in the layout ingest.py reads:
+#
+#   <out>/<dataset>/<product>.txt
+#     [t]review title
+#     ##the battery life is great but the screen is dim .
+#     battery life[+2], screen[-1]
+#
+# Sentences mix aspect words from aspects.py (synonyms included, so
+# normalisation has work to do), lexicon-style opinion adjectives, filler and
+# punctuation. A share of sentences repeats earlier ones, as real review
+# dumps do. Output is deterministic for a given --seed.
+#
+#   python -m benchmarks.synthetic_corpus --sentences 1000000 --out output/bench/corpus
+
+import argparse
+import os
+import random
+
+from aspects import ASPECT_SYNONYMS
+
+POSITIVE = ["great", "good", "excellent", "amazing", "sharp", "fast", "reliable", "bright", "solid", "nice"]
+NEGATIVE = ["bad", "poor", "terrible", "slow", "weak", "dim", "flimsy", "awful", "noisy", "cheap"]
+NEUTRAL = ["small", "new", "black", "second", "standard", "usual", "plastic", "main"]
+FILLER = ["i think", "honestly", "after a week", "for the price", "overall", "to be fair", "again"]
+
+TEMPLATES = [
+    "the {feature} is {adj}",
+    "{filler} , the {feature} is really {adj}",
+    "i found the {feature} {adj} and {adj2}",
+    "{adj} {feature} !",
+    "the {feature} seems {adj} {filler}",
+    "this phone has a {adj} {feature} , which is {adj2}",
+]
+
+
+def make_sentence(rng):
+    n_aspects = 1 if rng.random() < 0.7 else 2
+    clauses, annotations = [], []
+    for _ in range(n_aspects):
+        aspect = rng.choice(list(ASPECT_SYNONYMS))
+        feature = rng.choice(ASPECT_SYNONYMS[aspect])
+        polarity = rng.choice("+-")
+        words = POSITIVE if polarity == "+" else NEGATIVE
+        adj = rng.choice(words if rng.random() < 0.8 else NEUTRAL)
+        clauses.append(rng.choice(TEMPLATES).format(
+            feature=feature, adj=adj, adj2=rng.choice(words), filler=rng.choice(FILLER)
+        ))
+        annotations.append(f"{feature}[{polarity}{rng.randint(1, 3)}]")
+    return " but ".join(clauses) + " .", ", ".join(annotations)
+
+
+def generate_corpus(out_dir, sentences, datasets=4, files_per_dataset=5, duplicate_rate=0.1,
+                    sentences_per_review=8, seed=0):
+    # Returns the number of annotated sentences written
+    rng = random.Random(seed)
+    n_files = datasets * files_per_dataset
+    written = 0
+    history = []
+    for d in range(datasets):
+        folder = os.path.join(out_dir, f"dataset_{d:02d}")
+        os.makedirs(folder, exist_ok=True)
+        for f in range(files_per_dataset):
+            index = d * files_per_dataset + f
+            # Spread the remainder over the first files
+            count = sentences // n_files + (1 if index < sentences % n_files else 0)
+            with open(os.path.join(folder, f"product_{index:03d}.txt"), "w", encoding="utf-8") as out:
+                out.write("*** synthetic review data\n")
+                for i in range(count):
+                    if i % sentences_per_review == 0:
+                        out.write(f"[t]review {i // sentences_per_review}\n")
+                    if history and rng.random() < duplicate_rate:
+                        sentence, annotation = rng.choice(history)
+                    else:
+                        sentence, annotation = make_sentence(rng)
+                        if len(history) < 10_000:
+                            history.append((sentence, annotation))
+                    out.write(f"##{sentence}\n{annotation}\n")
+            written += count
+    return written
+
+
+def corpus_vocabulary():
+    # Every word the generator can emit, for building a matching stand-in tokenizer
+    words = set()
+    for phrases in [POSITIVE, NEGATIVE, NEUTRAL, FILLER, TEMPLATES]:
+        for phrase in phrases:
+            words.update(phrase.replace("{", " ").replace("}", " ").split())
+    for aspect, synonyms in ASPECT_SYNONYMS.items():
+        for phrase in [aspect] + synonyms:
+            words.update(phrase.split())
+    return words
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic annotated review corpus")
+    parser.add_argument("--out", default="output/bench/corpus")
+    parser.add_argument("--sentences", type=int, default=100_000)
+    parser.add_argument("--datasets", type=int, default=4)
+    parser.add_argument("--files-per-dataset", type=int, default=5)
+    parser.add_argument("--duplicate-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    n = generate_corpus(args.out, args.sentences, args.datasets, args.files_per_dataset,
+                        args.duplicate_rate, seed=args.seed)
+    print(f"📝 Wrote {n} annotated sentences to {args.out}")
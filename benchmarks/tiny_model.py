@@ -0,0 +1,54 @@
+# benchmarks/tiny_model.py
+# ---------------------
+# A tiny, randomly initialised NLI checkpoint for benchmarking offline.
+#
+# It has the same interface as facebook/bart-large-mnli (BART sequence
+# classifier with contradiction/neutral/entailment heads) but only a few
+# thousand parameters and a word-level tokenizer over the synthetic corpus
+# vocabulary. Its labels are meaningless: it measures the overhead around the
+# model (tokenisation, batching, dedup, caching), not accuracy or the cost of
+# the real model.
+
+import os
+
+from benchmarks.synthetic_corpus import corpus_vocabulary
+from zero_shot import HYPOTHESIS_TEMPLATE, SENTIMENT_LABELS
+
+TINY_MODEL_DIR = "output/bench/tiny-nli"
+
+
+def build_tiny_model(path=TINY_MODEL_DIR, extra_words=(), seed=0):
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors
+    from transformers import BartConfig, BartForSequenceClassification, PreTrainedTokenizerFast
+
+    if os.path.exists(os.path.join(path, "config.json")):
+        return path
+
+    words = corpus_vocabulary() | set(extra_words)
+    words.update(HYPOTHESIS_TEMPLATE.replace("{", " ").replace("}", " ").lower().split())
+    words.update(SENTIMENT_LABELS)
+    vocab = {"<s>": 0, "<pad>": 1, "</s>": 2, "<unk>": 3}
+    for word in sorted(words):
+        vocab.setdefault(word, len(vocab))
+
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="<s> $A </s>", pair="<s> $A </s> </s> $B </s>",
+        special_tokens=[("<s>", 0), ("</s>", 2)]
+    )
+    PreTrainedTokenizerFast(tokenizer_object=tokenizer, bos_token="<s>", eos_token="</s>",
+                            pad_token="<pad>", unk_token="<unk>").save_pretrained(path)
+
+    torch.manual_seed(seed)
+    config = BartConfig(
+        vocab_size=len(vocab), d_model=32, encoder_layers=1, decoder_layers=1,
+        encoder_attention_heads=2, decoder_attention_heads=2, encoder_ffn_dim=64, decoder_ffn_dim=64,
+        max_position_embeddings=512, num_labels=3,
+        id2label={0: "contradiction", 1: "neutral", 2: "entailment"},
+        label2id={"contradiction": 0, "neutral": 1, "entailment": 2},
+        pad_token_id=1, bos_token_id=0, eos_token_id=2, decoder_start_token_id=2
+    )
+    BartForSequenceClassification(config).save_pretrained(path)
+    return path
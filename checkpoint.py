@@ -0,0 +1,111 @@
+# checkpoint.py
+# ---------------------
+# Crash-resumable, chunked stage runs: relation mapping, and preprocess.py's
+# out-of-core mode.
+#
+# The input table is read chunk_rows rows at a time. Each chunk's result is
+# written to its own file under output/checkpoints/<name>/ and only then
+# recorded in manifest.json (both via atomic rename), so a killed run loses
+# at most the chunk in progress. On restart, chunks already in the manifest
+# are skipped. When every chunk is done they are compacted, in input order,
+# into the final output file (relation_mapping_*, cleaned_reviews).
+#
+# The manifest carries a fingerprint of the input file and the mapper
+# settings; a checkpoint left by a different input, model or chunk size is
+# discarded instead of resumed.
+#
+# Memory holds one input chunk and one result chunk at a time.
+
+import json
+import os
+import shutil
+
+from instrumentation import step
+from storage import FORMATS, concat_tables, file_digest, fingerprint, iter_table, read_table, write_table
+
+CHECKPOINT_DIR = "output/checkpoints"
+DEFAULT_CHUNK_ROWS = 10_000
+_MANIFEST = "manifest.json"
+
+
+class ChunkCheckpoint:
+    def __init__(self, name, run_fingerprint, ext, folder=CHECKPOINT_DIR):
+        self.path = os.path.join(folder, name)
+        self.ext = ext
+        self.fingerprint = run_fingerprint
+        self.manifest = self._load()
+        if self.manifest.get("fingerprint") != run_fingerprint:
+            self.reset()
+
+    def _load(self):
+        path = os.path.join(self.path, _MANIFEST)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save(self):
+        tmp = os.path.join(self.path, _MANIFEST + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, os.path.join(self.path, _MANIFEST))
+
+    def reset(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.makedirs(self.path, exist_ok=True)
+        self.manifest = {"fingerprint": self.fingerprint, "chunks": []}
+        self._save()
+
+    def completed(self):
+        # {start row: chunk entry}
+        return {chunk["start"]: chunk for chunk in self.manifest["chunks"]}
+
+    def commit(self, start, end, df):
+        name = f"chunk-{start:012d}{self.ext}"
+        tmp = os.path.join(self.path, f"tmp-{name}")
+        write_table(df, tmp)
+        os.replace(tmp, os.path.join(self.path, name))
+        self.manifest["chunks"].append({"start": start, "end": end, "rows": len(df), "file": name})
+        self._save()
+
+    def compact(self, output_path, keep=False):
+        chunks = sorted(self.manifest["chunks"], key=lambda chunk: chunk["start"])
+        root, ext = os.path.splitext(output_path)
+        tmp = f"{root}.tmp{ext}"  # keeps the extension, which selects the format
+        concat_tables([os.path.join(self.path, chunk["file"]) for chunk in chunks], tmp)
+        os.replace(tmp, output_path)
+        if not keep:
+            shutil.rmtree(self.path, ignore_errors=True)
+        return sum(chunk["rows"] for chunk in chunks)
+
+
+def run_chunked(name, input_path, output_path, map_chunk, settings, columns=None,
+                chunk_rows=DEFAULT_CHUNK_ROWS, restart=False, keep_chunks=False):
+    # map_chunk(input DataFrame) -> output DataFrame; it must treat rows independently,
+    # so that the compacted chunks equal a single pass over the whole input
+    ext = os.path.splitext(output_path)[1] or FORMATS["csv"]
+    run_fingerprint = fingerprint(file_digest(input_path), columns, settings, chunk_rows, ext)
+    checkpoint = ChunkCheckpoint(name, run_fingerprint, ext)
+    if restart:
+        checkpoint.reset()
+
+    completed = checkpoint.completed()
+    if completed:
+        print(f"♻️ Resuming {name}: {len(completed)} chunks already done")
+
+    start = 0
+    for chunk in iter_table(input_path, columns, chunk_rows):
+        end = start + len(chunk)
+        if start not in completed:
+            with step("chunk", rows=len(chunk)):
+                checkpoint.commit(start, end, map_chunk(chunk))
+            print(f"💾 {name}: rows {start}-{end} committed")
+        start = end
+    if start == 0 and not completed:
+        # Empty input: still write the mapper's (empty, but with header) output
+        checkpoint.commit(0, 0, map_chunk(read_table(input_path, columns)))
+
+    with step("compact") as s:
+        rows = s.rows = checkpoint.compact(output_path, keep=keep_chunks)
+    print(f"📦 Compacted {len(checkpoint.manifest['chunks'])} chunks ({rows} rows) into {output_path}")
+    return rows
@@ -1,76 +1,200 @@
 # comparison.py
+import argparse
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import os
-from sklearn.metrics import confusion_matrix
 
-# Set styles
-sns.set(style="whitegrid")
-plt.rcParams["figure.figsize"] = (6, 4)
+from figures import render_figures
+from instrumentation import step, write_report
+from storage import RowWriter, iter_table, read_table, stage_path, table_columns, write_table
+
+LABELS = ["positive", "neutral", "negative"]
+
+
+def as_categorical(values):
+    values = pd.Series(values)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values
+    return values.astype(object).astype("category")
+
+
+def label_codes(values, labels):
+    # Integer codes of values in labels, -1 for missing or unknown labels. Only the
+    # (few) categories are remapped, not the values themselves
+    return as_categorical(values).cat.set_categories(labels).cat.codes.to_numpy()
+
+
+def confusion_counts(rule_sentiments, bert_sentiments, labels=LABELS):
+    # Rows: rule label, columns: BERT label; pairs with a label outside `labels` are left out
+    k = len(labels)
+    rule_codes = label_codes(rule_sentiments, labels).astype(np.int64)
+    bert_codes = label_codes(bert_sentiments, labels).astype(np.int64)
+    valid = (rule_codes >= 0) & (bert_codes >= 0)
+    return np.bincount(rule_codes[valid] * k + bert_codes[valid], minlength=k * k).reshape(k, k)
+
+
+def agreement_flags(rule_sentiments, bert_sentiments):
+    # Compared as codes over a shared label set instead of element-wise object comparison
+    rule_sentiments, bert_sentiments = as_categorical(rule_sentiments), as_categorical(bert_sentiments)
+    seen = set(rule_sentiments.cat.categories) | set(bert_sentiments.cat.categories)
+    labels = LABELS + sorted(v for v in seen if v not in LABELS)
+    rule_codes = label_codes(rule_sentiments, labels)
+    return (rule_codes == label_codes(bert_sentiments, labels)) & (rule_codes >= 0)
 
-# Load relation mapping outputs
-rule_df = pd.read_csv("output/relation_mapping_rule_based.csv")
-bert_df = pd.read_csv("output/relation_mapping_bert_based.csv")
 
 # Standardize column names
-rule_df = rule_df.rename(columns={
-    "sentiment": "rule_sentiment",
-    "clean_sentence": "sentence"
-})
-
-bert_df = bert_df.rename(columns={
-    "predicted_sentiment": "bert_sentiment",
-    "clean_sentence": "sentence"
-})
-
-# Merge on sentence + aspect
-merged = pd.merge(rule_df, bert_df, on=["sentence", "aspect"], how="inner")
-
-# Agreement analysis
-merged["agreement"] = merged["rule_sentiment"] == merged["bert_sentiment"]
-
-# Stats
-total = len(merged)
-agreement = merged["agreement"].sum()
-agreement_rate = agreement / total if total > 0 else 0
-
-print(f"✅ Compared {total} overlapping sentence-aspect pairs")
-print(f"🤝 Agreement count: {agreement}")
-print(f"📊 Agreement rate: {agreement_rate:.2%}")
-
-# Save comparison results
-os.makedirs("output", exist_ok=True)
-merged.to_csv("output/comparison_result.csv", index=False)
-
-# Save figures to a dedicated comparison subfolder
-figure_dir = "figures/comparison"
-os.makedirs(figure_dir, exist_ok=True)
-
-# Confusion Matrix
-cm = confusion_matrix(merged["rule_sentiment"], merged["bert_sentiment"],
-                      labels=["positive", "neutral", "negative"])
-
-plt.figure(figsize=(6, 5))
-sns.heatmap(cm, annot=True, fmt="d", cmap="Blues",
-            xticklabels=["positive", "neutral", "negative"],
-            yticklabels=["positive", "neutral", "negative"])
-plt.xlabel("BERT Sentiment")
-plt.ylabel("Rule-based Sentiment")
-plt.title("Confusion Matrix: Rule vs BERT")
-plt.tight_layout()
-plt.savefig(f"{figure_dir}/confusion_matrix.png")
-plt.clf()
-
-# Agreement count plot
-sns.countplot(data=merged, x="agreement", palette="coolwarm")
-plt.title("Agreement Between Rule and BERT")
-plt.ylabel("Count")
-plt.xlabel("Agreement (True/False)")
-plt.tight_layout()
-plt.savefig(f"{figure_dir}/agreement_distribution.png")
-plt.clf()
-
-print("📊 Visuals saved to:")
-print(f"   - {figure_dir}/confusion_matrix.png")
-print(f"   - {figure_dir}/agreement_distribution.png")
+def _rename_rule(rule_df):
+    return rule_df.rename(columns={
+        "sentiment": "rule_sentiment",
+        "clean_sentence": "sentence"
+    })
+
+
+def _rename_bert(bert_df):
+    return bert_df.rename(columns={
+        "predicted_sentiment": "bert_sentiment",
+        "clean_sentence": "sentence"
+    })
+
+
+def bert_by_row_id(bert_df):
+    # BERT's own columns indexed by row_id; sentence and aspect are the same on both sides
+    bert_df = bert_df.drop(columns=["sentence", "aspect"], errors="ignore")
+    return bert_df.drop_duplicates("row_id").set_index("row_id")
+
+
+def join_on_row_id(rule_df, bert_indexed):
+    # Inner one-to-one join on one int64 key; same columns and order as pd.merge(on="row_id")
+    rule_df = rule_df[rule_df["row_id"].isin(bert_indexed.index).values]
+    merged = rule_df.join(bert_indexed, on="row_id", lsuffix="_x", rsuffix="_y")
+    merged["agreement"] = agreement_flags(merged["rule_sentiment"], merged["bert_sentiment"])
+    return merged.reset_index(drop=True)
+
+
+def compare_mappings(rule_df, bert_df):
+    rule_df, bert_df = _rename_rule(rule_df), _rename_bert(bert_df)
+
+    if "row_id" in rule_df.columns and "row_id" in bert_df.columns:
+        # Both outputs carry ingest's row_id
+        return join_on_row_id(rule_df, bert_by_row_id(bert_df))
+
+    # Outputs written before row ids existed: merge on sentence + aspect
+    merged = pd.merge(rule_df, bert_df, on=["sentence", "aspect"], how="inner")
+
+    # Agreement analysis
+    merged["agreement"] = agreement_flags(merged["rule_sentiment"], merged["bert_sentiment"])
+    return merged
+
+
+def compare_tables(rule_path, bert_path, out_path, chunk_rows=100_000):
+    # Out-of-core comparison: BERT's output is held as its compact columns only
+    # (row_id, categorical labels, confidence), the rule output is streamed
+    # chunk_rows at a time and merged rows are appended to out_path as they are
+    # produced. Returns (compared rows, agreement count, confusion matrix).
+    bert_columns = [col for col in table_columns(bert_path) if col not in ("clean_sentence", "aspect")]
+    bert_indexed = bert_by_row_id(_rename_bert(read_table(bert_path, columns=bert_columns)))
+
+    total, agreement = 0, 0
+    cm = np.zeros((len(LABELS), len(LABELS)), dtype=np.int64)
+    writer = None
+    try:
+        for chunk in iter_table(rule_path, chunk_rows=chunk_rows):
+            with step("chunk", rows=len(chunk)):
+                merged = join_on_row_id(_rename_rule(chunk), bert_indexed)
+                if writer is None:
+                    writer = RowWriter(out_path, list(merged.columns))
+                writer.write_frame(merged)
+                total += len(merged)
+                agreement += int(merged["agreement"].sum())
+                cm += confusion_counts(merged["rule_sentiment"], merged["bert_sentiment"])
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        # Empty rule output: still write the header
+        write_table(join_on_row_id(_rename_rule(read_table(rule_path)), bert_indexed), out_path)
+    return total, agreement, cm
+
+
+def _style():
+    # Plotting libraries are only imported when figures are drawn
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    sns.set(style="whitegrid")
+    plt.rcParams["figure.figsize"] = (6, 4)
+    return plt, sns
+
+
+def draw_confusion_matrix(cm, path):
+    plt, sns = _style()
+    plt.figure(figsize=(6, 5))
+    sns.heatmap(cm, annot=True, fmt="d", cmap="Blues",
+                xticklabels=LABELS,
+                yticklabels=LABELS)
+    plt.xlabel("BERT Sentiment")
+    plt.ylabel("Rule-based Sentiment")
+    plt.title("Confusion Matrix: Rule vs BERT")
+    plt.tight_layout()
+    plt.savefig(path)
+
+
+def draw_agreement(agreement_counts, path):
+    plt, sns = _style()
+    outcomes = [value for value in (False, True) if agreement_counts.get(value, 0)]
+    sns.barplot(x=[str(value) for value in outcomes], y=[agreement_counts[value] for value in outcomes],
+                hue=[str(value) for value in outcomes], palette="coolwarm", legend=False)
+    plt.title("Agreement Between Rule and BERT")
+    plt.ylabel("Count")
+    plt.xlabel("Agreement (True/False)")
+    plt.tight_layout()
+    plt.savefig(path)
+
+
+def plot_comparison(cm, agreement_counts, figure_dir="figures/comparison", workers=None, force=False):
+    # cm: confusion_counts() matrix; agreement_counts: {False: n, True: n}.
+    # Save figures to a dedicated comparison subfolder
+    render_figures([(f"{figure_dir}/confusion_matrix.png", draw_confusion_matrix, cm),
+                    (f"{figure_dir}/agreement_distribution.png", draw_agreement, agreement_counts)],
+                   workers, force)
+
+    print("📊 Visuals saved to:")
+    print(f"   - {figure_dir}/confusion_matrix.png")
+    print(f"   - {figure_dir}/agreement_distribution.png")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare rule-based and BERT-based relation mapping")
+    parser.add_argument("--chunk-rows", type=int, default=100_000,
+                        help="Rule-output rows merged per chunk when both outputs carry row_id")
+    parser.add_argument("--plot-workers", type=int, default=None,
+                        help="Processes rendering figures (1 = in-process; default: one per CPU)")
+    parser.add_argument("--force-plots", action="store_true", help="Redraw figures even if their data is unchanged")
+    args = parser.parse_args()
+
+    rule_path = stage_path("relation_mapping_rule_based")
+    bert_path = stage_path("relation_mapping_bert_based")
+    out_path = stage_path("comparison_result")
+
+    with step("merge") as s:
+        if "row_id" in table_columns(rule_path) and "row_id" in table_columns(bert_path):
+            total, agreement, cm = compare_tables(rule_path, bert_path, out_path, args.chunk_rows)
+        else:
+            # Load relation mapping outputs
+            merged = compare_mappings(read_table(rule_path), read_table(bert_path))
+            total, agreement = len(merged), int(merged["agreement"].sum())
+            cm = confusion_counts(merged["rule_sentiment"], merged["bert_sentiment"])
+            # Save comparison results
+            write_table(merged, out_path)
+            del merged
+        s.rows = total
+
+    # Stats
+    agreement_rate = agreement / total if total > 0 else 0
+
+    print(f"✅ Compared {total} overlapping sentence-aspect pairs")
+    print(f"🤝 Agreement count: {agreement}")
+    print(f"📊 Agreement rate: {agreement_rate:.2%}")
+
+    with step("plots"):
+        plot_comparison(cm, {False: total - agreement, True: agreement},
+                        workers=args.plot_workers, force=args.force_plots)
+    write_report("comparison")
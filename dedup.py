@@ -0,0 +1,225 @@
+# dedup.py
+# ---------------------
+# Near-duplicate sentence collapsing ahead of the expensive stages.
+#
+# Every distinct clean_sentence gets a MinHash signature over its character
+# 5-gram shingles (NUM_PERM multiply-shift hashes, computed in bulk with
+# NumPy). Locality-sensitive hashing splits the signature into bands; two
+# sentences sharing any band bucket are candidates, and a candidate joins a
+# cluster when its estimated Jaccard similarity to the bucket's first
+# sentence reaches the threshold. Every member is finally re-checked against
+# its cluster's representative (the first-seen member), so chained merges
+# never attach a sentence that is not itself similar to the representative.
+#
+# The clusters table maps member clean_sentence -> representative (members
+# only). The rule mapper, the zero-shot model and the hybrid cascade then
+# classify representatives, and their results are fanned back out to the
+# members. Clean sentences have their stopwords stripped, so near-duplicates
+# often differ only in the opinion word: a representative's result is fanned
+# out only to members that contain the opinion word the rule path found for
+# it (the zero-shot model, which reports no opinion word, asks the rule path
+# too); every other member is mapped on its own sentence. preprocess.py
+# still parses every sentence itself.
+#
+# Identical sentences need no table: every stage already works on distinct
+# (sentence, aspect) pairs. --exact only reports how much exact repetition
+# saves and writes nothing.
+#
+#   python dedup.py --threshold 0.95
+#   python dedup.py --exact
+#   python RMrule_base.py --clusters output/sentence_clusters.csv
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import step, write_report
+from storage import file_digest, fingerprint, read_table, stage_path, write_table
+
+CLUSTERS_PATH = stage_path("sentence_clusters")
+CLUSTER_COLUMNS = ["clean_sentence", "representative"]
+DEFAULT_THRESHOLD = 0.95  # lower thresholds merge sentences differing only in one word
+NUM_PERM = 64
+SHINGLE_CHARS = 5
+BATCH_SENTENCES = 2000  # bounds the (shingles x NUM_PERM) hash matrix per batch
+
+
+def shingles(text, k=SHINGLE_CHARS):
+    # A list: repeated shingles do not change a minimum
+    return [text[i:i + k] for i in range(max(len(text) - k + 1, 1))]
+
+
+def minhash_signatures(texts, num_perm=NUM_PERM, seed=0):
+    # (len(texts), num_perm) uint32 signatures; shingles are hashed with pandas'
+    # fixed-key SipHash, so signatures are the same in every process and run
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    for start in range(0, len(texts), BATCH_SENTENCES):
+        grams = [shingles(text) for text in texts[start:start + BATCH_SENTENCES]]
+        lengths = np.fromiter(map(len, grams), dtype=np.int64, count=len(grams))
+        hashes = pd.util.hash_array(np.array([g for s in grams for g in s], dtype=object))
+        # (num_perm, shingles) keeps each hash function's row contiguous for reduceat
+        with np.errstate(over="ignore"):
+            permuted = a[:, None] * hashes
+            permuted += b[:, None]
+        permuted >>= np.uint64(32)
+        offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        signatures[start:start + len(grams)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+    return signatures
+
+
+def lsh_bands(threshold, num_perm=NUM_PERM):
+    # (bands, rows) with bands * rows == num_perm whose S-curve midpoint (1/bands)^(1/rows)
+    # is closest to the threshold
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - threshold))
+
+
+def cluster_sentences(texts, threshold=DEFAULT_THRESHOLD, num_perm=NUM_PERM):
+    # texts: distinct sentences in first-seen order. Returns, per sentence, the index of
+    # its representative (itself when it has no near-duplicate before it)
+    n = len(texts)
+    parent = np.arange(n)
+    if n < 2:
+        return parent
+    signatures = minhash_signatures(texts, num_perm)
+    bands, rows = lsh_bands(threshold, num_perm)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(bands):
+        block = signatures[:, band * rows:(band + 1) * rows]
+        codes, _ = pd.factorize(pd.util.hash_pandas_object(pd.DataFrame(block), index=False).to_numpy())
+        _, first = np.unique(codes, return_index=True)
+        leaders = first[codes]
+        candidates = np.flatnonzero(leaders != np.arange(n))
+        if not len(candidates):
+            continue
+        similar = (signatures[candidates] == signatures[leaders[candidates]]).mean(axis=1) >= threshold
+        for i, j in zip(candidates[similar], leaders[candidates][similar]):
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)  # the first-seen sentence stays the root
+
+    roots = np.array([find(i) for i in range(n)])
+    similar = (signatures == signatures[roots]).mean(axis=1) >= threshold
+    return np.where(similar, roots, np.arange(n))
+
+
+def build_clusters(sentences, threshold=DEFAULT_THRESHOLD, num_perm=NUM_PERM):
+    # sentences: the clean_sentence column; threshold None only counts exact repetition (the
+    # table has no members). Returns (clusters DataFrame, stats dict)
+    sentences = pd.Series(sentences).dropna()
+    sentences = sentences[sentences != ""]
+    texts = list(dict.fromkeys(sentences))
+    if threshold is None:
+        representatives = np.arange(len(texts))
+    else:
+        representatives = cluster_sentences(texts, threshold, num_perm)
+    members = np.flatnonzero(representatives != np.arange(len(texts)))
+    clusters = pd.DataFrame({"clean_sentence": [texts[i] for i in members],
+                             "representative": [texts[r] for r in representatives[members]]},
+                            columns=CLUSTER_COLUMNS)
+    stats = {"rows": len(sentences), "distinct": len(texts), "representatives": len(texts) - len(members),
+             "threshold": threshold}
+    return clusters, stats
+
+
+class SentenceClusters:
+    # Loaded clusters table: maps sentences onto their representative and tallies, per
+    # stage, how many work items collapsing removed and roughly how much time that saved
+    def __init__(self, representatives=None, digest=None):
+        self.representatives = dict(representatives or {})
+        self.digest = digest or fingerprint(sorted(self.representatives.items()))
+        self.tallies = {}
+
+    @classmethod
+    def load(cls, path=CLUSTERS_PATH):
+        df = read_table(path, columns=CLUSTER_COLUMNS)
+        return cls(zip(df["clean_sentence"].astype(str), df["representative"].astype(str)), file_digest(path))
+
+    def __len__(self):
+        return len(self.representatives)
+
+    def representative(self, sentence):
+        return self.representatives.get(sentence, sentence)
+
+    def resolve(self, pairs, map_pairs, accept=lambda match: match is not None, shared_only=False):
+        # pairs: (sentence, aspect) work items; map_pairs(pairs) -> {pair: (opinion_word, sentiment)
+        # or None} (the rule path). Maps the representatives' pairs, then the members' own pairs
+        # wherever the representative's verdict does not carry over: it must pass accept and its
+        # opinion word must occur in the member sentence. shared_only maps just the representative
+        # pairs standing in for members, for callers that classify the returned keys themselves.
+        # Returns (keys aligned with pairs, mapped)
+        keys = [(self.representative(s), a) for s, a in pairs]
+        shared = {key for pair, key in zip(pairs, keys) if key != pair}
+        mapped = map_pairs([key for key in keys if key in shared] if shared_only else keys)
+        keys = [key if key == pair or (accept(mapped[key]) and mapped[key][0] in pair[0].split()) else pair
+                for pair, key in zip(pairs, keys)]
+        own = [pair for pair in dict.fromkeys(keys) if pair not in mapped]
+        if own and not shared_only:
+            mapped.update(map_pairs(own))
+        return keys, mapped
+
+    def tally(self, stage, pairs, keys, seconds):
+        # pairs: a stage's work items before any dedup; keys: the items it actually computed,
+        # aligned with pairs; seconds: time spent computing them. Distinct counts are kept
+        # over every call, so chunked runs count across the whole input
+        total = self.tallies.setdefault(stage, {"rows": 0, "distinct": set(), "keys": set(), "seconds": 0.0})
+        total["rows"] += len(pairs)
+        total["distinct"].update(map(hash, pairs))
+        total["keys"].update(map(hash, keys))
+        total["seconds"] += seconds
+
+    def report(self):
+        for stage, total in self.tallies.items():
+            rows, distinct, collapsed = total["rows"], len(total["distinct"]), len(total["keys"])
+            per_item = total["seconds"] / collapsed if collapsed else 0.0
+            print(f"🪞 {stage}: {rows} rows -> {distinct} distinct -> {collapsed} representatives "
+                  f"({rows / max(collapsed, 1):.2f}x compression); "
+                  f"~{per_item * (distinct - collapsed):.1f}s saved by near-duplicate collapsing, "
+                  f"~{per_item * (rows - collapsed):.1f}s vs no dedup")
+
+if __name__ == "__main__":
+    from preprocess import clean_text_series
+
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate sentences (MinHash/LSH)")
+    parser.add_argument("--input", default=stage_path("combined_reviews"))
+    parser.add_argument("--output", default=CLUSTERS_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Minimum estimated Jaccard similarity of character 5-gram shingles")
+    parser.add_argument("--exact", action="store_true",
+                        help="Only report exact repetition; writes no clusters table")
+    parser.add_argument("--num-perm", type=int, default=NUM_PERM, help="MinHash signature length")
+    args = parser.parse_args()
+    threshold = None if args.exact else args.threshold
+
+    df = read_table(args.input, columns=["sentence"])
+    with step("clean_text", rows=len(df)):
+        sentences = clean_text_series(df["sentence"], remove_stopwords=True)
+    start = time.perf_counter()
+    with step("cluster", rows=len(sentences)):
+        clusters, stats = build_clusters(sentences, threshold, args.num_perm)
+    elapsed = time.perf_counter() - start
+
+    mode = ("exact only" if threshold is None
+            else f"threshold {threshold}, bands x rows {lsh_bands(threshold, args.num_perm)}")
+    print(f"🪞 {stats['rows']} sentences -> {stats['distinct']} distinct -> {stats['representatives']} "
+          f"representatives ({mode}) in {elapsed:.2f}s")
+    print(f"📉 Compression: {stats['rows'] / max(stats['representatives'], 1):.2f}x vs rows, "
+          f"{stats['distinct'] / max(stats['representatives'], 1):.2f}x vs exact dedup")
+    if threshold is None:
+        print(f"ℹ️  Identical sentences are already collapsed inside every stage; {args.output} not written "
+              f"(use --threshold to cluster near-duplicates)")
+    else:
+        write_table(clusters, args.output)
+        print(f"✅ {len(clusters)} cluster members saved to {args.output}")
+    write_report("dedup")
@@ -0,0 +1,94 @@
+# figures.py
+# ---------------------
+# Report figure rendering shared by opinion.py, EDA.py and comparison.py.
+#
+# A figure is a (path, draw, data) job: draw(data, path) is a module-level
+# function that builds one plot from small, picklable summary data and saves
+# it. Jobs are rendered with the non-interactive Agg backend, independent
+# figures in parallel worker processes.
+#
+# Each figure's hash (its data plus the source file of its draw function) is
+# kept next to the PNGs in .figure_hashes.json; a figure whose hash matches
+# its last render and whose PNG still exists is skipped, so re-running a
+# report over unchanged summaries draws nothing. force=True redraws all.
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+BACKEND = "Agg"
+HASH_FILE = ".figure_hashes.json"
+
+
+def use_headless():
+    # Must run before pyplot is first imported in a process to avoid loading a GUI backend
+    import matplotlib
+    matplotlib.use(BACKEND, force=True)
+
+
+def figure_hash(draw, data):
+    digest = hashlib.sha1(pickle.dumps(data, protocol=4))
+    with open(inspect.getsourcefile(draw), "rb") as f:
+        digest.update(f.read())
+    digest.update(draw.__qualname__.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _load_hashes(folder):
+    path = os.path.join(folder, HASH_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _render(job):
+    path, draw, data = job
+    use_headless()
+    import matplotlib.pyplot as plt
+    try:
+        draw(data, path)
+    finally:
+        plt.close("all")
+    return path
+
+
+def render_figures(jobs, workers=None, force=False):
+    # Returns (rendered, skipped) lists of paths. workers=1 renders in this process;
+    # None uses one worker per CPU
+    hashes = {}
+    stale = []
+    skipped = []
+    for job in jobs:
+        path = job[0]
+        folder, name = os.path.split(path)
+        if folder not in hashes:
+            hashes[folder] = _load_hashes(folder)
+        key = figure_hash(job[1], job[2])
+        if not force and os.path.exists(path) and hashes[folder].get(name) == key:
+            skipped.append(path)
+            continue
+        os.makedirs(folder or ".", exist_ok=True)
+        stale.append((job, key))
+
+    if len(stale) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(stale)),
+                                 initializer=use_headless) as executor:
+            rendered = list(executor.map(_render, [job for job, _ in stale]))
+    else:
+        rendered = [_render(job) for job, _ in stale]
+
+    # Hashes are recorded only after every figure rendered successfully
+    for job, key in stale:
+        folder, name = os.path.split(job[0])
+        hashes[folder][name] = key
+    for folder in {os.path.split(job[0])[0] for job, _ in stale}:
+        with open(os.path.join(folder, HASH_FILE), "w", encoding="utf-8") as f:
+            json.dump(hashes[folder], f, indent=2, sort_keys=True)
+
+    if skipped:
+        print(f"⏭️  {len(skipped)} figures unchanged, {len(rendered)} rendered")
+    return rendered, skipped
@@ -0,0 +1,132 @@
+# inference_backends.py
+# ---------------------
+# Interchangeable NLI model backends for ZeroShotEngine.
+#
+#   torch : the checkpoint as-is (fp32 on CPU)
+#   int8  : torch dynamic int8 quantization of every nn.Linear
+#   onnx  : ONNX export run through ONNX Runtime (exported once, then reused)
+#
+# Any backend can be pointed at a smaller local NLI checkpoint directory
+# instead of facebook/bart-large-mnli. Each backend exposes the tokenizer,
+# the model config and logits(batch) -> numpy array (n, num_labels).
+
+import os
+import re
+
+import numpy as np
+
+from resources import local_model_path
+
+ONNX_DIR = "output/onnx"
+
+# torch and transformers are imported inside the backends, so importing this
+# module (and zero_shot / RMmodel_base) stays cheap until a model is loaded
+
+
+class TorchBackend:
+    name = "torch"
+
+    def __init__(self, model_name, device=None):
+        import torch
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.device = torch.device(device or ("cuda" if torch.cuda.is_available() else "cpu"))
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = self.load_model(model_name)
+        self.model.to(self.device).eval()
+        self.config = self.model.config
+
+    def load_model(self, model_name):
+        from transformers import AutoModelForSequenceClassification
+
+        return AutoModelForSequenceClassification.from_pretrained(model_name)
+
+    def logits(self, batch):
+        import torch
+
+        batch = {k: v.to(self.device) for k, v in batch.items()}
+        with torch.inference_mode():
+            return self.model(**batch).logits.float().cpu().numpy()
+
+
+class QuantizedBackend(TorchBackend):
+    name = "int8"
+
+    def __init__(self, model_name, device=None):
+        # Dynamic quantization kernels are CPU-only
+        super().__init__(model_name, device="cpu")
+
+    def load_model(self, model_name):
+        import torch
+        from torch.ao.quantization import quantize_dynamic
+
+        model = super().load_model(model_name).eval()
+        return quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, model_name, device=None, export_dir=ONNX_DIR):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The 'onnx' backend needs onnxruntime: pip install onnxruntime onnx") from e
+        from transformers import AutoConfig, AutoTokenizer
+
+        self.model_name = model_name
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.config = AutoConfig.from_pretrained(model_name)
+
+        slug = re.sub(r"[^\w.-]+", "_", model_name.strip("/"))
+        self.onnx_path = os.path.join(export_dir, slug, "model.onnx")
+        if not os.path.exists(self.onnx_path):
+            self.export(model_name, self.onnx_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(self.onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def export(self, model_name, onnx_path):
+        import torch
+        from transformers import AutoModelForSequenceClassification
+
+        class LogitsOnly(torch.nn.Module):
+            # ONNX export needs a plain tensor output, not a ModelOutput
+            def __init__(self, model):
+                super().__init__()
+                self.model = model
+
+            def forward(self, input_ids, attention_mask):
+                return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+        print(f"📦 Exporting {model_name} to ONNX at {onnx_path} ...")
+        os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+        model = LogitsOnly(AutoModelForSequenceClassification.from_pretrained(model_name).eval())
+        dummy = self.tokenizer(["a premise"], ["a hypothesis"], return_tensors="pt")
+        dynamic = {"input_ids": {0: "batch", 1: "seq"}, "attention_mask": {0: "batch", 1: "seq"},
+                   "logits": {0: "batch"}}
+        with torch.inference_mode():
+            torch.onnx.export(model, (dummy["input_ids"], dummy["attention_mask"]), onnx_path,
+                              input_names=["input_ids", "attention_mask"], output_names=["logits"],
+                              dynamic_axes=dynamic, opset_version=17, dynamo=False)
+
+    def logits(self, batch):
+        feed = {name: batch[name].cpu().numpy().astype(np.int64) for name in self.input_names}
+        return self.session.run(["logits"], feed)[0].astype(np.float32)
+
+
+BACKENDS = {
+    "torch": TorchBackend,
+    "int8": QuantizedBackend,
+    "onnx": OnnxBackend,
+}
+
+
+def load_backend(name, model_name, device=None):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    # A copy under resources/models/ is preferred over the hub
+    return BACKENDS[name](local_model_path(model_name), device=device)
@@ -1,42 +1,110 @@
 # ✅ UPDATED: ingest.py
 # ---------------------
 # Converts raw .txt to CSV, and adds 'domain' column + separate CSVs per dataset folder
+#
+# ingest_reviews() is the streaming mode for large dumps: files are parsed in a
+# process pool (encoding sniffed once per file, decoded in one pass) and rows
+# are written straight to the per-dataset and combined CSVs as files complete.
+#
+# Every row gets a row_id that later stages carry along, so relation-mapping
+# outputs can be joined on one integer: the top 39 bits hash the review file's
+# "<dataset>/<file>" name, the low 24 bits are the row's position in that file.
+# IDs stay the same across runs, machines and data roots, and only change for
+# rows of a file whose content changed.
 
 import os
 import re
+import time
+import codecs
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 
+from instrumentation import step, write_report
+from storage import RowWriter, stage_path
 
-def parse_review_file(filepath, domain):
-    data = []
+CONTENT_COLUMNS = ["domain", "sentence", "feature", "sentiment", "strength"]
+COLUMNS = ["row_id"] + CONTENT_COLUMNS
+ROW_BITS = 24  # rows per file < 16.7M
+ANNOTATION_RE = re.compile(r"([\w\s\-&]+?)\[(\+|\-)(\d)\]")
+FALLBACK_ENCODING = "ISO-8859-1"  # decodes any byte sequence
+
+
+def detect_encoding(filepath, sample_size=64 * 1024):
+    with open(filepath, "rb") as file:
+        sample = file.read(sample_size)
+    try:
+        # final=False tolerates a multi-byte character cut off by the sample boundary
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+
+
+def _parse_lines(lines, domain):
     current_sentence = ""
-    encodings = ['utf-8', 'ISO-8859-1', 'cp1252']
-
-    for enc in encodings:
-        try:
-            with open(filepath, 'r', encoding=enc) as file:
-                for line in file:
-                    line = line.strip()
-                    if not line or line.startswith("[t]") or line.startswith("***"):
-                        continue
-
-                    if line.startswith("##"):
-                        current_sentence = line[2:].strip()
-                    else:
-                        annotations = re.findall(r"([\w\s\-&]+?)\[(\+|\-)(\d)\]", line)
-                        for feature, polarity, strength in annotations:
-                            data.append({
-                                "domain": domain,
-                                "sentence": current_sentence,
-                                "feature": feature.strip(),
-                                "sentiment": "positive" if polarity == "+" else "negative",
-                                "strength": int(strength)
-                            })
-            break
-        except UnicodeDecodeError:
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("[t]") or line.startswith("***"):
+            continue
+
+        if line.startswith("##"):
+            current_sentence = line[2:].strip()
+        else:
+            for feature, polarity, strength in ANNOTATION_RE.findall(line):
+                yield (
+                    domain,
+                    current_sentence,
+                    feature.strip(),
+                    "positive" if polarity == "+" else "negative",
+                    int(strength)
+                )
+
+
+def file_key(filepath):
+    # 39-bit hash of "<dataset>/<file>", independent of where the data root lives
+    name = "/".join(os.path.normpath(os.path.abspath(filepath)).split(os.sep)[-2:])
+    return int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=5).digest(), "big") >> 1
+
+
+def row_ids(filepath, n_rows):
+    if n_rows >= 1 << ROW_BITS:
+        raise ValueError(f"{filepath} has {n_rows} rows; row ids allow at most {(1 << ROW_BITS) - 1} per file")
+    return (file_key(filepath) << ROW_BITS) + np.arange(n_rows, dtype=np.int64)
+
+
+def with_row_ids(filepath, rows):
+    return [(int(row_id), *row) for row_id, row in zip(row_ids(filepath, len(rows)), rows)]
+
+
+def read_review_rows(filepath, domain):
+    # Rows of one file as tuples in CONTENT_COLUMNS order (no row_id)
+    encoding = detect_encoding(filepath)
+    try:
+        with open(filepath, "r", encoding=encoding) as file:
+            return list(_parse_lines(file, domain))
+    except UnicodeDecodeError:
+        # Invalid UTF-8 past the sniffed sample: start over, keeping nothing from the failed pass
+        with open(filepath, "r", encoding=FALLBACK_ENCODING) as file:
+            return list(_parse_lines(file, domain))
+
+
+def parse_review_file(filepath, domain):
+    return pd.DataFrame(with_row_ids(filepath, read_review_rows(filepath, domain)), columns=COLUMNS)
+
+
+def list_review_files(root_folder):
+    # (folder, path, domain) in the order parse_all_reviews has always used
+    for folder in os.listdir(root_folder):
+        dataset_path = os.path.join(root_folder, folder)
+        if not os.path.isdir(dataset_path):
             continue
 
-    return pd.DataFrame(data)
+        for file in os.listdir(dataset_path):
+            if file.endswith(".txt"):
+                yield folder, os.path.join(dataset_path, file), os.path.splitext(file)[0]
 
 
 def parse_all_reviews(root_folder):
@@ -67,8 +135,62 @@ def parse_all_reviews(root_folder):
     return pd.concat(all_data, ignore_index=True)
 
 
+def _read_task(task):
+    folder, path, domain = task
+    return folder, with_row_ids(path, read_review_rows(path, domain))
+
+
+def ingest_reviews(root_folder, combined_path="output/combined_reviews.csv",
+                   output_root="output/per_dataset", workers=None):
+    # Per-dataset files use the same format (.csv / .parquet) as combined_path
+    files = list(list_review_files(root_folder))
+    extension = os.path.splitext(combined_path)[1]
+    os.makedirs(output_root, exist_ok=True)
+
+    start = time.perf_counter()
+    n_rows = 0
+    writers = {}
+    combined = RowWriter(combined_path, COLUMNS)
+
+    if workers == 1:
+        results = map(_read_task, files)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        # map() yields in submission order, so outputs keep the serial row order
+        results = executor.map(_read_task, files, chunksize=4)
+
+    try:
+        for folder, rows in results:
+            if folder not in writers:
+                print(f"📁 Processing folder: {folder}")
+                writers[folder] = RowWriter(f"{output_root}/{folder}{extension}", COLUMNS)
+
+            writers[folder].writerows(rows)
+            combined.writerows(rows)
+            n_rows += len(rows)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        for writer in writers.values():
+            writer.close()
+        combined.close()
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"⏱️ {len(files)} files, {n_rows} rows in {elapsed:.2f}s "
+          f"({len(files) / elapsed:.1f} files/sec, {n_rows / elapsed:.0f} rows/sec)")
+    return {"files": len(files), "rows": n_rows, "seconds": elapsed}
+
+
 if __name__ == "__main__":
-    df_reviews = parse_all_reviews("data")
-    os.makedirs("output", exist_ok=True)
-    df_reviews.to_csv("output/combined_reviews.csv", index=False)
-    print("✅ All reviews saved to output/combined_reviews.csv")
+    parser = argparse.ArgumentParser(description="Convert raw review .txt files to CSV")
+    parser.add_argument("--data", default="data")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parser processes (default: all cores, 1 = in-process)")
+    args = parser.parse_args()
+
+    out_path = stage_path("combined_reviews")
+    with step("ingest") as s:
+        s.rows = ingest_reviews(args.data, combined_path=out_path, workers=args.workers)["rows"]
+    print(f"✅ All reviews saved to {out_path}")
+    write_report("ingest")
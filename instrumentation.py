@@ -0,0 +1,277 @@
+# instrumentation.py
+# ---------------------
+# Per-stage timing, throughput and memory metrics for every pipeline script.
+#
+#   with step("parse", rows=len(texts)) as s:
+#       ...                    # s.rows can also be set once the count is known
+#
+# Steps nest ("preprocess/parse") and repeated steps (one per chunk or batch)
+# are folded into one record: calls, wall and CPU seconds, rows, rows/sec and
+# peak RSS. A step's peak comes from sampling the current RSS every
+# SAMPLE_SECONDS while it is open, plus the process high-water mark whenever
+# that rose during the step (short spikes between samples still count). The
+# high-water mark itself is never reset. Without /proc (non-Linux) the
+# process peak so far is used.
+#
+# OPINION_MINER_PROFILE=cprofile | tracemalloc additionally wraps each
+# top-level step in cProfile (the .prof file plus the top functions go in the
+# report) or tracemalloc (peak traced Python memory and the top allocation
+# sites).
+#
+# Scripts call write_report() at the end; it writes
+# output/metrics/<script>-<timestamp>.json unless OPINION_MINER_METRICS=0.
+# read_table() / write_table() are steps themselves, so file I/O shows up
+# under whichever step did it.
+# Work done inside worker processes is not recorded.
+
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_DIR = "output/metrics"
+ENABLED = os.environ.get("OPINION_MINER_METRICS", "1") != "0"
+PROFILE = os.environ.get("OPINION_MINER_PROFILE", "")
+TOP_N = 15
+SAMPLE_SECONDS = 0.02
+
+_records = {}
+_lock = threading.Lock()
+_local = threading.local()
+_started = time.time()
+_active = set()  # open steps in every thread, for the RSS sampler
+_wake = threading.Event()
+_sampler = None
+
+
+def _open_steps():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def rss_high_water_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def memory_mb():
+    # (current RSS, high-water mark); both are the high-water mark where /proc is unavailable
+    values = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    values[line[:5]] = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if len(values) < 2:
+        peak = rss_high_water_mb()
+        return peak, peak
+    return values["VmRSS"], values["VmHWM"]
+
+
+def _sample_rss():
+    # Steps sample on entry and exit themselves, so sleep first: short steps cost no wake-ups
+    while True:
+        _wake.wait()
+        time.sleep(SAMPLE_SECONDS)
+        with _lock:
+            active = list(_active)
+            if not active:
+                _wake.clear()
+                continue
+        rss, _ = memory_mb()
+        for open_step in active:
+            open_step.peak_rss_mb = max(open_step.peak_rss_mb, rss)
+
+
+def _start_sampler():
+    global _sampler
+    if _sampler is None:
+        _sampler = threading.Thread(target=_sample_rss, name="rss-sampler", daemon=True)
+        _sampler.start()
+
+
+class Step:
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.peak_rss_mb = 0.0
+        self.high_water_mb = 0.0
+        self.profile = None
+
+
+@contextmanager
+def step(name, rows=None):
+    if not ENABLED:
+        yield Step(name, rows)
+        return
+
+    stack = _open_steps()
+    path = "/".join([s.name for s in stack] + [name])
+    current = Step(name, rows)
+    with _lock:
+        # Created on entry so the report lists steps in the order they started
+        _records.setdefault(path, _new_record(path))
+        _start_sampler()
+        current.peak_rss_mb, current.high_water_mb = memory_mb()
+        _active.add(current)
+        _wake.set()
+    stack.append(current)
+
+    profiler = _start_profile() if PROFILE and len(stack) == 1 else None
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield current
+    finally:
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        if profiler is not None:
+            current.profile = _stop_profile(profiler, path)
+        with _lock:
+            _active.discard(current)
+        rss, high_water = memory_mb()
+        # A new process high was reached while this step was open
+        peak = high_water if high_water > current.high_water_mb else 0.0
+        current.peak_rss_mb = max(current.peak_rss_mb, peak, rss)
+        stack.pop()
+        _record(path, current, wall, cpu)
+
+
+def _new_record(path):
+    return {"step": path, "calls": 0, "wall_sec": 0.0, "cpu_sec": 0.0, "rows": None, "peak_rss_mb": 0.0}
+
+
+def _record(path, current, wall, cpu):
+    with _lock:
+        record = _records.setdefault(path, _new_record(path))
+        record["calls"] += 1
+        record["wall_sec"] += wall
+        record["cpu_sec"] += cpu
+        if current.rows is not None:
+            record["rows"] = (record["rows"] or 0) + int(current.rows)
+        record["peak_rss_mb"] = max(record["peak_rss_mb"], round(current.peak_rss_mb, 1))
+        if current.profile is not None:
+            record["profile"] = current.profile
+
+
+# ---------- PROFILERS ---------- #
+
+def _start_profile():
+    if PROFILE == "cprofile":
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    if PROFILE == "tracemalloc":
+        import tracemalloc
+
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        return tracemalloc
+    return None
+
+
+def _stop_profile(profiler, path):
+    if PROFILE == "cprofile":
+        import pstats
+
+        profiler.disable()
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        prof_path = os.path.join(METRICS_DIR, f"{path.replace('/', '_')}-{os.getpid()}.prof")
+        profiler.dump_stats(prof_path)
+        stats = pstats.Stats(profiler)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_N]
+        return {
+            "cprofile": prof_path,
+            "top_cumulative": [
+                {"function": f"{func[0]}:{func[1]}({func[2]})", "calls": nc, "tottime": round(tt, 4),
+                 "cumtime": round(ct, 4)}
+                for func, (cc, nc, tt, ct, callers) in rows
+            ],
+        }
+
+    snapshot = profiler.take_snapshot()
+    _, peak = profiler.get_traced_memory()
+    profiler.stop()
+    return {
+        "tracemalloc_peak_mb": round(peak / (1024 * 1024), 2),
+        "top_allocations": [
+            {"site": str(stat.traceback), "size_mb": round(stat.size / (1024 * 1024), 3), "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:TOP_N]
+        ],
+    }
+
+
+# ---------- REPORT ---------- #
+
+def records():
+    rows = []
+    with _lock:
+        for record in _records.values():
+            if not record["calls"]:
+                continue  # still open
+            record = dict(record, wall_sec=round(record["wall_sec"], 4), cpu_sec=round(record["cpu_sec"], 4))
+            if record["rows"] and record["wall_sec"] > 0:
+                record["rows_per_sec"] = round(record["rows"] / record["wall_sec"], 1)
+            rows.append(record)
+    return rows
+
+
+def reset():
+    with _lock:
+        _records.clear()
+
+
+def summary_table(steps=None):
+    steps = steps if steps is not None else records()
+    lines = [f"{'step':<40}{'calls':>7}{'wall s':>10}{'cpu s':>10}{'rows':>10}{'rows/s':>12}{'peak MB':>10}"]
+    for record in steps:
+        lines.append(
+            f"{record['step']:<40}{record['calls']:>7}{record['wall_sec']:>10.3f}{record['cpu_sec']:>10.3f}"
+            f"{record['rows'] if record['rows'] is not None else '-':>10}"
+            f"{record.get('rows_per_sec', '-'):>12}{record['peak_rss_mb']:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def write_report(script=None, path=None, echo=True):
+    # Returns the report path, or None when metrics are disabled or nothing was recorded.
+    # Inside an open step (a script run by pipeline.py) the outer runner owns the report
+    steps = records()
+    if not ENABLED or not steps or _open_steps():
+        return None
+    script = script or os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0]
+    path = path or os.path.join(METRICS_DIR, f"{script}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    report = {
+        "script": script,
+        "argv": sys.argv,
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(_started)),
+        "seconds": round(time.time() - _started, 3),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "profile": PROFILE or None,
+        "peak_rss_mb": round(max(r["peak_rss_mb"] for r in steps), 1),
+        "steps": steps,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    if echo:
+        print(f"\n⏱️ Stage metrics ({path}):")
+        print(summary_table(steps))
+    return path
@@ -1,54 +1,52 @@
-import pandas as pd
 import os
-import seaborn as sns
-import matplotlib.pyplot as plt
+import argparse
 import numpy as np
-from math import pi
+
+from aggregates import SentimentAggregates
+from figures import render_figures
+from instrumentation import step, write_report
+from storage import file_digest, iter_table, read_table, stage_path
 
 # ---------- CONFIGURATION ---------- #
-method = "bert"  # Choose: 'bert' or 'rule'
+method = "bert"  # Choose: 'bert', 'rule' or 'hybrid'
 
 input_paths = {
-    "bert": "output/relation_mapping_bert_based.csv",
-    "rule": "output/relation_mapping_rule_based.csv"
+    "bert": stage_path("relation_mapping_bert_based"),
+    "rule": stage_path("relation_mapping_rule_based"),
+    "hybrid": stage_path("relation_mapping_hybrid")
 }
+sentiment_columns = {"bert": "predicted_sentiment", "rule": "sentiment", "hybrid": "predicted_sentiment"}
+
+
+def aggregates_path(method):
+    return f"output/opinion_aggregates_{method}.json"
 
-output_file = f"output/opinion_summary_{method}.csv"
-plot_dir = f"figures/{method}_based"
-os.makedirs("output", exist_ok=True)
-os.makedirs(plot_dir, exist_ok=True)
 
 # ---------- LOAD DATA ---------- #
-print(f"📥 Using relation mapping from: {input_paths[method]}")
-df = pd.read_csv(input_paths[method])
+def _standardize(df, method):
+    # Rename predicted_sentiment to sentiment for consistency
+    if sentiment_columns[method] == "predicted_sentiment":
+        df = df.rename(columns={"predicted_sentiment": "sentiment"})
 
-# Rename predicted_sentiment to sentiment for consistency
-if method == "bert":
-    df = df.rename(columns={"predicted_sentiment": "sentiment"})
+    # Filter valid rows
+    return df.dropna(subset=["aspect", "sentiment"])
 
-# Filter valid rows
-df = df.dropna(subset=["aspect", "sentiment"])
 
-# ---------- AGGREGATE ---------- #
-summary = df.groupby(["aspect", "sentiment"]).size().unstack(fill_value=0)
-summary["total_mentions"] = summary.sum(axis=1)
+def load_relation_mapping(path, method):
+    return _standardize(read_table(path, columns=["domain", "aspect", sentiment_columns[method]]), method)
 
-# Ensure all sentiment columns exist
-for label in ["positive", "neutral", "negative"]:
-    if label not in summary.columns:
-        summary[label] = 0
 
-# Compute sentiment ratios
-for label in ["positive", "neutral", "negative"]:
-    summary[f"{label}_ratio"] = summary[label] / summary["total_mentions"]
+def aggregate_relation_mapping(path, method, aggregates=None, chunk_rows=100_000):
+    # Streams the file chunk_rows rows at a time into the (mergeable) counters, so
+    # memory depends on the number of distinct (domain, aspect, sentiment) keys only
+    aggregates = aggregates if aggregates is not None else SentimentAggregates()
+    for chunk in iter_table(path, columns=["domain", "aspect", sentiment_columns[method]], chunk_rows=chunk_rows):
+        aggregates.update(_standardize(chunk, method))
+    return aggregates
 
-# Save to CSV
-summary.to_csv(output_file)
-print(f"✅ Opinion summary saved to: {output_file}")
 
 # ---------- PLOTS ---------- #
-sns.set(style="whitegrid")
-
+# Each draw_* function renders one figure from summary slices (see figures.py)
 # Function to annotate bars
 def annotate_bars(ax):
     for p in ax.patches:
@@ -57,85 +55,160 @@ def annotate_bars(ax):
                 f'{width:.2f}' if width < 1 else int(width),
                 va='center')
 
-# Top 10 Positive Aspects
-plt.figure(figsize=(9, 6))
-top_positive = summary.sort_values("positive_ratio", ascending=False).head(10)
-ax = sns.barplot(x="positive_ratio", y=top_positive.index, data=top_positive, palette="Greens_r")
-annotate_bars(ax)
-plt.title(f"Top 10 Positive Aspects ({method.title()}-based)")
-plt.xlabel("Positive Ratio")
-plt.ylabel("Aspect")
-plt.tight_layout()
-plt.savefig(f"{plot_dir}/top_positive_aspects.png")
-plt.clf()
-
-# Top 10 Negative Aspects
-plt.figure(figsize=(9, 6))
-top_negative = summary.sort_values("negative_ratio", ascending=False).head(10)
-ax = sns.barplot(x="negative_ratio", y=top_negative.index, data=top_negative, palette="Reds_r")
-annotate_bars(ax)
-plt.title(f"Top 10 Negative Aspects ({method.title()}-based)")
-plt.xlabel("Negative Ratio")
-plt.ylabel("Aspect")
-plt.tight_layout()
-plt.savefig(f"{plot_dir}/top_negative_aspects.png")
-plt.clf()
-
-# Top 10 Most Mentioned Aspects
-plt.figure(figsize=(9, 6))
-top_mentioned = summary.sort_values("total_mentions", ascending=False).head(10)
-ax = sns.barplot(x="total_mentions", y=top_mentioned.index, data=top_mentioned, palette="Blues_r")
-annotate_bars(ax)
-plt.title(f"Top 10 Most Mentioned Aspects ({method.title()}-based)")
-plt.xlabel("Total Mentions")
-plt.ylabel("Aspect")
-plt.tight_layout()
-plt.savefig(f"{plot_dir}/top_mentioned_aspects.png")
-plt.clf()
-
-# Sentiment Composition (Stacked Bar)
-plt.figure(figsize=(10, 7))
-comp = top_mentioned[["positive", "neutral", "negative"]]
-comp.plot(kind="barh", stacked=True, colormap="viridis")
-plt.title(f"Sentiment Composition for Top Aspects ({method.title()}-based)")
-plt.xlabel("Mentions")
-plt.ylabel("Aspect")
-plt.tight_layout()
-plt.savefig(f"{plot_dir}/aspect_sentiment_composition.png")
-plt.clf()
-
-# Radar Chart for Sentiment Ratios
-radar_data = summary.sort_values("total_mentions", ascending=False).head(6)
-labels = ["positive_ratio", "neutral_ratio", "negative_ratio"]
-
-angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False).tolist()
-angles += angles[:1]  # close the loop
-
-fig, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True))
-
-for idx, row in radar_data.iterrows():
-    values = [row[label] for label in labels]
-    values += values[:1]  # repeat first to close
-    ax.plot(angles, values, label=idx)
-    ax.fill(angles, values, alpha=0.1)
-
-ax.set_xticks(angles[:-1])
-ax.set_xticklabels([label.replace("_ratio", "").title() for label in labels])
-ax.set_yticks([0.25, 0.5, 0.75])
-ax.set_yticklabels(["25%", "50%", "75%"])
-ax.set_title(f"Sentiment Ratios Radar Chart ({method.title()}-based)")
-ax.legend(loc='upper right', bbox_to_anchor=(1.4, 1.1))
-plt.tight_layout()
-plt.savefig(f"{plot_dir}/aspect_sentiment_radar.png")
-plt.clf()
-
-# Overall Pie Chart
-overall_counts = df["sentiment"].value_counts()
-plt.figure(figsize=(6, 6))
-plt.pie(overall_counts, labels=overall_counts.index, autopct="%.1f%%", colors=["green", "grey", "red"])
-plt.title(f"Overall Sentiment Distribution ({method.title()}-based)")
-plt.tight_layout()
-plt.savefig(f"{plot_dir}/overall_sentiment_pie.png")
-plt.clf()
-
-print(f"📊 All enhanced plots saved to `{plot_dir}/`:")
+
+def draw_top_aspects(data, path):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    sns.set(style="whitegrid")
+
+    plt.figure(figsize=(9, 6))
+    ax = sns.barplot(x=data["column"], y=data["top"].index, data=data["top"], hue=data["top"].index,
+                     palette=data["palette"], legend=False)
+    annotate_bars(ax)
+    plt.title(data["title"])
+    plt.xlabel(data["xlabel"])
+    plt.ylabel("Aspect")
+    plt.tight_layout()
+    plt.savefig(path)
+
+
+def draw_composition(data, path):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    sns.set(style="whitegrid")
+
+    # Sentiment Composition (Stacked Bar)
+    fig, ax = plt.subplots(figsize=(10, 7))
+    data["comp"].plot(kind="barh", stacked=True, colormap="viridis", ax=ax)
+    plt.title(data["title"])
+    plt.xlabel("Mentions")
+    plt.ylabel("Aspect")
+    plt.tight_layout()
+    plt.savefig(path)
+
+
+def draw_radar(data, path):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    sns.set(style="whitegrid")
+
+    # Radar Chart for Sentiment Ratios
+    labels = ["positive_ratio", "neutral_ratio", "negative_ratio"]
+    angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False).tolist()
+    angles += angles[:1]  # close the loop
+
+    fig, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True))
+
+    for idx, row in data["radar"].iterrows():
+        values = [row[label] for label in labels]
+        values += values[:1]  # repeat first to close
+        ax.plot(angles, values, label=idx)
+        ax.fill(angles, values, alpha=0.1)
+
+    ax.set_xticks(angles[:-1])
+    ax.set_xticklabels([label.replace("_ratio", "").title() for label in labels])
+    ax.set_yticks([0.25, 0.5, 0.75])
+    ax.set_yticklabels(["25%", "50%", "75%"])
+    ax.set_title(data["title"])
+    ax.legend(loc='upper right', bbox_to_anchor=(1.4, 1.1))
+    plt.tight_layout()
+    plt.savefig(path)
+
+
+def draw_overall_pie(data, path):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    sns.set(style="whitegrid")
+
+    # Overall Pie Chart
+    counts = data["counts"]
+    plt.figure(figsize=(6, 6))
+    plt.pie(counts, labels=counts.index, autopct="%.1f%%", colors=["green", "grey", "red"])
+    plt.title(data["title"])
+    plt.tight_layout()
+    plt.savefig(path)
+
+
+def opinion_figures(summary, overall_counts, method, plot_dir):
+    # (path, draw, data) jobs for figures.render_figures
+    name = f"({method.title()}-based)"
+    top_mentioned = summary.sort_values("total_mentions", ascending=False).head(10)
+    jobs = []
+    for column, palette, title, xlabel, filename in [
+        ("positive_ratio", "Greens_r", "Top 10 Positive Aspects", "Positive Ratio", "top_positive_aspects"),
+        ("negative_ratio", "Reds_r", "Top 10 Negative Aspects", "Negative Ratio", "top_negative_aspects"),
+        ("total_mentions", "Blues_r", "Top 10 Most Mentioned Aspects", "Total Mentions", "top_mentioned_aspects"),
+    ]:
+        top = summary.sort_values(column, ascending=False).head(10)[[column]]
+        jobs.append((f"{plot_dir}/{filename}.png", draw_top_aspects,
+                     {"top": top, "column": column, "palette": palette,
+                      "title": f"{title} {name}", "xlabel": xlabel}))
+    jobs.append((f"{plot_dir}/aspect_sentiment_composition.png", draw_composition,
+                 {"comp": top_mentioned[["positive", "neutral", "negative"]],
+                  "title": f"Sentiment Composition for Top Aspects {name}"}))
+    jobs.append((f"{plot_dir}/aspect_sentiment_radar.png", draw_radar,
+                 {"radar": summary.sort_values("total_mentions", ascending=False).head(6)[
+                     ["positive_ratio", "neutral_ratio", "negative_ratio"]],
+                  "title": f"Sentiment Ratios Radar Chart {name}"}))
+    jobs.append((f"{plot_dir}/overall_sentiment_pie.png", draw_overall_pie,
+                 {"counts": overall_counts, "title": f"Overall Sentiment Distribution {name}"}))
+    return jobs
+
+
+def plot_opinions(summary, overall_counts, method, plot_dir, workers=None, force=False):
+    render_figures(opinion_figures(summary, overall_counts, method, plot_dir), workers, force)
+    print(f"📊 All enhanced plots saved to `{plot_dir}/`:")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate aspect sentiments and plot opinion summaries")
+    parser.add_argument("--method", default=method, choices=list(input_paths))
+    parser.add_argument("--delta", nargs="*", default=None,
+                        help="Relation-mapping files of new rows to add to the saved aggregates "
+                             "instead of rescanning the full history; files already added are skipped")
+    parser.add_argument("--merge", nargs="*", default=None,
+                        help="Aggregate stores (JSON) from other workers to merge in")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="Rows read per chunk")
+    parser.add_argument("--plot-workers", type=int, default=None,
+                        help="Processes rendering figures (1 = in-process; default: one per CPU)")
+    parser.add_argument("--force-plots", action="store_true", help="Redraw figures even if their data is unchanged")
+    args = parser.parse_args()
+    method = args.method
+
+    output_file = f"output/opinion_summary_{method}.csv"
+    plot_dir = f"figures/{method}_based"
+    os.makedirs("output", exist_ok=True)
+    os.makedirs(plot_dir, exist_ok=True)
+
+    # ---------- AGGREGATE ---------- #
+    with step("aggregate") as s:
+        store_path = aggregates_path(method)
+        if args.delta is None and args.merge is None:
+            print(f"📥 Using relation mapping from: {input_paths[method]}")
+            aggregates = aggregate_relation_mapping(input_paths[method], method, chunk_rows=args.chunk_rows)
+        else:
+            aggregates = SentimentAggregates.load(store_path) if os.path.exists(store_path) else SentimentAggregates()
+            for path in args.delta or []:
+                digest = file_digest(path)
+                if digest in aggregates.sources:
+                    print(f"⏭️  Already in the aggregates, skipping: {path}")
+                    continue
+                print(f"➕ Adding new rows from: {path}")
+                aggregate_relation_mapping(path, method, aggregates, chunk_rows=args.chunk_rows)
+                aggregates.sources.add(digest)
+            for path in args.merge or []:
+                print(f"🔗 Merging aggregates from: {path}")
+                aggregates.merge(SentimentAggregates.load(path))
+
+        aggregates.save(store_path)
+        summary = aggregates.summary()
+
+        # Save to CSV
+        summary.to_csv(output_file)
+        print(f"✅ Opinion summary saved to: {output_file}")
+        print(f"💾 Aggregate store saved to: {store_path}")
+        s.rows = sum(aggregates.counts.values())
+
+    with step("plots"):
+        plot_opinions(summary, aggregates.overall_counts(), method, plot_dir, args.plot_workers, args.force_plots)
+    write_report("opinion")
@@ -0,0 +1,124 @@
+# parse_store.py
+# ---------------------
+# Serialized spaCy parses shared between preprocess.py and RMrule_base.py.
+#
+# Preprocessing already parses every clean_sentence; the docs are saved once
+# as a DocBin next to an index of sentence hashes, so the rule-based mapper
+# can load dependency trees instead of re-running the parser. The index
+# records the spaCy model identity and the cleaning options: a store built
+# by a different model version is ignored, and preprocessing rebuilds it
+# from scratch whenever either one changes.
+#
+# Docs are written in shards of SHARD_DOCS, in the order they were parsed.
+# load_parse_store() returns every Doc; StoredParses reads only the shards
+# holding the keys asked for, so chunked readers (the rule mapper) keep just
+# the current chunk's Docs in memory, not the whole store.
+
+import glob
+import hashlib
+import json
+import os
+
+PARSE_STORE_DIR = "output/parse_store"
+SHARD_DOCS = 20_000
+_DOCS_FILE = "docs.spacy"  # single-file stores written before sharding
+_SHARD_FILE = "docs-{:05d}.spacy"
+_INDEX_FILE = "index.json"
+
+
+def spacy_model_id(nlp):
+    import spacy
+
+    return f"spacy-{spacy.__version__}:{nlp.meta['lang']}_{nlp.meta['name']}-{nlp.meta['version']}"
+
+
+def sentence_key(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def save_parse_store(docs, nlp, options, path=PARSE_STORE_DIR):
+    # docs: {sentence_key: Doc}
+    from spacy.tokens import DocBin
+
+    os.makedirs(path, exist_ok=True)
+    keys = list(docs)
+    files = []
+    for start in range(0, len(keys), SHARD_DOCS):
+        doc_bin = DocBin(store_user_data=False)
+        for key in keys[start:start + SHARD_DOCS]:
+            doc_bin.add(docs[key])
+        files.append(_SHARD_FILE.format(len(files)))
+        doc_bin.to_disk(os.path.join(path, files[-1]))
+
+    with open(os.path.join(path, _INDEX_FILE), "w", encoding="utf-8") as f:
+        json.dump({"model": spacy_model_id(nlp), "options": options, "keys": keys,
+                   "shard_docs": SHARD_DOCS, "files": files}, f)
+    for old in glob.glob(os.path.join(path, "docs*.spacy")):
+        if os.path.basename(old) not in files:
+            os.remove(old)
+
+
+def _read_index(nlp, options, path):
+    # The index dict, or None when the store is missing or stale
+    index_path = os.path.join(path, _INDEX_FILE)
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path, encoding="utf-8") as f:
+        index = json.load(f)
+    if index.get("model") != spacy_model_id(nlp):
+        return None
+    if options is not None and index.get("options") != options:
+        return None
+    index.setdefault("files", [_DOCS_FILE])
+    index.setdefault("shard_docs", max(len(index["keys"]), 1))
+    if not all(os.path.exists(os.path.join(path, name)) for name in index["files"]):
+        return None
+    return index
+
+
+def _read_shard(nlp, path, name):
+    from spacy.tokens import DocBin
+
+    return DocBin().from_disk(os.path.join(path, name)).get_docs(nlp.vocab)
+
+
+def load_parse_store(nlp, options=None, path=PARSE_STORE_DIR):
+    # Returns {sentence_key: Doc}; empty when the store is missing or stale.
+    # options=None only checks the model (the reader cannot know how text was cleaned)
+    index = _read_index(nlp, options, path)
+    if index is None:
+        return {}
+    docs = (doc for name in index["files"] for doc in _read_shard(nlp, path, name))
+    return dict(zip(index["keys"], docs))
+
+
+class StoredParses:
+    # Read-only view of a parse store: only the index is held in memory. get_many() reads
+    # the shards holding the requested keys, one at a time, and keeps just those Docs
+    def __init__(self, nlp, options=None, path=PARSE_STORE_DIR):
+        self.nlp = nlp
+        self.path = path
+        index = _read_index(nlp, options, path) or {"keys": [], "files": [], "shard_docs": 1}
+        self.files = index["files"]
+        self.shard_docs = index["shard_docs"]
+        self.positions = {key: i for i, key in enumerate(index["keys"])}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def get_many(self, keys):
+        # {key: Doc} for the requested keys that are in the store
+        wanted = {}
+        for key in keys:
+            if key in self.positions:
+                shard, offset = divmod(self.positions[key], self.shard_docs)
+                wanted.setdefault(shard, {})[offset] = key
+        found = {}
+        for shard, offsets in sorted(wanted.items()):
+            for offset, doc in enumerate(_read_shard(self.nlp, self.path, self.files[shard])):
+                if offset in offsets:
+                    found[offsets[offset]] = doc
+        return found
@@ -0,0 +1,358 @@
+# pipeline.py
+# ---------------------
+# Incremental runner for the whole opinion-mining pipeline.
+#
+#   ingest -> [dedup] -> preprocess -> rule / bert relation mapping -> opinion, comparison
+#
+# Each stage records a fingerprint of its inputs (and settings) in
+# output/pipeline_state.json and is skipped when it is unchanged. Stages
+# that do run only redo the work whose inputs changed:
+#   ingest      re-parses only review files whose content changed; every other
+#               file's rows come from a per-file cache under output/pipeline/
+#   dedup       only with --dedup: clusters near-duplicate sentences
+#               (dedup.py); rule, bert and hybrid then classify one
+#               representative per cluster
+#   preprocess  cleans/parses only rows not already in cleaned_reviews
+#   rule, bert  classify only (sentence, aspect) pairs missing from the
+#               prediction cache, committing output chunk by chunk so an
+#               interrupted run resumes where it stopped (checkpoint.py)
+#   hybrid      rule verdicts plus BERT for the rest; runs after bert, so its
+#               model pairs are normally all cache hits
+#   opinion, comparison  cheap aggregates, simply re-run
+#
+# Models come from the resources.py registry, so each one is loaded at most
+# once per run and only if a stage that needs it actually runs.
+#
+#   python pipeline.py                 # run whatever is out of date
+#   python pipeline.py --force bert    # re-run bert and everything after it
+
+import argparse
+import json
+import os
+import runpy
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from checkpoint import DEFAULT_CHUNK_ROWS, run_chunked
+from dedup import SentenceClusters
+from ingest import COLUMNS, CONTENT_COLUMNS, list_review_files, read_review_rows, row_ids
+from instrumentation import step, write_report
+from parse_store import PARSE_STORE_DIR
+from resources import get_engine, get_nlp
+from storage import (FORMATS, PIPELINE_FORMAT, file_digest, fingerprint, present_columns, read_table,
+                     stage_path, write_table)
+
+STATE_PATH = "output/pipeline_state.json"
+INGEST_CACHE_DIR = "output/pipeline/ingest"
+
+# stage -> stages it reads from
+STAGES = {
+    "ingest": [],
+    "dedup": ["ingest"],
+    "preprocess": ["ingest"],
+    "rule": ["preprocess", "dedup"],
+    "bert": ["preprocess", "dedup"],
+    "hybrid": ["preprocess", "dedup"],
+    "opinion": ["rule", "bert"],
+    "comparison": ["rule", "bert"],
+}
+
+STAGE_OUTPUTS = {
+    "ingest": ["combined_reviews"],
+    "dedup": ["sentence_clusters"],
+    "preprocess": ["cleaned_reviews"],
+    "rule": ["relation_mapping_rule_based"],
+    "bert": ["relation_mapping_bert_based"],
+    "hybrid": ["relation_mapping_hybrid"],
+    "opinion": [],
+    "comparison": ["comparison_result"],
+}
+
+
+def row_keys(df, columns):
+    # Stable per-row content hash, independent of dtype (categorical, int8, object)
+    return pd.util.hash_pandas_object(df[columns].astype(str), index=False)
+
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+
+# ---------- STAGES ---------- #
+
+def run_ingest(data_dir, workers=None):
+    files = list(list_review_files(data_dir))
+    digests = {path: file_digest(path) for _, path, _ in files}
+    ext = FORMATS[PIPELINE_FORMAT]
+    os.makedirs(INGEST_CACHE_DIR, exist_ok=True)
+
+    def cache_path(path, domain):
+        return os.path.join(INGEST_CACHE_DIR, f"{digests[path]}-{domain}{ext}")
+
+    changed = [(folder, path, domain) for folder, path, domain in files
+               if not os.path.exists(cache_path(path, domain))]
+    print(f"📁 {len(files)} review files, {len(changed)} new or changed")
+
+    tasks = [(path, domain) for _, path, domain in changed]
+    if len(tasks) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parsed = list(executor.map(read_review_rows, *zip(*tasks)))
+    else:
+        parsed = [read_review_rows(path, domain) for path, domain in tasks]
+    for (path, domain), rows in zip(tasks, parsed):
+        write_table(pd.DataFrame(rows, columns=CONTENT_COLUMNS), cache_path(path, domain))
+
+    # Drop cached files that no longer correspond to any review file
+    live = {os.path.basename(cache_path(path, domain)) for _, path, domain in files}
+    for name in os.listdir(INGEST_CACHE_DIR):
+        if name not in live:
+            os.remove(os.path.join(INGEST_CACHE_DIR, name))
+
+    per_folder = {}
+    for folder, path, domain in files:
+        # Cached rows are keyed by content only; row ids depend on the file's name, so they are added here
+        part = read_table(cache_path(path, domain))
+        part.insert(0, "row_id", row_ids(path, len(part)))
+        per_folder.setdefault(folder, []).append(part)
+
+    os.makedirs("output/per_dataset", exist_ok=True)
+    frames = []
+    for folder, parts in per_folder.items():
+        df_folder = pd.concat(parts, ignore_index=True)
+        write_table(df_folder, f"output/per_dataset/{folder}{ext}")
+        frames.append(df_folder)
+
+    combined = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=COLUMNS)
+    write_table(combined, stage_path("combined_reviews"))
+    return len(changed)
+
+
+def run_dedup(threshold):
+    from dedup import build_clusters
+    from preprocess import clean_text_series
+
+    sentences = clean_text_series(read_table(stage_path("combined_reviews"), columns=["sentence"])["sentence"])
+    clusters, stats = build_clusters(sentences, threshold)
+    write_table(clusters, stage_path("sentence_clusters"))
+    print(f"🪞 {stats['rows']} sentences -> {stats['distinct']} distinct -> {stats['representatives']} "
+          f"representatives ({stats['rows'] / max(stats['representatives'], 1):.2f}x compression)")
+    return stats["distinct"]
+
+
+def run_preprocess(batch_size=256, n_process=1, aspect_threshold=None):
+    from aspect_matcher import AspectMatcher
+    from preprocess import normalize_feature_series, preprocess_dataframe
+
+    matcher = None if aspect_threshold is None else AspectMatcher(aspect_threshold)
+
+    combined = read_table(stage_path("combined_reviews"))
+    out_path = stage_path("cleaned_reviews")
+
+    reuse = pd.Series(False, index=combined.index)
+    previous = None
+    if os.path.exists(out_path):
+        previous = read_table(out_path)
+        new_keys = row_keys(combined, CONTENT_COLUMNS)
+        old_keys = row_keys(previous, CONTENT_COLUMNS)
+        reuse = new_keys.isin(set(old_keys)).values
+        reuse = pd.Series(reuse, index=combined.index)
+
+    print(f"🧹 {len(combined)} rows, {int((~reuse).sum())} to preprocess")
+    fresh = preprocess_dataframe(combined[~reuse.values].copy(), remove_stopwords=True,
+                                 batch_size=batch_size, n_process=n_process,
+                                 store_path=PARSE_STORE_DIR, aspect_matcher=matcher)
+    # Reused rows were filtered when first written (and "" reads back from CSV as NaN)
+    fresh = fresh.dropna(subset=["clean_sentence", "clean_feature", "aspect"])
+
+    parts = [fresh]
+    if previous is not None and reuse.any():
+        lookup = previous.assign(_key=old_keys.values).drop_duplicates("_key").set_index("_key")
+        reused = lookup.loc[new_keys[reuse.values].values].reset_index(drop=True)
+        reused.index = combined.index[reuse.values]
+        reused["row_id"] = combined.loc[reuse.values, "row_id"].values  # the current row's id, not the old one
+        parts.append(reused)
+
+    merged = pd.concat(parts).sort_index()
+    # Reused rows may have been normalised under another --aspect-threshold
+    known = merged["clean_feature"].notna()
+    normalize = normalize_feature_series if matcher is None else matcher.normalize_series
+    aspect = merged["aspect"].astype(object)
+    aspect[known] = normalize(merged.loc[known, "clean_feature"])
+    merged["aspect"] = aspect
+    if matcher is not None:
+        matcher.save()
+    write_table(merged, out_path)
+    return int((~reuse).sum())
+
+
+def run_rule(chunk_rows=DEFAULT_CHUNK_ROWS, clusters=None):
+    import RMrule_base as rule
+    from parse_store import StoredParses
+    from prediction_cache import PredictionCache
+
+    cache = PredictionCache()
+    parsed_docs = StoredParses(get_nlp())  # Docs are read per chunk
+
+    def map_chunk(df):
+        df = df.dropna(subset=["clean_sentence", "aspect", "domain"])
+        return rule.rule_based_relation_mapping(df, cache=cache, parsed_docs=parsed_docs, clusters=clusters)
+
+    run_chunked("relation_mapping_rule_based", stage_path("cleaned_reviews"),
+                stage_path("relation_mapping_rule_based"), map_chunk,
+                settings=[rule.rule_model_id(), rule.RULE_TEMPLATE] + ([clusters.digest] if clusters else []),
+                columns=present_columns(stage_path("cleaned_reviews"), rule.INPUT_COLUMNS), chunk_rows=chunk_rows)
+    return cache.misses
+
+
+def run_bert(model, backend, batch_size, workers=1, chunk_rows=DEFAULT_CHUNK_ROWS, clusters=None):
+    from RMmodel_base import INPUT_COLUMNS, bert_based_relation_mapping, filter_model_input
+    from prediction_cache import PredictionCache
+
+    cache = PredictionCache()
+    engine = get_engine(model, backend=backend, batch_size=batch_size, cache=cache, workers=workers)
+    run_chunked("relation_mapping_bert_based", stage_path("cleaned_reviews"),
+                stage_path("relation_mapping_bert_based"),
+                lambda chunk: bert_based_relation_mapping(filter_model_input(chunk), engine, clusters),
+                settings=[engine.model_id, engine.labels, engine.template] + ([clusters.digest] if clusters else []),
+                columns=present_columns(stage_path("cleaned_reviews"), INPUT_COLUMNS), chunk_rows=chunk_rows)
+    return cache.misses
+
+
+def run_hybrid(model, backend, batch_size, workers=1, clusters=None):
+    from RMhybrid import hybrid_relation_mapping
+    from RMmodel_base import load_model_input
+    from parse_store import load_parse_store
+    from prediction_cache import PredictionCache
+
+    cache = PredictionCache()
+    engine = get_engine(model, backend=backend, batch_size=batch_size, cache=cache, workers=workers)
+    result, stats = hybrid_relation_mapping(load_model_input(), engine, cache=cache,
+                                            parsed_docs=load_parse_store(get_nlp()), clusters=clusters)
+    write_table(result, stage_path("relation_mapping_hybrid"))
+    print(f"💸 Hybrid: {stats['model_calls_avoided']:.2%} of model calls avoided")
+    return cache.misses
+
+
+def run_script(script):
+    # Run opinion.py / comparison.py as scripts with their default settings; paths stay relative to cwd
+    argv = sys.argv
+    sys.argv = [script]
+    try:
+        runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), script), run_name="__main__")
+    finally:
+        sys.argv = argv
+    return None
+
+
+# ---------- RUNNER ---------- #
+
+def stage_inputs(stage, args):
+    # Everything that can change a stage's output, as a fingerprint
+    if stage == "ingest":
+        files = sorted((path, file_digest(path)) for _, path, _ in list_review_files(args.data))
+        return fingerprint(files, PIPELINE_FORMAT, COLUMNS)
+
+    deps = [dep for dep in STAGES[stage] if dep != "dedup" or args.dedup is not None]
+    upstream = [file_digest(stage_path(name)) for dep in deps for name in STAGE_OUTPUTS[dep]
+                if os.path.exists(stage_path(name))]
+    settings = {"bert": [args.model, args.backend], "hybrid": [args.model, args.backend]}.get(stage, [])
+    if stage == "preprocess" and args.aspect_threshold is not None:
+        settings = [args.aspect_threshold]
+    if stage == "dedup":
+        settings = [args.dedup]
+    return fingerprint(upstream, settings, PIPELINE_FORMAT)
+
+
+def downstream(stages):
+    selected = set(stages)
+    for stage, deps in STAGES.items():  # STAGES is in topological order
+        if selected.intersection(deps):
+            selected.add(stage)
+    return selected
+
+
+def run_pipeline(args):
+    state = load_state()
+    forced = downstream(args.force or [])
+    skip = set(args.skip or []) | ({"dedup"} if args.dedup is None else set())
+    selected = [s for s in STAGES if s not in skip]
+
+    for stage in selected:
+        outputs_exist = all(os.path.exists(stage_path(name)) for name in STAGE_OUTPUTS[stage])
+        inputs = stage_inputs(stage, args)
+        if stage not in forced and outputs_exist and state.get(stage, {}).get("inputs") == inputs:
+            print(f"⏭️  {stage}: up to date")
+            continue
+
+        print(f"▶️  {stage}")
+        clusters = None
+        if "dedup" in STAGES[stage] and args.dedup is not None:
+            clusters = SentenceClusters.load(stage_path("sentence_clusters"))
+        start = time.perf_counter()
+        with step(stage) as s:
+            if stage == "ingest":
+                work = run_ingest(args.data, args.workers)
+            elif stage == "dedup":
+                work = run_dedup(args.dedup)
+            elif stage == "preprocess":
+                work = run_preprocess(args.batch_size, args.n_process, args.aspect_threshold)
+            elif stage == "rule":
+                work = run_rule(args.chunk_rows, clusters)
+            elif stage == "bert":
+                work = run_bert(args.model, args.backend, args.bert_batch_size, args.bert_workers,
+                                args.chunk_rows, clusters)
+            elif stage == "hybrid":
+                work = run_hybrid(args.model, args.backend, args.bert_batch_size, args.bert_workers, clusters)
+            else:
+                work = run_script(f"{stage}.py")
+            s.rows = work  # new items, not total rows
+
+        state[stage] = {"inputs": inputs, "work_items": work,
+                        "seconds": round(time.perf_counter() - start, 3)}
+        if clusters is not None:
+            state[stage]["clusters"] = clusters.digest
+            clusters.report()
+        save_state(state)
+        print(f"✅ {stage} done in {state[stage]['seconds']}s"
+              + (f" ({work} new items)" if work is not None else ""))
+
+
+if __name__ == "__main__":
+    import aspect_matcher
+    import dedup
+    from zero_shot import DEFAULT_MODEL
+
+    parser = argparse.ArgumentParser(description="Run the pipeline, redoing only what changed")
+    parser.add_argument("--data", default="data")
+    parser.add_argument("--force", nargs="*", choices=list(STAGES), help="Re-run these stages and their dependants")
+    parser.add_argument("--skip", nargs="*", choices=list(STAGES), help="Leave these stages out")
+    parser.add_argument("--workers", type=int, default=None, help="Ingest parser processes")
+    parser.add_argument("--batch-size", type=int, default=256, help="spaCy nlp.pipe batch size")
+    parser.add_argument("--n-process", type=int, default=1, help="spaCy worker processes")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--backend", default="torch")
+    parser.add_argument("--bert-batch-size", type=int, default=32)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="Rows per checkpointed chunk in the rule and bert stages")
+    parser.add_argument("--bert-workers", type=int, default=1, help="Inference processes sharing the model")
+    parser.add_argument("--aspect-threshold", nargs="?", type=float, const=aspect_matcher.DEFAULT_THRESHOLD,
+                        default=None,
+                        help="Map features onto the most similar canonical aspect (see aspect_matcher.py)")
+    # Identical sentences are collapsed inside every stage already, so there is no exact-only mode
+    parser.add_argument("--dedup", nargs="?", type=float, const=dedup.DEFAULT_THRESHOLD, default=None,
+                        help="Collapse near-duplicate sentences (MinHash/LSH, this Jaccard threshold) "
+                             "before rule/bert/hybrid")
+    run_pipeline(parser.parse_args())
+    write_report("pipeline")
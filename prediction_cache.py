@@ -0,0 +1,97 @@
+# prediction_cache.py
+# ---------------------
+# On-disk, content-addressed cache of relation-mapping predictions (SQLite).
+#
+# Keys are a SHA-256 of (sentence, aspect, hypothesis template, label set,
+# model identifier), so a prediction is reused only when every input that
+# could change it is identical. Entries carry a last-used stamp and the
+# least recently used ones are evicted once the cache exceeds max_entries.
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+DEFAULT_CACHE_PATH = "output/cache/predictions.sqlite"
+DEFAULT_MAX_ENTRIES = 1_000_000
+_SQL_CHUNK = 500  # stay well under SQLite's bound-parameter limit
+
+
+def prediction_key(sentence, aspect, template, labels, model_id):
+    payload = json.dumps([sentence, aspect, template, list(labels), model_id],
+                         ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PredictionCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON predictions(last_used)")
+        self.conn.commit()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    def get_many(self, keys):
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        for start in range(0, len(keys), _SQL_CHUNK):
+            chunk = keys[start:start + _SQL_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT key, value FROM predictions WHERE key IN ({marks})", chunk
+            ).fetchall()
+            found.update((key, json.loads(value)) for key, value in rows)
+
+        # Refresh recency of everything we just served
+        if found:
+            now = time.time()
+            self.conn.executemany("UPDATE predictions SET last_used = ? WHERE key = ?",
+                                  [(now, key) for key in found])
+            self.conn.commit()
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        if not items:
+            return
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO predictions (key, value, last_used) VALUES (?, ?, ?)",
+            [(key, json.dumps(value), now) for key, value in items.items()]
+        )
+        self.conn.commit()
+        self.evict()
+
+    def evict(self):
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM predictions WHERE key IN ("
+                " SELECT key FROM predictions ORDER BY last_used ASC LIMIT ?)", (excess,)
+            )
+            self.conn.commit()
+
+    def clear(self):
+        self.conn.execute("DELETE FROM predictions")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -1,83 +1,279 @@
 import pandas as pd
+import numpy as np
 import re
 import os
-import nltk
-import spacy
-from nltk.corpus import stopwords
-
-# Download stopwords (safe to re-run)
-nltk.download('stopwords')
-
-# Load spaCy model
-nlp = spacy.load("en_core_web_sm")
-
-STOPWORDS = set(stopwords.words('english'))
-
-# ----------------------------
-# Aspect Synonym Dictionary
-# ----------------------------
-ASPECT_SYNONYMS = {
-    "battery": ["battery", "battery life", "battery backup", "batteries"],
-    "screen": ["screen", "display", "lcd", "monitor"],
-    "sound": ["sound", "audio", "speaker", "volume"],
-    "camera": ["camera", "photo", "image", "pictures"],
-    "price": ["price", "cost", "value", "worth"],
-    "performance": ["performance", "speed", "slow", "fast"],
-    "memory": ["memory", "storage", "ram", "space"],
-    "connectivity": ["wifi", "bluetooth", "connection", "connectivity"],
-    "size": ["size", "weight", "dimension"],
-    "design": ["design", "look", "build", "style"]
-}
-
-REVERSE_MAP = {word: aspect for aspect, words in ASPECT_SYNONYMS.items() for word in words}
+import argparse
+import hashlib
+
+from aspect_matcher import DEFAULT_THRESHOLD, AspectMatcher
+from aspects import REVERSE_MAP
+from checkpoint import run_chunked
+from instrumentation import step, write_report
+from resources import get_nlp, get_stopwords
+from storage import iter_table, read_table, stage_path, write_table
+from parse_store import PARSE_STORE_DIR, load_parse_store, save_parse_store, sentence_key
+
+# The spaCy model and stopword list load on first use (see resources.py);
+# preprocess.nlp / preprocess.STOPWORDS still work for existing callers
+def __getattr__(name):
+    if name == "nlp":
+        return get_nlp()
+    if name == "STOPWORDS":
+        return get_stopwords()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# POS tags need tok2vec/tagger/attribute_ruler and noun chunks need the parser;
+# nothing downstream reads entities or lemmas, so those components are skipped
+UNUSED_COMPONENTS = ["ner", "lemmatizer"]
+
+PUNCT_RE = re.compile(r"[^\w\s]")
+SPACE_RE = re.compile(r"\s+")
+
+# The same two patterns restricted to ASCII, where Python's \w is [A-Za-z0-9_] and
+# \s is these ten characters; written out because RE2 (Arrow) defines \s differently
+_ASCII_SPACE = r"\t\n\x0b\x0c\r\x1c-\x1f "
+_ASCII_PUNCT_PATTERN = rf"[^A-Za-z0-9_{_ASCII_SPACE}]"
+_ASCII_SPACE_PATTERN = rf"[{_ASCII_SPACE}]+"
 
 def clean_text(text, remove_stopwords=True):
     if not isinstance(text, str):
         return ""
 
     text = text.lower()
-    text = re.sub(r"[^\w\s]", "", text)
-    text = re.sub(r"\s+", " ", text).strip()
+    text = PUNCT_RE.sub("", text)
+    text = SPACE_RE.sub(" ", text).strip()
 
     if remove_stopwords:
+        stopwords = get_stopwords()
         tokens = text.split()
-        text = " ".join([t for t in tokens if t not in STOPWORDS])
+        text = " ".join([t for t in tokens if t not in stopwords])
 
     return text
 
 def normalize_feature(feature):
     return REVERSE_MAP.get(feature.lower(), feature.lower())
 
-def extract_pos_tags(text):
-    doc = nlp(text)
+def _clean_ascii_arrow(values, remove_stopwords):
+    # values: list of ASCII str. Lowercasing, both regex passes and stopword
+    # filtering run as Arrow kernels over the whole array
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    arr = pc.ascii_lower(pa.array(values, type=pa.string()))
+    arr = pc.replace_substring_regex(arr, _ASCII_PUNCT_PATTERN, "")
+    arr = pc.replace_substring_regex(arr, _ASCII_SPACE_PATTERN, " ")
+    arr = pc.utf8_trim(arr, " ")  # runs are single spaces now, so this is str.strip()
+
+    if remove_stopwords:
+        tokens = pc.split_pattern(arr, " ")
+        flat = pc.list_flatten(tokens)
+        keep = pc.invert(pc.is_in(flat, value_set=pa.array(sorted(get_stopwords()), type=pa.string())))
+        parents = pc.list_parent_indices(tokens).filter(keep).to_numpy()
+        offsets = np.zeros(len(values) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(parents, minlength=len(values)), out=offsets[1:])
+        arr = pc.binary_join(pa.ListArray.from_arrays(pa.array(offsets), flat.filter(keep)), " ")
+
+    return arr.to_numpy(zero_copy_only=False)
+
+def clean_text_series(texts, remove_stopwords=True):
+    # Whole-column clean_text: same result as texts.apply(clean_text), byte for byte.
+    # Each distinct string is cleaned once and broadcast back. ASCII strings go
+    # through Arrow kernels when pyarrow is installed; anything else (and every
+    # string without pyarrow) goes through clean_text itself.
+    texts = pd.Series(texts)
+    codes, uniques = pd.factorize(texts)  # NaN/None get code -1
+    uniques = np.asarray(uniques, dtype=object)
+
+    # One extra slot at the end for code -1; non-string values clean to "" like clean_text
+    cleaned = np.full(len(uniques) + 1, "", dtype=object)
+    is_str = np.fromiter((isinstance(u, str) for u in uniques), dtype=bool, count=len(uniques))
+    todo = np.flatnonzero(is_str)
+    try:
+        ascii_idx = todo[np.fromiter((uniques[i].isascii() for i in todo), dtype=bool, count=len(todo))]
+        if len(ascii_idx):
+            cleaned[ascii_idx] = _clean_ascii_arrow(list(uniques[ascii_idx]), remove_stopwords)
+        todo = np.setdiff1d(todo, ascii_idx)
+    except ImportError:
+        pass
+    for i in todo:
+        cleaned[i] = clean_text(uniques[i], remove_stopwords)
+
+    return pd.Series(cleaned[codes], index=texts.index, dtype=object)
+
+def normalize_feature_series(features):
+    # Whole-column normalize_feature: one REVERSE_MAP lookup per distinct value
+    features = pd.Series(features)
+    codes, uniques = pd.factorize(features)
+    if (codes < 0).any():
+        return features.apply(normalize_feature)  # NaN: keep normalize_feature's behaviour
+    mapped = np.array([normalize_feature(u) for u in uniques], dtype=object)
+    return pd.Series(mapped[codes], index=features.index, dtype=object)
+
+def pos_tags_from_doc(doc):
     return " ".join([f"{token.text}_{token.pos_}" for token in doc])
 
-def extract_noun_phrases(text):
-    doc = nlp(text)
+def noun_phrases_from_doc(doc):
     return [chunk.text for chunk in doc.noun_chunks]
 
-def preprocess_dataframe(df, remove_stopwords=True):
-    df["clean_sentence"] = df["sentence"].apply(lambda x: clean_text(x, remove_stopwords))
-    df["clean_feature"] = df["feature"].apply(lambda x: clean_text(x, remove_stopwords=False))
-    df["aspect"] = df["clean_feature"].apply(normalize_feature)
+def extract_pos_tags(text):
+    return pos_tags_from_doc(get_nlp()(text))
+
+def extract_noun_phrases(text):
+    return noun_phrases_from_doc(get_nlp()(text))
+
+def cleaning_options(remove_stopwords):
+    # Anything that changes clean_sentence must change this, so stale parses are dropped
+    stopword_hash = hashlib.sha1(" ".join(sorted(get_stopwords())).encode("utf-8")).hexdigest()
+    return {"remove_stopwords": remove_stopwords, "stopwords": stopword_hash}
+
+def parse_sentences(texts, batch_size=256, n_process=1):
+    nlp = get_nlp()
+    disable = [name for name in UNUSED_COMPONENTS if name in nlp.pipe_names]
+    return nlp.pipe(texts, batch_size=batch_size, n_process=n_process, disable=disable)
+
+def linguistic_features(texts, batch_size=256, n_process=1, store_options=None, store_path=None):
+    # One nlp.pipe pass over the distinct sentences; POS tags and noun chunks
+    # both come from that single parse. With store_path, parses already in the
+    # store are reused and new ones are added to it.
+    unique = list(dict.fromkeys(texts))
+    if store_path is None:
+        with step("parse", rows=len(unique)):
+            docs = parse_sentences(unique, batch_size=batch_size, n_process=n_process)
+            return {
+                text: (pos_tags_from_doc(doc), noun_phrases_from_doc(doc))
+                for text, doc in zip(unique, docs)
+            }
+
+    nlp = get_nlp()
+    with step("parse_store_load") as s:
+        stored = load_parse_store(nlp, store_options, store_path)
+        s.rows = len(stored)
+    keys = {text: sentence_key(text) for text in unique}
+    missing = [text for text in unique if keys[text] not in stored]
+    with step("parse", rows=len(missing)):
+        for text, doc in zip(missing, parse_sentences(missing, batch_size=batch_size, n_process=n_process)):
+            stored[keys[text]] = doc
+    print(f"🧩 Parse store: reused {len(unique) - len(missing)}, parsed {len(missing)} sentences")
+
+    if missing or not os.path.exists(store_path):
+        with step("parse_store_save", rows=len(stored)):
+            save_parse_store(stored, nlp, store_options, store_path)
+    return {
+        text: (pos_tags_from_doc(stored[keys[text]]), noun_phrases_from_doc(stored[keys[text]]))
+        for text in unique
+    }
+
+def preprocess_dataframe(df, remove_stopwords=True, batch_size=256, n_process=1, store_path=None,
+                         aspect_matcher=None):
+    # aspect_matcher (aspect_matcher.AspectMatcher) also maps near-synonyms onto canonical aspects
+    with step("clean_text", rows=len(df)):
+        df["clean_sentence"] = clean_text_series(df["sentence"], remove_stopwords)
+        df["clean_feature"] = clean_text_series(df["feature"], remove_stopwords=False)
+    with step("normalize_feature", rows=len(df)):
+        if aspect_matcher is None:
+            df["aspect"] = normalize_feature_series(df["clean_feature"])
+        else:
+            df["aspect"] = aspect_matcher.normalize_series(df["clean_feature"])
 
     # NEW: POS tags and noun phrases
-    df["pos_tags"] = df["clean_sentence"].apply(extract_pos_tags)
-    df["noun_phrases"] = df["clean_sentence"].apply(extract_noun_phrases)
+    with step("linguistic_features", rows=len(df)):
+        features = linguistic_features(df["clean_sentence"], batch_size=batch_size, n_process=n_process,
+                                       store_options=cleaning_options(remove_stopwords),
+                                       store_path=store_path)
+    df["pos_tags"] = [features[text][0] for text in df["clean_sentence"]]
+    df["noun_phrases"] = [list(features[text][1]) for text in df["clean_sentence"]]
 
     return df
 
+def clean_reviews(df, remove_stopwords=True, batch_size=256, n_process=1, store_path=None, aspect_matcher=None):
+    # preprocess_dataframe plus the row filter every caller applies before saving
+    df = preprocess_dataframe(df, remove_stopwords=remove_stopwords, batch_size=batch_size,
+                              n_process=n_process, store_path=store_path, aspect_matcher=aspect_matcher)
+    return df.dropna(subset=["clean_sentence", "clean_feature", "aspect"])
+
+def preprocess_chunked(input_path, output_path, chunk_rows, remove_stopwords=True, batch_size=256,
+                       n_process=1, restart=False, eda_stats=None, aspect_matcher=None):
+    # Out-of-core mode: chunk_rows input rows in memory at a time, each chunk's
+    # result committed to disk (and resumable) before the next is read. The
+    # parse store is not used here: it is one file loaded whole, so it would
+    # grow with the corpus. With eda_stats (an EDA.EDAStats), every cleaned
+    # chunk is also folded into the EDA statistics.
+    seen = [0]
+
+    def map_chunk(chunk):
+        cleaned = clean_reviews(chunk, remove_stopwords, batch_size, n_process, aspect_matcher=aspect_matcher)
+        if eda_stats is not None:
+            with step("eda_stats", rows=len(cleaned)):
+                eda_stats.update(cleaned)
+            seen[0] += len(cleaned)
+        return cleaned
+
+    rows = run_chunked("cleaned_reviews", input_path, output_path, map_chunk,
+                       settings=["preprocess", cleaning_options(remove_stopwords),
+                                 aspect_matcher.settings if aspect_matcher is not None else None],
+                       chunk_rows=chunk_rows,
+                       restart=restart)
+    if eda_stats is not None and seen[0] != rows:
+        # Resumed run: chunks from the earlier run were never seen here, so rescan the output
+        with step("eda_stats", rows=rows):
+            eda_stats.reset()
+            for chunk in iter_table(output_path, chunk_rows=chunk_rows):
+                eda_stats.update(chunk)
+    return rows
+
 if __name__ == "__main__":
-    df = pd.read_csv("output/combined_reviews.csv")
+    parser = argparse.ArgumentParser(description="Clean, normalise and POS/NP-annotate reviews")
+    parser.add_argument("--batch-size", type=int, default=256, help="Sentences per nlp.pipe batch")
+    parser.add_argument("--n-process", type=int, default=1, help="spaCy worker processes")
+    parser.add_argument("--parse-store", default=PARSE_STORE_DIR, help="Where to persist spaCy parses")
+    parser.add_argument("--no-parse-store", action="store_true")
+    parser.add_argument("--chunk-rows", type=int, default=0,
+                        help="Stream the input this many rows at a time (bounded memory, no parse store); "
+                             "0 processes the whole table at once")
+    parser.add_argument("--restart", action="store_true", help="Discard checkpointed chunks instead of resuming")
+    parser.add_argument("--eda-stats", nargs="?", const="output/eda_stats.json", default=None,
+                        help="Also collect EDA statistics while preprocessing and save them here "
+                             "(plot with: python EDA.py --from-stats <path>)")
+    parser.add_argument("--aspect-threshold", nargs="?", type=float, const=DEFAULT_THRESHOLD, default=None,
+                        help="Also map features onto the most similar canonical aspect (character n-gram "
+                             "cosine similarity at least this); default: exact synonyms only")
+    args = parser.parse_args()
+    aspect_matcher = None if args.aspect_threshold is None else AspectMatcher(args.aspect_threshold)
+    eda_stats = None
+    if args.eda_stats:
+        from EDA import EDAStats
+
+        eda_stats = EDAStats()
 
-    print("✅ Preprocessing with stopword removal, aspect normalization, POS tagging and NP extraction...")
-    df_clean = preprocess_dataframe(df, remove_stopwords=True)
+    in_path = stage_path("combined_reviews")
+    out_path = stage_path("cleaned_reviews")
+    with step("preprocess") as s:
+        if args.chunk_rows > 0:
+            print(f"✅ Preprocessing {in_path} in chunks of {args.chunk_rows} rows...")
+            s.rows = preprocess_chunked(in_path, out_path, args.chunk_rows, batch_size=args.batch_size,
+                                        n_process=args.n_process, restart=args.restart, eda_stats=eda_stats,
+                                        aspect_matcher=aspect_matcher)
+        else:
+            df = read_table(in_path)
+            s.rows = len(df)
 
-    df_clean = df_clean.dropna(subset=["clean_sentence", "clean_feature", "aspect"])
+            print("✅ Preprocessing with stopword removal, aspect normalization, POS tagging and NP extraction...")
+            df_clean = clean_reviews(df, remove_stopwords=True,
+                                     batch_size=args.batch_size, n_process=args.n_process,
+                                     store_path=None if args.no_parse_store else args.parse_store,
+                                     aspect_matcher=aspect_matcher)
 
-    print("\n📄 Sample preview:")
-    print(df_clean[["domain", "sentence", "clean_sentence", "feature", "clean_feature", "aspect", "pos_tags", "noun_phrases"]].head())
+            print("\n📄 Sample preview:")
+            print(df_clean[["domain", "sentence", "clean_sentence", "feature", "clean_feature", "aspect", "pos_tags", "noun_phrases"]].head())
 
-    os.makedirs("output", exist_ok=True)
-    df_clean.to_csv("output/cleaned_reviews.csv", index=False)
-    print("\n✅ Cleaned & enriched data saved to output/cleaned_reviews.csv")
+            write_table(df_clean, out_path)
+            if eda_stats is not None:
+                with step("eda_stats", rows=len(df_clean)):
+                    eda_stats.update(df_clean)
+    print(f"\n✅ Cleaned & enriched data saved to {out_path}")
+    if aspect_matcher is not None:
+        aspect_matcher.save()
+    if eda_stats is not None:
+        eda_stats.save(args.eda_stats)
+        print(f"📊 EDA statistics saved to {args.eda_stats}")
+    write_report("preprocess")
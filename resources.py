@@ -0,0 +1,152 @@
+# resources.py
+# ---------------------
+# Lazy, process-wide registry of the models and lexicons the pipeline uses.
+#
+# Nothing is loaded at import time. The first get_*() call loads a resource
+# and every later call (from any stage in the same process) gets the same
+# object. Resources are looked up in a local directory first:
+#
+#   resources/                        (OPINION_MINER_RESOURCES)
+#     spacy/en_core_web_sm/           nlp.to_disk() output
+#     nltk_data/corpora/...           stopwords, opinion_lexicon
+#     models/<model id with / -> __>/ transformers save_pretrained() output
+#
+# With OPINION_MINER_OFFLINE=1 nothing is ever downloaded. Populate the
+# directory once on a connected machine with:
+#
+#   python resources.py --fetch
+
+import argparse
+import os
+import threading
+
+RESOURCE_DIR = os.environ.get("OPINION_MINER_RESOURCES", "resources")
+OFFLINE = os.environ.get("OPINION_MINER_OFFLINE", "0") == "1"
+SPACY_MODEL = "en_core_web_sm"
+
+_registry = {}
+_lock = threading.RLock()
+
+if OFFLINE:
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+
+def _cached(key, loader):
+    with _lock:
+        if key not in _registry:
+            _registry[key] = loader()
+        return _registry[key]
+
+
+def loaded():
+    return list(_registry)
+
+
+# ---------- spaCy ---------- #
+
+def get_nlp(name=SPACY_MODEL):
+    def load():
+        import spacy
+
+        local = os.path.join(RESOURCE_DIR, "spacy", name)
+        return spacy.load(local if os.path.isdir(local) else name)
+
+    return _cached(("spacy", name), load)
+
+
+# ---------- NLTK ---------- #
+
+def _nltk_corpus(corpus):
+    import nltk
+
+    local = os.path.join(RESOURCE_DIR, "nltk_data")
+    if local not in nltk.data.path:
+        nltk.data.path.insert(0, local)
+    try:
+        nltk.data.find(f"corpora/{corpus}")
+    except LookupError:
+        if OFFLINE:
+            raise LookupError(f"NLTK corpus '{corpus}' not found under {local} and "
+                              "OPINION_MINER_OFFLINE=1; run `python resources.py --fetch`")
+        nltk.download(corpus, quiet=True)
+
+
+def get_stopwords(language="english"):
+    def load():
+        _nltk_corpus("stopwords")
+        from nltk.corpus import stopwords
+
+        return set(stopwords.words(language))
+
+    return _cached(("stopwords", language), load)
+
+
+def get_opinion_lexicon():
+    # (positive words, negative words)
+    def load():
+        _nltk_corpus("opinion_lexicon")
+        from nltk.corpus import opinion_lexicon
+
+        return set(opinion_lexicon.positive()), set(opinion_lexicon.negative())
+
+    return _cached(("opinion_lexicon",), load)
+
+
+# ---------- transformers ---------- #
+
+def local_model_path(model_name):
+    local = os.path.join(RESOURCE_DIR, "models", model_name.replace("/", "__"))
+    return local if os.path.isdir(local) else model_name
+
+
+def get_engine(model_name=None, backend="torch", batch_size=32, cache=None, workers=1,
+               threads_per_worker=None):
+    # One ZeroShotEngine per (model, backend); batch size, cache and workers are per-call settings
+    from zero_shot import DEFAULT_MODEL, ZeroShotEngine
+
+    model_name = model_name or DEFAULT_MODEL
+    engine = _cached(("engine", model_name, backend),
+                     lambda: ZeroShotEngine(model_name, backend=backend))
+    engine.batch_size = batch_size
+    engine.cache = cache
+    engine.workers = workers
+    engine.threads_per_worker = threads_per_worker
+    return engine
+
+
+# ---------- FETCH ---------- #
+
+def fetch_resources(model_name=None):
+    import nltk
+    import spacy
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    from zero_shot import DEFAULT_MODEL
+
+    nltk_dir = os.path.join(RESOURCE_DIR, "nltk_data")
+    for corpus in ["stopwords", "opinion_lexicon"]:
+        nltk.download(corpus, download_dir=nltk_dir, quiet=True)
+    print(f"📚 NLTK corpora saved to {nltk_dir}")
+
+    spacy_dir = os.path.join(RESOURCE_DIR, "spacy", SPACY_MODEL)
+    spacy.load(SPACY_MODEL).to_disk(spacy_dir)
+    print(f"🧠 spaCy model saved to {spacy_dir}")
+
+    model_name = model_name or DEFAULT_MODEL
+    model_dir = os.path.join(RESOURCE_DIR, "models", model_name.replace("/", "__"))
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(model_dir)
+    AutoModelForSequenceClassification.from_pretrained(model_name).save_pretrained(model_dir)
+    print(f"🤖 {model_name} saved to {model_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the local model/lexicon directory")
+    parser.add_argument("--fetch", action="store_true", help=f"Download everything into {RESOURCE_DIR}/")
+    parser.add_argument("--model", default=None, help="NLI checkpoint to fetch (default: bart-large-mnli)")
+    args = parser.parse_args()
+
+    if args.fetch:
+        fetch_resources(args.model)
+    else:
+        parser.print_help()
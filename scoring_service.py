@@ -0,0 +1,281 @@
+# scoring_service.py
+# ---------------------
+# Long-running local scoring service for near-real-time aspect sentiment.
+#
+# Keeps the spaCy pipeline and/or the zero-shot model resident and serves a
+# small JSON-over-HTTP API (asyncio, standard library only):
+#
+#   POST /score    {"method": "bert" | "rule",
+#                   "reviews": [{"sentence": "...", "aspects": ["battery", ...]}]}
+#                  -> {"results": [{"sentence", "aspect", "sentiment", ...}]}
+#   GET  /metrics  request/pair counters, batch sizes, p50/p99 latency, throughput
+#   GET  /health
+#
+# Concurrent requests are coalesced into micro-batches: a batch is sent to the
+# model once it holds --max-batch pairs or the oldest request has waited
+# --max-wait-ms, whichever comes first.
+#
+#   python scoring_service.py --methods rule bert --port 8765
+
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class LatencyStats:
+    def __init__(self, window=10_000):
+        self.latencies = deque(maxlen=window)
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.pairs = 0
+        self.batches = 0
+        self.batch_pairs = 0
+        self.errors = 0
+
+    def record_request(self, seconds, n_pairs):
+        self.latencies.append(seconds)
+        self.requests += 1
+        self.pairs += n_pairs
+
+    def record_batch(self, n_pairs):
+        self.batches += 1
+        self.batch_pairs += n_pairs
+
+    def snapshot(self):
+        uptime = time.perf_counter() - self.started
+        lat = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            "uptime_sec": round(uptime, 3),
+            "requests": self.requests,
+            "pairs": self.pairs,
+            "errors": self.errors,
+            "batches": self.batches,
+            "mean_batch_pairs": round(self.batch_pairs / self.batches, 2) if self.batches else 0,
+            "latency_ms_p50": round(float(np.percentile(lat, 50)), 3),
+            "latency_ms_p99": round(float(np.percentile(lat, 99)), 3),
+            "requests_per_sec": round(self.requests / uptime, 2),
+            "pairs_per_sec": round(self.pairs / uptime, 2),
+        }
+
+
+class MicroBatcher:
+    # Coalesces pairs from concurrent requests into batched predict_fn calls
+    def __init__(self, predict_fn, stats, max_batch=64, max_wait_ms=10):
+        self.predict_fn = predict_fn
+        self.stats = stats
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        # One model call at a time; the model parallelises internally
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    async def submit(self, pairs):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((pairs, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            n_pairs = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while n_pairs < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                n_pairs += len(item[0])
+
+            pairs = [pair for request_pairs, _ in batch for pair in request_pairs]
+            self.stats.record_batch(len(pairs))
+            try:
+                predictions = await loop.run_in_executor(self.executor, self.predict_fn, pairs)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for request_pairs, future in batch:
+                if not future.done():
+                    future.set_result(predictions[offset:offset + len(request_pairs)])
+                offset += len(request_pairs)
+
+
+# ---------- MODEL PATHS ---------- #
+
+def make_rule_predictor(clean):
+    import RMrule_base as rule
+
+    def predict(pairs):
+        cleaned = [(clean(s), a) for s, a in pairs]
+        mapped = rule.map_pairs(cleaned)
+        results = []
+        for pair in cleaned:
+            match = mapped[pair]
+            results.append({
+                "sentiment": match[1] if match else None,
+                "opinion_word": match[0] if match else None,
+                "method": "rule-based"
+            })
+        return results
+
+    return predict
+
+
+def make_bert_predictor(clean, model, backend, batch_size):
+    from resources import get_engine
+
+    engine = get_engine(model, backend=backend, batch_size=batch_size)
+
+    def predict(pairs):
+        predictions = engine.predict([(clean(s), a) for s, a in pairs])
+        return [{"sentiment": label, "confidence": round(score, 3), "method": "bert-based"}
+                for label, score in predictions]
+
+    return predict
+
+
+def make_cleaner(enabled):
+    if not enabled:
+        return lambda text: text
+    from preprocess import clean_text
+    return clean_text
+
+
+# ---------- HTTP ---------- #
+
+class ScoringService:
+    def __init__(self, predictors, max_batch=64, max_wait_ms=10, normalize=None):
+        self.stats = {name: LatencyStats() for name in predictors}
+        self.batchers = {
+            name: MicroBatcher(fn, self.stats[name], max_batch, max_wait_ms)
+            for name, fn in predictors.items()
+        }
+        self.normalize = normalize or (lambda aspect: aspect)
+
+    async def score(self, payload):
+        method = payload.get("method") or next(iter(self.batchers))
+        if method not in self.batchers:
+            raise ValueError(f"method '{method}' is not loaded; available: {', '.join(self.batchers)}")
+
+        reviews = payload.get("reviews") or [payload]
+        pairs = [(str(r["sentence"]), self.normalize(str(aspect)))
+                 for r in reviews for aspect in r.get("aspects", [])]
+        start = time.perf_counter()
+        predictions = await self.batchers[method].submit(pairs) if pairs else []
+        self.stats[method].record_request(time.perf_counter() - start, len(pairs))
+
+        return {"results": [
+            {"sentence": sentence, "aspect": aspect, **prediction}
+            for (sentence, aspect), prediction in zip(pairs, predictions)
+        ]}
+
+    def metrics(self):
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
+
+    async def handle(self, reader, writer):
+        # Minimal HTTP/1.1 with keep-alive: enough for local clients and load tests
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                http_method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, response = 200, None
+                try:
+                    if http_method == "POST" and path == "/score":
+                        response = await self.score(json.loads(body or b"{}"))
+                    elif http_method == "GET" and path == "/metrics":
+                        response = self.metrics()
+                    elif http_method == "GET" and path == "/health":
+                        response = {"status": "ok", "methods": list(self.batchers)}
+                    else:
+                        status, response = 404, {"error": f"no route {http_method} {path}"}
+                except (ValueError, KeyError, TypeError) as e:
+                    status, response = 400, {"error": str(e)}
+                except Exception as e:
+                    for stats in self.stats.values():
+                        stats.errors += 1
+                    status, response = 500, {"error": str(e)}
+
+                data = json.dumps(response).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode("latin-1")
+                    + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        workers = [asyncio.create_task(b.run()) for b in self.batchers.values()]
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"🚀 Scoring service on http://{host}:{port} (methods: {', '.join(self.batchers)})")
+        async with server:
+            try:
+                await server.serve_forever()
+            finally:
+                for worker in workers:
+                    worker.cancel()
+
+
+if __name__ == "__main__":
+    from zero_shot import DEFAULT_MODEL
+
+    parser = argparse.ArgumentParser(description="Micro-batching aspect sentiment scoring service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--methods", nargs="+", default=["rule", "bert"], choices=["rule", "bert"])
+    parser.add_argument("--max-batch", type=int, default=64, help="Pairs per micro-batch")
+    parser.add_argument("--max-wait-ms", type=float, default=10, help="Longest a request waits for a batch to fill")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--backend", default="torch")
+    parser.add_argument("--batch-size", type=int, default=32, help="Model forward-pass batch size")
+    parser.add_argument("--raw-text", action="store_true",
+                        help="Sentences are already cleaned; skip clean_text/normalize_feature")
+    args = parser.parse_args()
+
+    clean = make_cleaner(not args.raw_text)
+    normalize = None
+    if not args.raw_text:
+        from preprocess import clean_text, normalize_feature
+        normalize = lambda feature: normalize_feature(clean_text(feature, remove_stopwords=False))
+
+    predictors = {}
+    if "rule" in args.methods:
+        from resources import get_nlp, get_opinion_lexicon
+        # Load up front so the first request does not pay for it
+        get_nlp()
+        get_opinion_lexicon()
+        predictors["rule"] = make_rule_predictor(clean)
+    if "bert" in args.methods:
+        predictors["bert"] = make_bert_predictor(clean, args.model, args.backend, args.batch_size)
+
+    service = ScoringService(predictors, args.max_batch, args.max_wait_ms, normalize)
+    asyncio.run(service.serve(args.host, args.port))
@@ -0,0 +1,74 @@
+# sharded_inference.py
+# ---------------------
+# Multi-process zero-shot inference that shares one copy of the model.
+#
+# The engine is loaded once in the parent. Its weights are moved to shared
+# memory and worker processes are forked from the parent, so every worker
+# maps the same pages instead of loading (or copying) its own ~1.6 GB model.
+# Each worker gets cpu_count // workers intra-op threads and a single
+# inter-op thread, so N workers never ask for more cores than the machine
+# has. Work is split into contiguous shards and results come back in input
+# order.
+#
+# Deduplication and the prediction cache stay in the parent
+# (ZeroShotEngine.predict); only the cache misses are sharded.
+
+import multiprocessing
+import os
+
+# Set in the parent right before the pool forks; inherited by the workers
+_engine = None
+
+
+def default_threads(workers):
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def _init_worker(threads):
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # already fixed once inter-op work has run in the parent
+
+
+def _predict_shard(pairs):
+    return _engine.predict_unique(pairs)
+
+
+def share_model_memory(engine):
+    if engine.backend.name not in ("torch", "int8"):
+        raise ValueError(f"Sharded inference needs a torch model; backend '{engine.backend.name}' "
+                         "cannot be shared across forked workers")
+    engine.backend.model.share_memory()
+
+
+def predict_sharded(engine, pairs, workers, threads_per_worker=None, shards_per_worker=4):
+    # Same output as engine.predict_unique(pairs), computed by `workers` forked processes
+    global _engine
+
+    pairs = list(pairs)
+    if workers <= 1 or len(pairs) < 2 * workers:
+        return engine.predict_unique(pairs)
+    if "fork" not in multiprocessing.get_all_start_methods():
+        print("⚠️ fork is unavailable on this platform; running inference in one process")
+        return engine.predict_unique(pairs)
+
+    share_model_memory(engine)
+    # A few shards per worker evens out batches of very different lengths
+    n_shards = min(len(pairs), workers * shards_per_worker)
+    size = -(-len(pairs) // n_shards)
+    shards = [pairs[i:i + size] for i in range(0, len(pairs), size)]
+
+    _engine = engine
+    try:
+        ctx = multiprocessing.get_context("fork")
+        with ctx.Pool(workers, initializer=_init_worker,
+                      initargs=(threads_per_worker or default_threads(workers),)) as pool:
+            results = pool.map(_predict_shard, shards)
+    finally:
+        _engine = None
+
+    return [prediction for shard in results for prediction in shard]
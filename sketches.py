@@ -0,0 +1,74 @@
+# sketches.py
+# ---------------------
+# Space-bounded, mergeable frequency summaries for streaming statistics.
+#
+# HeavyHitters is a Misra-Gries summary holding at most `capacity` items.
+# Counts are added in weighted batches (one chunk's exact counts at a time);
+# whenever the summary overflows, the (capacity+1)-th largest count is
+# subtracted from every item and non-positive items are dropped. Any item
+# whose true frequency exceeds total / (capacity + 1) is guaranteed to be
+# kept, and every kept count is at most `error_bound()` below the true one.
+# While the vocabulary fits in `capacity` the counts are exact.
+#
+# Two summaries merge the same way (add, then prune), so sketches built on
+# separate chunks, workers or runs combine into one with the same guarantee.
+
+from collections import Counter
+
+DEFAULT_CAPACITY = 1000
+
+
+class HeavyHitters:
+    def __init__(self, capacity=DEFAULT_CAPACITY, counts=None, total=0, pruned=0):
+        self.capacity = capacity
+        self.counts = dict(counts or {})
+        self.total = total    # sum of every weight ever added
+        self.pruned = pruned  # weight removed by pruning
+
+    def __len__(self):
+        return len(self.counts)
+
+    def update(self, items):
+        # items: {item: weight} (a Counter, value_counts().items(), ...) or an iterable of items
+        if not hasattr(items, "items"):
+            items = Counter(items)
+        counts = self.counts
+        for item, weight in items.items():
+            counts[item] = counts.get(item, 0) + weight
+            self.total += weight
+        self._prune()
+        return self
+
+    def merge(self, other):
+        self.total += other.total
+        self.pruned += other.pruned
+        counts = self.counts
+        for item, weight in other.counts.items():
+            counts[item] = counts.get(item, 0) + weight
+        self._prune()
+        return self
+
+    def _prune(self):
+        if len(self.counts) <= self.capacity:
+            return
+        cut = sorted(self.counts.values(), reverse=True)[self.capacity]
+        before = sum(self.counts.values())
+        self.counts = {item: n - cut for item, n in self.counts.items() if n > cut}
+        self.pruned += before - sum(self.counts.values())
+
+    def error_bound(self):
+        # Largest possible undercount of any reported item
+        return self.pruned // (self.capacity + 1) if self.pruned else 0
+
+    def top(self, k=None):
+        # [(item, count)] by descending count; ties keep first-seen order
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        return ranked if k is None else ranked[:k]
+
+    def to_dict(self):
+        return {"capacity": self.capacity, "total": self.total, "pruned": self.pruned,
+                "items": [[item, n] for item, n in self.top()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["capacity"], {item: n for item, n in data["items"]}, data["total"], data["pruned"])
@@ -0,0 +1,248 @@
+# storage.py
+# ---------------------
+# Typed hand-off format between pipeline stages.
+#
+# Every stage reads and writes its intermediate tables through read_table() /
+# write_table(). The on-disk format follows OPINION_MINER_FORMAT:
+#   csv     (default) the original CSV files under output/
+#   parquet columnar files with a fixed schema (needs pyarrow)
+#
+# Whatever the format, tables come back typed the same way: categorical
+# domain/aspect/sentiment columns, int8 strength, and noun_phrases/pos_tags as
+# real lists instead of the strings CSV forces on them. Pass columns=[...] to
+# read only what a stage needs.
+
+import ast
+import csv
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import step
+
+PIPELINE_FORMAT = os.environ.get("OPINION_MINER_FORMAT", "csv")
+FORMATS = {"csv": ".csv", "parquet": ".parquet"}
+
+CATEGORICAL_COLUMNS = ["domain", "aspect", "sentiment", "predicted_sentiment",
+                       "rule_sentiment", "bert_sentiment", "method", "decided_by"]
+INT8_COLUMNS = ["strength"]
+LIST_COLUMNS = ["noun_phrases", "pos_tags"]
+
+
+def stage_path(name, fmt=None, folder="output"):
+    fmt = fmt or PIPELINE_FORMAT
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown storage format '{fmt}'. Choose from: {', '.join(FORMATS)}")
+    return os.path.join(folder, name + FORMATS[fmt])
+
+
+def _is_parquet(path):
+    return str(path).endswith(".parquet")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise ImportError("The parquet storage format needs pyarrow: pip install pyarrow") from e
+
+
+def _to_list(value, column):
+    if isinstance(value, list):
+        return value
+    if isinstance(value, (tuple, np.ndarray)):
+        return list(value)
+    if not isinstance(value, str):
+        return []
+    if column == "pos_tags":
+        return value.split()
+    # noun_phrases are written to CSV as a Python list literal
+    try:
+        parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return [np for np in value.split(";") if np.strip()]
+    return list(parsed) if isinstance(parsed, (list, tuple)) else [str(parsed)]
+
+
+def apply_schema(df):
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    for col in INT8_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("int8" if df[col].notna().all() else "Int8")
+    for col in LIST_COLUMNS:
+        if col in df.columns:
+            df[col] = [_to_list(v, col) for v in df[col]]
+    return df
+
+
+def _to_csv_frame(df):
+    # CSV keeps its original text layout: POS tags space-joined, noun phrases as a list literal
+    df = df.copy()
+    if "pos_tags" in df.columns:
+        df["pos_tags"] = [" ".join(v) if isinstance(v, (list, tuple, np.ndarray)) else v
+                          for v in df["pos_tags"]]
+    if "noun_phrases" in df.columns:
+        df["noun_phrases"] = [list(v) if isinstance(v, (tuple, np.ndarray)) else v
+                              for v in df["noun_phrases"]]
+    return df
+
+
+def read_table(path, columns=None):
+    with step("read_table") as s:
+        if _is_parquet(path):
+            _require_pyarrow()
+            df = pd.read_parquet(path, columns=columns)
+        else:
+            df = pd.read_csv(path, usecols=columns)
+        s.rows = len(df)
+        return apply_schema(df)
+
+
+def table_columns(path):
+    if _is_parquet(path):
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(path).names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def present_columns(path, columns):
+    # The subset of columns the table actually has, e.g. row_id in tables written before it existed
+    available = set(table_columns(path))
+    return [col for col in columns if col in available]
+
+
+def write_table(df, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with step("write_table", rows=len(df)):
+        if _is_parquet(path):
+            _require_pyarrow()
+            apply_schema(df.copy()).to_parquet(path, index=False)
+        else:
+            _to_csv_frame(df).to_csv(path, index=False)
+
+
+def iter_table(path, columns=None, chunk_rows=100_000):
+    # Yields the table as typed DataFrames of at most chunk_rows rows
+    if _is_parquet(path):
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield apply_schema(batch.to_pandas())
+    else:
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=chunk_rows):
+            yield apply_schema(chunk)
+
+
+def _plain_frame(df):
+    # Parquet row groups must share one schema, so categoricals are stored as plain
+    # strings and dictionary-encoded by Parquet itself
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(str)
+    return df
+
+
+def concat_tables(paths, out_path):
+    # Appends same-format tables into out_path one file at a time
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    if not _is_parquet(out_path):
+        with open(out_path, "wb") as out:
+            for i, path in enumerate(paths):
+                with open(path, "rb") as f:
+                    if i > 0:
+                        f.readline()  # header
+                    shutil.copyfileobj(f, out)
+        return
+
+    _require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    for path in paths:
+        table = pa.Table.from_pandas(_plain_frame(read_table(path)), preserve_index=False,
+                                     schema=writer.schema if writer else None)
+        if writer is None:
+            writer = pq.ParquetWriter(out_path, table.schema)
+        writer.write_table(table)
+    if writer is not None:
+        writer.close()
+
+
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(*parts):
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class RowWriter:
+    # Streams row tuples (or DataFrame chunks) to a CSV or Parquet file without
+    # holding the table in memory
+    def __init__(self, path, columns, batch_rows=50_000):
+        self.path = path
+        self.columns = columns
+        self.batch_rows = batch_rows
+        self.buffer = []
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        if _is_parquet(path):
+            _require_pyarrow()
+            self.file = None
+            self.writer = None
+        else:
+            self.file = open(path, "w", newline="", encoding="utf-8")
+            self.writer = csv.writer(self.file, lineterminator="\n")
+            self.writer.writerow(columns)
+
+    def writerows(self, rows):
+        if self.file is not None:
+            self.writer.writerows(rows)
+            return
+        self.buffer.extend(rows)
+        if len(self.buffer) >= self.batch_rows:
+            self._flush()
+
+    def write_frame(self, df):
+        # Appends a DataFrame chunk (columns in self.columns order)
+        df = df[self.columns]
+        if self.file is not None:
+            _to_csv_frame(df).to_csv(self.file, header=False, index=False, lineterminator="\n")
+            return
+        self.buffer.extend(df.itertuples(index=False, name=None))
+        if len(self.buffer) >= self.batch_rows:
+            self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        frame = _plain_frame(apply_schema(pd.DataFrame(self.buffer, columns=self.columns)))
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+        self.buffer = []
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            return
+        if self.buffer or self.writer is None:
+            self._flush()
+        self.writer.close()
@@ -0,0 +1,72 @@
+# tests/test_aspect_matcher.py
+# ---------------------
+# AspectMatcher must pull misspelt and inflected synonyms onto their aspect,
+# and leave look-alike features that name something else untouched.
+
+import pytest
+
+pytest.importorskip("scipy")
+
+from aspect_matcher import AspectMatcher, same_word
+from aspects import REVERSE_MAP
+
+POSITIVE = {
+    "batery": "battery",
+    "battry life": "battery",
+    "batteries life": "battery",
+    "screens": "screen",
+    "monitors": "screen",
+    "speakers": "sound",
+    "photos": "camera",
+    "priced": "price",
+    "perfomance": "performance",
+    "storage space": "memory",
+    "wifi connection": "connectivity",
+    "looks": "design",
+}
+
+# Similar character n-grams, different things
+NEGATIVE = ["book", "stylus", "lookup", "lookout", "speed dial", "fastening", "speakerphone", "spacebar",
+            "photoshop", "ramp", "price tag", "camera app", "value pack", "storage case", "keyboard"]
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return AspectMatcher(cache_path=None)
+
+
+def test_near_synonyms_map_onto_their_aspect(matcher):
+    mapping = matcher.match(list(POSITIVE))
+    assert mapping == POSITIVE
+
+
+@pytest.mark.parametrize("feature", NEGATIVE)
+def test_look_alike_features_are_kept(matcher, feature):
+    assert matcher.match([feature]) == {feature: feature}
+
+
+def test_exact_synonyms_match_normalize_feature(matcher):
+    mapping = matcher.match(list(REVERSE_MAP))
+    assert mapping == REVERSE_MAP
+
+
+def test_unrelated_features_are_kept_at_any_threshold():
+    # The word check applies however loose the similarity threshold is
+    loose = AspectMatcher(threshold=0.0, cache_path=None)
+    assert loose.match(["book", "speed dial"]) == {"book": "book", "speed dial": "speed dial"}
+
+
+@pytest.mark.parametrize("word, reference, expected", [
+    ("screens", "screen", True),
+    ("batteries", "battery", True),
+    ("priced", "price", True),
+    ("batery", "battery", True),
+    ("perfomance", "performance", True),
+    ("book", "look", False),
+    ("stylus", "style", False),
+    ("lookup", "look", False),
+    ("fastening", "fast", False),
+    ("speakerphone", "speaker", False),
+])
+def test_same_word(word, reference, expected):
+    assert same_word(word, reference) is expected
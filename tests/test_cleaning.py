@@ -0,0 +1,81 @@
+# tests/test_cleaning.py
+# ---------------------
+# clean_text_series / normalize_feature_series must return exactly what
+# .apply(clean_text) / .apply(normalize_feature) returns, value for value,
+# both through the pyarrow kernels and through the pure-Python fallback.
+
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import preprocess
+from benchmarks.bench_cleaning import EDGE_CASES, make_rows
+from preprocess import clean_text, clean_text_series, normalize_feature, normalize_feature_series
+
+# A fixed list, so results do not depend on which NLTK stopwords are installed
+STOPWORDS = {"the", "a", "an", "of", "and", "is", "it", "this", "for", "très"}
+
+NON_STRINGS = [np.nan, None, 3.5, 7, b"bytes", pd.NA]
+VALUES = EDGE_CASES + NON_STRINGS + ["Screen", "the SCREEN is great", "Battery Life", "display", "Screen"]
+
+
+@pytest.fixture(autouse=True)
+def fixed_stopwords(monkeypatch):
+    monkeypatch.setattr(preprocess, "get_stopwords", lambda: STOPWORDS)
+
+
+@pytest.fixture(params=["pyarrow", "fallback"])
+def backend(request, monkeypatch):
+    if request.param == "pyarrow":
+        pytest.importorskip("pyarrow")
+    else:
+        # A None entry makes `import pyarrow` raise ImportError
+        monkeypatch.setitem(sys.modules, "pyarrow", None)
+        monkeypatch.setitem(sys.modules, "pyarrow.compute", None)
+        with pytest.raises(ImportError):
+            preprocess._clean_ascii_arrow(["x"], True)
+    return request.param
+
+
+@pytest.mark.parametrize("remove_stopwords", [True, False])
+def test_clean_text_series_matches_clean_text(backend, remove_stopwords):
+    texts = pd.Series(VALUES, dtype=object, index=range(100, 100 + len(VALUES)))
+    expected = texts.apply(lambda t: clean_text(t, remove_stopwords))
+    actual = clean_text_series(texts, remove_stopwords)
+    assert actual.index.equals(expected.index)
+    assert actual.tolist() == expected.tolist()
+    assert all(type(v) is str for v in actual)
+
+
+@pytest.mark.parametrize("remove_stopwords", [True, False])
+def test_clean_text_series_matches_on_synthetic_rows(backend, remove_stopwords):
+    texts = make_rows(5000)["sentence"]
+    expected = texts.apply(lambda t: clean_text(t, remove_stopwords))
+    assert clean_text_series(texts, remove_stopwords).tolist() == expected.tolist()
+
+
+def test_clean_text_series_empty(backend):
+    assert clean_text_series(pd.Series([], dtype=object)).tolist() == []
+
+
+@pytest.mark.parametrize("features", [
+    [v for v in VALUES if isinstance(v, str)],
+    [clean_text(v, remove_stopwords=False) for v in VALUES],
+])
+def test_normalize_feature_series_matches_normalize_feature(features):
+    features = pd.Series(features, dtype=object)
+    expected = features.apply(normalize_feature)
+    actual = normalize_feature_series(features)
+    assert actual.index.equals(expected.index)
+    assert actual.tolist() == expected.tolist()
+
+
+@pytest.mark.parametrize("value", [np.nan, None, 3.5])
+def test_normalize_feature_series_non_strings_behave_like_normalize_feature(value):
+    # normalize_feature only accepts strings; the column version fails the same way
+    with pytest.raises(AttributeError):
+        normalize_feature(value)
+    with pytest.raises(AttributeError):
+        normalize_feature_series(pd.Series(["screen", value], dtype=object))
@@ -0,0 +1,129 @@
+# zero_shot.py
+# ---------------------
+# Batched, deduplicated zero-shot NLI inference for the BERT relation mapper.
+#
+# The transformers "zero-shot-classification" pipeline scores one sequence at a
+# time and runs one forward pass per candidate label. This engine instead:
+#   1. deduplicates (sentence, aspect) pairs,
+#   2. builds every premise/hypothesis pair up front,
+#   3. sorts them by token length so each batch holds similar lengths,
+#   4. runs fixed-size batches padded only to the longest member,
+#   5. softmaxes the entailment logits across labels (same as the pipeline)
+#      and scatters the result back to every original row.
+
+import numpy as np
+
+from inference_backends import load_backend
+from instrumentation import step
+from prediction_cache import prediction_key
+
+DEFAULT_MODEL = "facebook/bart-large-mnli"
+SENTIMENT_LABELS = ["positive", "neutral", "negative"]
+HYPOTHESIS_TEMPLATE = "The sentiment toward the {aspect} is {label}"
+
+
+def entailment_index(model_config):
+    for label, idx in model_config.label2id.items():
+        if label.lower().startswith("entail"):
+            return int(idx)
+    # MNLI checkpoints order labels contradiction / neutral / entailment
+    return int(model_config.num_labels) - 1
+
+
+class ZeroShotEngine:
+    def __init__(self, model_name=DEFAULT_MODEL, labels=None, template=HYPOTHESIS_TEMPLATE,
+                 batch_size=32, max_length=512, device=None, cache=None, backend="torch",
+                 workers=1, threads_per_worker=None):
+        self.model_name = model_name
+        self.cache = cache
+        self.labels = list(labels or SENTIMENT_LABELS)
+        self.template = template
+        self.batch_size = batch_size
+        self.max_length = max_length
+        # workers > 1 shards cache misses across forked processes (sharded_inference.py)
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+
+        if isinstance(backend, str):
+            backend = load_backend(backend, model_name, device=device)
+        self.backend = backend
+        self.tokenizer = backend.tokenizer
+        self.entail_id = entailment_index(backend.config)
+        # Quantized / exported models score slightly differently, so they get their own cache keys
+        self.model_id = model_name if backend.name == "torch" else f"{model_name}@{backend.name}"
+
+    def hypotheses(self, aspect):
+        return [self.template.format(aspect=aspect, label=label) for label in self.labels]
+
+    def _forward(self, batch):
+        return self.backend.logits(batch)[:, self.entail_id]
+
+    def score_pairs(self, pairs):
+        # Entailment logit for every (unique pair, label); shape (n_pairs, n_labels)
+        n_labels = len(self.labels)
+        premises, hypotheses = [], []
+        for sentence, aspect in pairs:
+            for hypothesis in self.hypotheses(aspect):
+                premises.append(sentence)
+                hypotheses.append(hypothesis)
+
+        if not premises:
+            return np.zeros((0, n_labels), dtype=np.float32)
+
+        with step("tokenize", rows=len(premises)):
+            encoded = self.tokenizer(premises, hypotheses, truncation="only_first",
+                                     max_length=self.max_length)
+            input_ids = encoded["input_ids"]
+            order = np.argsort([len(ids) for ids in input_ids], kind="stable")
+
+        entail = np.empty(len(premises), dtype=np.float32)
+        with step("forward", rows=len(premises)):
+            for start in range(0, len(order), self.batch_size):
+                idx = order[start:start + self.batch_size]
+                features = [{key: encoded[key][i] for key in encoded.keys()} for i in idx]
+                batch = self.tokenizer.pad(features, padding="longest", return_tensors="pt")
+                entail[idx] = self._forward(batch)
+
+        return entail.reshape(len(pairs), n_labels)
+
+    def predict_unique(self, pairs):
+        logits = self.score_pairs(pairs)
+        if len(logits) == 0:
+            return []
+        shifted = logits - logits.max(axis=1, keepdims=True)
+        probs = np.exp(shifted)
+        probs /= probs.sum(axis=1, keepdims=True)
+        best = probs.argmax(axis=1)
+        return [(self.labels[b], float(probs[i, b])) for i, b in enumerate(best)]
+
+    def cache_key(self, sentence, aspect):
+        return prediction_key(sentence, aspect, self.template, self.labels, self.model_id)
+
+    def predict(self, pairs):
+        # Classify each distinct pair once, then fan predictions back out to all rows
+        pairs = [(str(s), str(a)) for s, a in pairs]
+        unique = list(dict.fromkeys(pairs))
+
+        predictions = {}
+        if self.cache is not None:
+            with step("cache_lookup", rows=len(unique)):
+                keys = {pair: self.cache_key(*pair) for pair in unique}
+                cached = self.cache.get_many(keys.values())
+                for pair, key in keys.items():
+                    if key in cached:
+                        predictions[pair] = tuple(cached[key])
+
+        todo = [pair for pair in unique if pair not in predictions]
+        with step("model", rows=len(todo)):
+            if self.workers > 1:
+                from sharded_inference import predict_sharded
+                fresh = dict(zip(todo, predict_sharded(self, todo, self.workers, self.threads_per_worker)))
+            else:
+                fresh = dict(zip(todo, self.predict_unique(todo)))
+        predictions.update(fresh)
+
+        if self.cache is not None:
+            with step("cache_write", rows=len(fresh)):
+                self.cache.put_many({keys[pair]: list(pred) for pair, pred in fresh.items()})
+
+        return [predictions[pair] for pair in pairs]